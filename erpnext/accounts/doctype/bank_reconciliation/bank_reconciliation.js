@@ -31,6 +31,15 @@ frappe.ui.form.on("Bank Reconciliation", {
 			doc: frm.doc
 		});
 	},
+	match_bank_statement: function(frm) {
+		return frappe.call({
+			method: "match_bank_statement",
+			doc: frm.doc,
+			callback: function(r, rt) {
+				frm.refresh()
+			}
+		});
+	},
 	get_relevant_entries: function(frm) {
 		return frappe.call({
 			method: "get_details",
@@ -39,5 +48,14 @@ frappe.ui.form.on("Bank Reconciliation", {
 				frm.refresh()
 			}
 		});
+	},
+	get_next_entries: function(frm) {
+		return frappe.call({
+			method: "get_next_entries",
+			doc: frm.doc,
+			callback: function(r, rt) {
+				frm.refresh()
+			}
+		});
 	}
 });
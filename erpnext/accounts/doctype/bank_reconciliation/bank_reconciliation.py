@@ -3,34 +3,51 @@
 
 from __future__ import unicode_literals
 import frappe
-from frappe.utils import flt, getdate, nowdate
+from frappe.utils import flt, cstr, cint, getdate, now
 from frappe import msgprint, _
 from frappe.model.document import Document
 
+# number of entries fetched at a time, see `get_next_entries`
+max_entries = 500
+
 class BankReconciliation(Document):
 	def get_details(self):
+		self.set_last_entry(None)
+		self.load_entries()
+
+	def get_next_entries(self):
+		self.load_entries()
+
+	def load_entries(self):
+		"""Load the next `max_entries` entries after the last entry loaded, if any.
+
+		Pages follow the last entry shown instead of an offset, as the uncleared
+		entries before it reduce when their clearance date is updated"""
 		if not (self.bank_account and self.from_date and self.to_date):
 			msgprint("Bank Account, From Date and To Date are Mandatory")
 			return
 
-		condition = ""
-		if not self.include_reconciled_entries:
-			condition = "and (clearance_date is null or clearance_date='0000-00-00')"
+		summary = get_entries_summary(self.bank_account, self.from_date, self.to_date,
+			self.include_reconciled_entries)
+
+		after = None
+		if self.last_voucher_id:
+			after = frappe._dict({"posting_date": self.last_posting_date,
+				"name": self.last_voucher_id, "idx": self.last_row_idx})
 
+		dl = get_entries(self.bank_account, self.from_date, self.to_date,
+			self.include_reconciled_entries, after=after, limit=max_entries + 1)
 
-		dl = frappe.db.sql("""select t1.name, t1.cheque_no, t1.cheque_date, t2.debit_in_account_currency,
-				t2.credit_in_account_currency, t1.posting_date, t2.against_account, t1.clearance_date
-			from
-				`tabJournal Entry` t1, `tabJournal Entry Account` t2
-			where
-				t2.parent = t1.name and t2.account = %s
-				and t1.posting_date >= %s and t1.posting_date <= %s and t1.docstatus=1
-				and ifnull(t1.is_opening, 'No') = 'No' %s
-				order by t1.posting_date""" %
-				('%s', '%s', '%s', condition), (self.bank_account, self.from_date, self.to_date), as_dict=1)
+		# more entries after this page
+		self.set_last_entry(dl[max_entries - 1] if len(dl) > max_entries else None)
+		dl = dl[:max_entries]
 
 		self.set('journal_entries', [])
-		self.total_amount = 0.0
+		self.total_entries = summary.count
+		self.total_amount = summary.total_amount
+
+		if summary.count > len(dl):
+			msgprint(_("Showing {0} of {1} entries").format(len(dl), summary.count))
 
 		for d in dl:
 			nl = self.append('journal_entries', {})
@@ -42,21 +59,159 @@ class BankReconciliation(Document):
 			nl.credit = d.credit_in_account_currency
 			nl.against_account = d.against_account
 			nl.clearance_date = d.clearance_date
-			self.total_amount += flt(d.debit_in_account_currency) - flt(d.credit_in_account_currency)
+
+	def set_last_entry(self, entry):
+		self.last_posting_date = entry.posting_date if entry else None
+		self.last_voucher_id = entry.name if entry else None
+		self.last_row_idx = entry.idx if entry else None
 
 	def update_details(self):
-		vouchers = []
+		clearance_dates = {}
 		for d in self.get('journal_entries'):
 			if d.clearance_date:
 				if d.cheque_date and getdate(d.clearance_date) < getdate(d.cheque_date):
 					frappe.throw(_("Clearance date cannot be before check date in row {0}").format(d.idx))
 
-				frappe.db.set_value("Journal Entry", d.voucher_id, "clearance_date", d.clearance_date)
-				frappe.db.sql("""update `tabJournal Entry` set clearance_date = %s, modified = %s
-					where name=%s""", (d.clearance_date, nowdate(), d.voucher_id))
-				vouchers.append(d.voucher_id)
+				clearance_dates[d.voucher_id] = d.clearance_date
 
-		if vouchers:
-			msgprint("Clearance Date updated in: {0}".format(", ".join(vouchers)))
+		if clearance_dates:
+			set_clearance_dates(clearance_dates)
+			msgprint("Clearance Date updated in: {0}".format(", ".join(clearance_dates.keys())))
 		else:
 			msgprint(_("Clearance Date not mentioned"))
+
+	def match_bank_statement(self):
+		"""Set clearance date of entries matching the rows of the attached bank statement"""
+		from frappe.utils.csvutils import read_csv_content_from_attached_file
+
+		statement = get_statement_entries(read_csv_content_from_attached_file(self))
+		matched = match_statement_entries(self.get('journal_entries'), statement)
+
+		if matched:
+			msgprint(_("{0} entries matched, please check and update Clearance Date").format(matched))
+		else:
+			msgprint(_("No entries matched the Bank Statement"))
+
+def get_entries(bank_account, from_date, to_date, include_reconciled_entries=0, after=None, limit=None):
+	"""Returns Journal Entry rows of the bank account posted between the dates.
+
+	Vouchers are looked up from GL Entry by account and posting date (indexed together),
+	so only the bank account's entries in the period are read
+
+	:param after: Return rows after this row (dict with `posting_date`, `name` and `idx`)."""
+	condition = ""
+	values = {"account": bank_account, "from_date": from_date, "to_date": to_date}
+
+	if after:
+		condition = """and (t1.posting_date > %(after_date)s
+			or (t1.posting_date = %(after_date)s and (t1.name > %(after_name)s
+				or (t1.name = %(after_name)s and t2.idx > %(after_idx)s))))"""
+		values.update({"after_date": after.posting_date, "after_name": after.name,
+			"after_idx": cint(after.idx)})
+
+	return frappe.db.sql("""select t1.name, t1.cheque_no, t1.cheque_date, t2.debit_in_account_currency,
+			t2.credit_in_account_currency, t1.posting_date, t2.against_account, t1.clearance_date, t2.idx
+		{from_clause} {condition}
+		order by t1.posting_date, t1.name, t2.idx {limit}""".format(
+			from_clause=get_entries_from_clause(include_reconciled_entries), condition=condition,
+			limit="limit {0}".format(cint(limit)) if limit else ""), values, as_dict=1)
+
+def get_entries_summary(bank_account, from_date, to_date, include_reconciled_entries=0):
+	"""Returns number of entries and total amount (debit - credit) of all entries of `get_entries`"""
+	summary = frappe.db.sql("""select count(*) as count,
+			sum(t2.debit_in_account_currency) - sum(t2.credit_in_account_currency) as total_amount
+		{from_clause}""".format(from_clause=get_entries_from_clause(include_reconciled_entries)),
+		{"account": bank_account, "from_date": from_date, "to_date": to_date}, as_dict=1)[0]
+
+	summary.count = cint(summary.count)
+	summary.total_amount = flt(summary.total_amount)
+
+	return summary
+
+def get_entries_from_clause(include_reconciled_entries=0):
+	condition = ""
+	if not cint(include_reconciled_entries):
+		condition = "and (t1.clearance_date is null or t1.clearance_date='0000-00-00')"
+
+	return """from
+			(select distinct voucher_no from `tabGL Entry`
+				where account = %(account)s and voucher_type = 'Journal Entry'
+				and posting_date >= %(from_date)s and posting_date <= %(to_date)s) gle,
+			`tabJournal Entry` t1, `tabJournal Entry Account` t2
+		where
+			t1.name = gle.voucher_no and t2.parent = t1.name and t2.account = %(account)s
+			and t1.docstatus=1 and ifnull(t1.is_opening, 'No') = 'No' {condition}""".format(
+				condition=condition)
+
+def set_clearance_dates(clearance_dates):
+	"""Update clearance date of Journal Entries in one statement.
+
+	:param clearance_dates: dict of {journal_entry: clearance_date}"""
+	vouchers = clearance_dates.keys()
+
+	values = []
+	for voucher in vouchers:
+		values += [voucher, clearance_dates[voucher]]
+
+	frappe.db.sql("""update `tabJournal Entry`
+		set clearance_date = case name {cases} end, modified = %s
+		where name in ({names})""".format(cases=" ".join(["when %s then %s"] * len(vouchers)),
+			names=", ".join(["%s"] * len(vouchers))), tuple(values + [now()] + vouchers))
+
+def get_statement_entries(rows):
+	"""Returns list of {date, reference, deposit, withdrawal} from bank statement csv rows.
+	The first row must have the column headings"""
+	if not rows:
+		return []
+
+	columns = [cstr(c).strip().lower() for c in rows[0]]
+	for c in ("date", "reference", "deposit", "withdrawal"):
+		if c not in columns:
+			frappe.throw(_("Column {0} not found in the Bank Statement").format(_(c.title())))
+
+	entries = []
+	for i, row in enumerate(rows[1:]):
+		row = dict(zip(columns, row))
+		if not row.get("date"):
+			continue
+
+		try:
+			date = getdate(cstr(row["date"]).strip())
+		except ValueError:
+			frappe.throw(_("Invalid date {0} in row {1} of the Bank Statement").format(row["date"], i + 2))
+
+		entries.append(frappe._dict({
+			"date": date,
+			"reference": cstr(row.get("reference")).strip(),
+			"deposit": flt(row.get("deposit")),
+			"withdrawal": flt(row.get("withdrawal"))
+		}))
+
+	return entries
+
+def match_statement_entries(entries, statement):
+	"""Set clearance date of `entries` (Bank Reconciliation Detail rows without a clearance date)
+	from the bank statement. A statement row matches an entry with the same amount and cheque
+	number, or else the only entry with the same amount. Returns number of matched entries"""
+	unmatched = [d for d in entries if not d.clearance_date]
+	matched = 0
+
+	for s in statement:
+		def same_amount(d):
+			return flt(d.debit) == s.deposit and flt(d.credit) == s.withdrawal
+
+		candidates = [d for d in unmatched if same_amount(d)
+			and (not d.posting_date or getdate(d.posting_date) <= s.date)]
+
+		if s.reference:
+			by_reference = [d for d in candidates if cstr(d.cheque_number).strip() == s.reference]
+			if by_reference:
+				candidates = by_reference[:1]
+
+		if len(candidates) == 1:
+			d = candidates[0]
+			d.clearance_date = s.date
+			unmatched.remove(d)
+			matched += 1
+
+	return matched
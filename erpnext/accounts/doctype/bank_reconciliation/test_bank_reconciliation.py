@@ -0,0 +1,112 @@
+# Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+from __future__ import unicode_literals
+import unittest
+import frappe
+from frappe.utils import flt, getdate
+from erpnext.accounts.doctype.bank_reconciliation.bank_reconciliation import \
+	get_statement_entries, match_statement_entries, get_entries, get_entries_summary, set_clearance_dates
+from erpnext.accounts.doctype.journal_entry.test_journal_entry import make_journal_entry
+
+class TestBankReconciliation(unittest.TestCase):
+	def test_get_entries(self):
+		for amount in (100, 200, -300):
+			make_journal_entry("_Test Bank - _TC", "_Test Account Cost for Goods Sold - _TC", amount,
+				"_Test Cost Center - _TC", submit=True)
+
+		entries = get_entries("_Test Bank - _TC", "2013-02-14", "2013-02-14")
+		self.assertTrue(len(entries) >= 3)
+
+		# pages of the entries
+		self.assertEquals(get_entries("_Test Bank - _TC", "2013-02-14", "2013-02-14", limit=2), entries[:2])
+		self.assertEquals(get_entries("_Test Bank - _TC", "2013-02-14", "2013-02-14", after=entries[1],
+			limit=2), entries[2:4])
+
+		# total amount of all entries, not just the fetched page
+		summary = get_entries_summary("_Test Bank - _TC", "2013-02-14", "2013-02-14")
+		self.assertEquals(summary.count, len(entries))
+		self.assertEquals(flt(summary.total_amount, 2), flt(sum([flt(d.debit_in_account_currency)
+			- flt(d.credit_in_account_currency) for d in entries]), 2))
+
+		self.assertFalse(get_entries("_Test Bank - _TC", "2013-02-15", "2013-02-28"))
+
+	def test_next_entries_after_clearance(self):
+		from erpnext.accounts.doctype.bank_reconciliation import bank_reconciliation
+
+		for i in xrange(4):
+			make_journal_entry("_Test Bank - _TC", "_Test Account Cost for Goods Sold - _TC", 100,
+				"_Test Cost Center - _TC", submit=True)
+
+		entries = get_entries("_Test Bank - _TC", "2013-02-14", "2013-02-14")
+
+		doc = frappe.get_doc("Bank Reconciliation")
+		doc.update({
+			"bank_account": "_Test Bank - _TC",
+			"from_date": "2013-02-14",
+			"to_date": "2013-02-14",
+			"include_reconciled_entries": 0
+		})
+
+		max_entries = bank_reconciliation.max_entries
+		bank_reconciliation.max_entries = 2
+		try:
+			doc.get_details()
+			self.assertEquals([d.voucher_id for d in doc.journal_entries], [d.name for d in entries[:2]])
+
+			# clear the first page, next page starts at the first entry not shown yet
+			for d in doc.journal_entries:
+				d.clearance_date = "2013-02-20"
+			doc.update_details()
+
+			doc.get_next_entries()
+			self.assertEquals([d.voucher_id for d in doc.journal_entries], [d.name for d in entries[2:4]])
+		finally:
+			bank_reconciliation.max_entries = max_entries
+
+	def test_set_clearance_dates(self):
+		jv1, jv2, jv3 = [make_journal_entry("_Test Bank - _TC", "_Test Account Cost for Goods Sold - _TC",
+			100, "_Test Cost Center - _TC", submit=True) for i in xrange(3)]
+
+		set_clearance_dates({jv1.name: "2013-02-20", jv2.name: "2013-02-25"})
+
+		self.assertEquals(frappe.db.get_value("Journal Entry", jv1.name, "clearance_date"), getdate("2013-02-20"))
+		self.assertEquals(frappe.db.get_value("Journal Entry", jv2.name, "clearance_date"), getdate("2013-02-25"))
+		self.assertFalse(frappe.db.get_value("Journal Entry", jv3.name, "clearance_date"))
+
+		# cleared entries are left out unless reconciled entries are included
+		names = [d.name for d in get_entries("_Test Bank - _TC", "2013-02-14", "2013-02-14")]
+		self.assertTrue(jv3.name in names)
+		self.assertFalse(jv1.name in names or jv2.name in names)
+
+		names = [d.name for d in get_entries("_Test Bank - _TC", "2013-02-14", "2013-02-14",
+			include_reconciled_entries=1)]
+		self.assertTrue(jv1.name in names and jv2.name in names)
+
+	def test_match_statement_entries(self):
+		entries = [frappe._dict(d) for d in (
+			{"voucher_id": "JV-1", "posting_date": "2015-12-01", "cheque_number": "1001", "debit": 0, "credit": 500},
+			{"voucher_id": "JV-2", "posting_date": "2015-12-01", "cheque_number": "1002", "debit": 0, "credit": 500},
+			{"voucher_id": "JV-3", "posting_date": "2015-12-02", "cheque_number": "", "debit": 250, "credit": 0},
+			{"voucher_id": "JV-4", "posting_date": "2015-12-02", "cheque_number": "", "debit": 100, "credit": 0},
+			{"voucher_id": "JV-5", "posting_date": "2015-12-02", "cheque_number": "", "debit": 100, "credit": 0}
+		)]
+
+		statement = get_statement_entries([
+			["Date", "Reference", "Deposit", "Withdrawal"],
+			["2015-12-04", "1002", "", "500"],
+			["2015-12-05", "", "250", ""],
+			["2015-12-05", "", "100", ""],
+			["", "", "", ""]
+		])
+
+		self.assertEquals(len(statement), 3)
+		self.assertEquals(match_statement_entries(entries, statement), 2)
+
+		clearance_dates = dict((d.voucher_id, d.clearance_date) for d in entries)
+		self.assertEquals(clearance_dates["JV-2"], getdate("2015-12-04"))
+		self.assertEquals(clearance_dates["JV-3"], getdate("2015-12-05"))
+
+		# same amount and no reference, cannot tell which one cleared
+		for voucher in ("JV-1", "JV-4", "JV-5"):
+			self.assertFalse(clearance_dates[voucher])
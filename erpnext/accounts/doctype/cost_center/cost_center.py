@@ -47,6 +47,14 @@ class CostCenter(NestedSet):
 				else:
 					check_acc_list.append([d.account, d.fiscal_year])
 
+	def on_update(self):
+		super(CostCenter, self).on_update()
+		frappe.cache().hdel("budget_allocations", self.name)
+
+	def on_trash(self):
+		super(CostCenter, self).on_trash()
+		frappe.cache().hdel("budget_allocations", self.name)
+
 	def convert_group_to_ledger(self):
 		if self.check_if_child_exists():
 			frappe.throw(_("Cannot convert Cost Center to ledger as it has child nodes"))
@@ -83,6 +91,7 @@ class CostCenter(NestedSet):
 		return new_cost_center
 
 	def after_rename(self, olddn, newdn, merge=False):
+		frappe.cache().hdel("budget_allocations", olddn)
 		if not merge:
 			frappe.db.set_value("Cost Center", newdn, "cost_center_name",
 				" - ".join(newdn.split(" - ")[:-1]))
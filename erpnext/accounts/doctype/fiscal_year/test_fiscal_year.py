@@ -21,3 +21,28 @@ class TestFiscalYear(unittest.TestCase):
 		fy.insert()
 		self.assertEquals(fy.year_end_date, '2001-03-31')
 
+
+	def test_get_fiscal_years(self):
+		from erpnext.accounts.utils import get_fiscal_years, FiscalYearError
+
+		if frappe.db.exists("Fiscal Year", "_Test Fiscal Year 1990"):
+			frappe.delete_doc("Fiscal Year", "_Test Fiscal Year 1990")
+
+		self.assertRaises(FiscalYearError, get_fiscal_years, "1990-06-01", verbose=0)
+
+		# cache is cleared when a fiscal year is added
+		frappe.get_doc({
+			"doctype": "Fiscal Year",
+			"year": "_Test Fiscal Year 1990",
+			"year_start_date": "1990-01-01",
+			"year_end_date": "1990-12-31"
+		}).insert()
+
+		self.assertEquals([d[0] for d in get_fiscal_years("1990-06-01")], ["_Test Fiscal Year 1990"])
+		self.assertEquals([d[0] for d in get_fiscal_years("1990-12-31")], ["_Test Fiscal Year 1990"])
+		self.assertRaises(FiscalYearError, get_fiscal_years, "1991-01-01", verbose=0)
+		self.assertEquals(get_fiscal_years(fiscal_year="_Test Fiscal Year 1990")[0][0],
+			"_Test Fiscal Year 1990")
+
+		frappe.delete_doc("Fiscal Year", "_Test Fiscal Year 1990")
+		self.assertRaises(FiscalYearError, get_fiscal_years, "1990-06-01", verbose=0)
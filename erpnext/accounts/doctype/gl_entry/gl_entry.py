@@ -31,10 +31,8 @@ class GLEntry(Document):
 		validate_balance_type(self.account, adv_adj)
 
 		# Update outstanding amt on against voucher
-		if self.against_voucher_type in ['Journal Entry', 'Sales Invoice', 'Purchase Invoice'] \
-			and self.against_voucher and update_outstanding == 'Yes':
-				update_outstanding_amt(self.account, self.party_type, self.party, self.against_voucher_type,
-					self.against_voucher)
+		if update_outstanding == 'Yes':
+			update_outstanding_amt_for_vouchers(get_outstanding_keys([self]))
 
 	def check_mandatory(self):
 		mandatory = ['account','remarks','voucher_type','voucher_no','fiscal_year','company']
@@ -141,45 +139,97 @@ def check_freezing_date(posting_date, adv_adj=False):
 				frappe.throw(_("You are not authorized to add or update entries before {0}").format(formatdate(acc_frozen_upto)))
 
 def update_outstanding_amt(account, party_type, party, against_voucher_type, against_voucher, on_cancel=False):
-	if party_type and party:
-		party_condition = " and party_type='{0}' and party='{1}'"\
-			.format(frappe.db.escape(party_type), frappe.db.escape(party))
-	else:
-		party_condition = ""
-
-	# get final outstanding amt
-	bal = flt(frappe.db.sql("""
-		select sum(debit_in_account_currency) - sum(credit_in_account_currency)
-		from `tabGL Entry`
-		where against_voucher_type=%s and against_voucher=%s
-		and account = %s {0}""".format(party_condition),
-		(against_voucher_type, against_voucher, account))[0][0] or 0.0)
-
-	if against_voucher_type == 'Purchase Invoice':
-		bal = -bal
-	elif against_voucher_type == "Journal Entry":
-		against_voucher_amount = flt(frappe.db.sql("""
-			select sum(debit_in_account_currency) - sum(credit_in_account_currency)
-			from `tabGL Entry` where voucher_type = 'Journal Entry' and voucher_no = %s
-			and account = %s and (against_voucher is null or against_voucher='') {0}"""
-			.format(party_condition), (against_voucher, account))[0][0])
-
-		if not against_voucher_amount:
-			frappe.throw(_("Against Journal Entry {0} is already adjusted against some other voucher")
-				.format(against_voucher))
-
-		bal = against_voucher_amount + bal
-		if against_voucher_amount < 0:
+	update_outstanding_amt_for_vouchers([(account, party_type, party, against_voucher_type, against_voucher)],
+		on_cancel=on_cancel)
+
+def get_outstanding_keys(gl_entries):
+	"""Returns unique (account, party_type, party, against_voucher_type, against_voucher)
+	of GL Entries whose against voucher has an outstanding amount"""
+	keys = []
+	for entry in gl_entries:
+		if entry.get("against_voucher_type") in ['Journal Entry', 'Sales Invoice', 'Purchase Invoice'] \
+			and entry.get("against_voucher"):
+				key = (entry.get("account"), entry.get("party_type"), entry.get("party"),
+					entry.get("against_voucher_type"), entry.get("against_voucher"))
+				if key not in keys:
+					keys.append(key)
+	return keys
+
+def update_outstanding_amt_for_vouchers(keys, on_cancel=False):
+	"""Recompute and update outstanding amount for all
+	(account, party_type, party, against_voucher_type, against_voucher) keys,
+	using one grouped query for balances and one update per invoice doctype"""
+	if not keys:
+		return
+
+	against_vouchers = list(set([key[4] for key in keys]))
+	balances = get_grouped_balances("""against_voucher in ({0})"""
+		.format(", ".join(["%s"] * len(against_vouchers))), against_vouchers, "against_voucher_type, against_voucher")
+
+	# balance of journal entries against which payments are made, not adjusted against any other voucher
+	against_jv = list(set([key[4] for key in keys if key[3] == "Journal Entry"]))
+	jv_balances = {}
+	if against_jv:
+		jv_balances = get_grouped_balances("""voucher_type = 'Journal Entry' and voucher_no in ({0})
+			and (against_voucher is null or against_voucher='')"""
+			.format(", ".join(["%s"] * len(against_jv))), against_jv, "voucher_type, voucher_no")
+
+	outstanding = {}
+	for account, party_type, party, against_voucher_type, against_voucher in keys:
+		if not (party_type and party):
+			party_type = party = None
+
+		bal = flt(balances.get((against_voucher_type, against_voucher, account, party_type, party)))
+
+		if against_voucher_type == 'Purchase Invoice':
 			bal = -bal
+		elif against_voucher_type == "Journal Entry":
+			against_voucher_amount = flt(jv_balances.get(("Journal Entry", against_voucher, account, party_type, party)))
 
-		# Validation : Outstanding can not be negative for JV
-		if bal < 0 and not on_cancel:
-			frappe.throw(_("Outstanding for {0} cannot be less than zero ({1})").format(against_voucher, fmt_money(bal)))
+			if not against_voucher_amount:
+				frappe.throw(_("Against Journal Entry {0} is already adjusted against some other voucher")
+					.format(against_voucher))
 
-	# Update outstanding amt on against voucher
-	if against_voucher_type in ["Sales Invoice", "Purchase Invoice"]:
-		frappe.db.sql("update `tab%s` set outstanding_amount=%s where name=%s" %
-			(against_voucher_type, '%s', '%s'),	(bal, against_voucher))
+			bal = against_voucher_amount + bal
+			if against_voucher_amount < 0:
+				bal = -bal
+
+			# Validation : Outstanding can not be negative for JV
+			if bal < 0 and not on_cancel:
+				frappe.throw(_("Outstanding for {0} cannot be less than zero ({1})").format(against_voucher, fmt_money(bal)))
+
+		if against_voucher_type in ["Sales Invoice", "Purchase Invoice"]:
+			outstanding.setdefault(against_voucher_type, {})[against_voucher] = bal
+
+	# Update outstanding amt on against vouchers
+	for against_voucher_type, invoices in outstanding.items():
+		values = []
+		for invoice, bal in invoices.items():
+			values += [invoice, bal]
+
+		frappe.db.sql("""update `tab{0}` set outstanding_amount = case name {1} end
+			where name in ({2})""".format(against_voucher_type, " ".join(["when %s then %s"] * len(invoices)),
+				", ".join(["%s"] * len(invoices))), tuple(values + invoices.keys()))
+
+def get_grouped_balances(condition, values, voucher_fields):
+	"""Returns balance in account currency grouped by voucher, account and party.
+
+	Balances are also summed across parties under (voucher_type, voucher_no, account, None, None)"""
+	balances = {}
+	for d in frappe.db.sql("""select {0}, account, party_type, party,
+			sum(debit_in_account_currency) - sum(credit_in_account_currency)
+		from `tabGL Entry` where {1}
+		group by {0}, account, party_type, party""".format(voucher_fields, condition), tuple(values)):
+			voucher_type, voucher_no, account, party_type, party, bal = d
+
+			if party_type and party:
+				key = (voucher_type, voucher_no, account, party_type, party)
+				balances[key] = balances.get(key, 0.0) + flt(bal)
+
+			key = (voucher_type, voucher_no, account, None, None)
+			balances[key] = balances.get(key, 0.0) + flt(bal)
+
+	return balances
 
 def validate_frozen_account(account, adv_adj=None):
 	frozen_account = frappe.db.get_value("Account", account, "freeze_account")
@@ -210,3 +260,10 @@ def update_against_account(voucher_type, voucher_no):
 
 		if d.against != new_against:
 			frappe.db.set_value("GL Entry", d.name, "against", new_against)
+
+def on_doctype_update():
+	if not frappe.db.sql("""show index from `tabGL Entry`
+		where Key_name="account_posting_date_index" """):
+		frappe.db.commit()
+		frappe.db.sql("""alter table `tabGL Entry`
+			add index account_posting_date_index(account, posting_date)""")
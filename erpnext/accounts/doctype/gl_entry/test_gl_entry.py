@@ -23,3 +23,36 @@ class TestGLEntry(unittest.TestCase):
 			and debit = 0 and credit = '.01'""", jv.name)
 
 		self.assertTrue(round_off_entry)
+
+	def test_outstanding_amount_for_multiple_invoices(self):
+		from erpnext.accounts.doctype.sales_invoice.test_sales_invoice import create_sales_invoice
+
+		invoices = [create_sales_invoice(rate=100), create_sales_invoice(rate=200)]
+
+		jv = frappe.new_doc("Journal Entry")
+		jv.posting_date = invoices[0].posting_date
+		jv.company = "_Test Company"
+		jv.fiscal_year = invoices[0].fiscal_year
+		jv.user_remark = "test"
+		jv.append("accounts", {
+			"account": "_Test Bank - _TC",
+			"debit_in_account_currency": 250
+		})
+		for si, amount in ((invoices[0], 100), (invoices[1], 150)):
+			jv.append("accounts", {
+				"account": "Debtors - _TC",
+				"party_type": "Customer",
+				"party": "_Test Customer",
+				"credit_in_account_currency": amount,
+				"reference_type": "Sales Invoice",
+				"reference_name": si.name
+			})
+		jv.submit()
+
+		self.assertEqual(frappe.db.get_value("Sales Invoice", invoices[0].name, "outstanding_amount"), 0)
+		self.assertEqual(frappe.db.get_value("Sales Invoice", invoices[1].name, "outstanding_amount"), 50)
+
+		jv.cancel()
+
+		self.assertEqual(frappe.db.get_value("Sales Invoice", invoices[0].name, "outstanding_amount"), 100)
+		self.assertEqual(frappe.db.get_value("Sales Invoice", invoices[1].name, "outstanding_amount"), 200)
@@ -425,7 +425,8 @@ $.extend(erpnext.journal_entry, {
 					reference_name: cstr(row.reference_name),
 					debit: flt(row.debit_in_account_currency),
 					credit: flt(row.credit_in_account_currency),
-					exchange_rate: row.exchange_rate
+					exchange_rate: row.exchange_rate,
+					posting_date: frm.doc.posting_date
 				},
 				callback: function(r) {
 					if(r.message) {
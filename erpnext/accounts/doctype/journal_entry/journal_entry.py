@@ -6,6 +6,7 @@ import frappe, json
 from frappe.utils import cstr, flt, fmt_money, formatdate
 from frappe import msgprint, _, scrub
 from erpnext.controllers.accounts_controller import AccountsController
+from erpnext.controllers.master_data import preload_master_data
 from erpnext.accounts.utils import get_balance_on, get_account_currency
 from erpnext.setup.utils import get_company_currency
 from erpnext.accounts.party import get_party_account
@@ -18,6 +19,8 @@ class JournalEntry(AccountsController):
 		return self.voucher_type
 
 	def validate(self):
+		preload_master_data(self)
+
 		if not self.is_opening:
 			self.is_opening='No'
 		self.clearance_date = None
@@ -298,7 +301,7 @@ class JournalEntry(AccountsController):
 			elif not d.exchange_rate or d.exchange_rate == 1 or \
 				(d.reference_type in ("Sales Invoice", "Purchase Invoice") and d.reference_name):
 					d.exchange_rate = get_exchange_rate(d.account, d.account_currency, self.company,
-						d.reference_type, d.reference_name, d.debit, d.credit, d.exchange_rate)
+						d.reference_type, d.reference_name, d.debit, d.credit, d.exchange_rate, self.posting_date)
 
 			if not d.exchange_rate:
 				frappe.throw(_("Row {0}: Exchange Rate is mandatory").format(d.idx))
@@ -358,7 +361,7 @@ class JournalEntry(AccountsController):
 		from frappe.utils import money_in_words
 		self.total_amount_in_words = money_in_words(amt, currency)
 
-	def make_gl_entries(self, cancel=0, adv_adj=0):
+	def make_gl_entries(self, cancel=0, adv_adj=0, update_outstanding="Yes"):
 		from erpnext.accounts.general_ledger import make_gl_entries
 
 		gl_map = []
@@ -383,7 +386,7 @@ class JournalEntry(AccountsController):
 				)
 
 		if gl_map:
-			make_gl_entries(gl_map, cancel=cancel, adv_adj=adv_adj)
+			make_gl_entries(gl_map, cancel=cancel, adv_adj=adv_adj, update_outstanding=update_outstanding)
 
 	def get_balance(self):
 		if not self.get('accounts'):
@@ -741,7 +744,7 @@ def get_account_balance_and_party_type(account, date, company, debit=None, credi
 		"account_type": account_details.account_type,
 		"account_currency": account_details.account_currency or company_currency,
 		"exchange_rate": get_exchange_rate(account, account_details.account_currency,
-			company, debit=debit, credit=credit, exchange_rate=exchange_rate)
+			company, debit=debit, credit=credit, exchange_rate=exchange_rate, posting_date=date)
 	}
 
 	# un-set party if not party type
@@ -752,7 +755,7 @@ def get_account_balance_and_party_type(account, date, company, debit=None, credi
 
 @frappe.whitelist()
 def get_exchange_rate(account, account_currency=None, company=None,
-		reference_type=None, reference_name=None, debit=None, credit=None, exchange_rate=None):
+		reference_type=None, reference_name=None, debit=None, credit=None, exchange_rate=None, posting_date=None):
 	from erpnext.setup.utils import get_exchange_rate
 	account_details = frappe.db.get_value("Account", account,
 		["account_type", "root_type", "account_currency", "company"], as_dict=1)
@@ -778,7 +781,7 @@ def get_exchange_rate(account, account_currency=None, company=None,
 			exchange_rate = get_average_exchange_rate(account)
 
 		if not exchange_rate and account_currency:
-			exchange_rate = get_exchange_rate(account_currency, company_currency)
+			exchange_rate = get_exchange_rate(account_currency, company_currency, posting_date)
 
 	else:
 		exchange_rate = 1
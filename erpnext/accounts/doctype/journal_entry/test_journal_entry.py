@@ -3,7 +3,7 @@
 
 from __future__ import unicode_literals
 import unittest, frappe
-from frappe.utils import flt
+from frappe.utils import flt, getdate
 from erpnext.accounts.utils import get_actual_expense, BudgetError, get_fiscal_year
 from erpnext.exceptions import InvalidAccountCurrency
 
@@ -107,6 +107,19 @@ class TestJournalEntry(unittest.TestCase):
 		self.assertTrue(frappe.db.get_value("GL Entry",
 			{"voucher_type": "Journal Entry", "voucher_no": jv.name}))
 
+	def test_monthly_expenses_for_budget(self):
+		from erpnext.accounts.utils import get_monthly_expenses
+
+		self.test_monthly_budget_crossed_ignore()
+
+		key = ("_Test Company", "_Test Cost Center - _TC", "_Test Account Cost for Goods Sold - _TC",
+			"_Test Fiscal Year 2013")
+		expenses = get_monthly_expenses([key + (getdate("2013-02-14"),)])[key]
+
+		self.assertEquals(sum([expense for month, expense in expenses if month <= getdate("2013-02-28")]),
+			get_actual_expense(frappe._dict(zip(("company", "cost_center", "account", "fiscal_year"), key),
+				month_end_date="2013-02-28")))
+
 	def test_monthly_budget_crossed_stop(self):
 		frappe.db.set_value("Company", "_Test Company", "monthly_bgt_flag", "Stop")
 
@@ -25,3 +25,9 @@ class MonthlyDistribution(Document):
 		if flt(total, 2) != 100.0:
 			frappe.throw(_("Percentage Allocation should be equal to 100%") + \
 				" ({0}%)".format(str(flt(total, 2))))
+
+	def on_update(self):
+		frappe.cache().hdel("monthly_distribution", self.name)
+
+	def on_trash(self):
+		frappe.cache().hdel("monthly_distribution", self.name)
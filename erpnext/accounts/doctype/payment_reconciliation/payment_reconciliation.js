@@ -80,6 +80,17 @@ erpnext.accounts.PaymentReconciliationController = frappe.ui.form.Controller.ext
 
 	},
 
+	allocate_payments: function() {
+		var me = this;
+		return this.frm.call({
+			doc: me.frm.doc,
+			method: 'allocate_payments',
+			callback: function(r, rt) {
+				me.set_invoice_options();
+			}
+		});
+	},
+
 	reconcile: function() {
 		var me = this;
 		return this.frm.call({
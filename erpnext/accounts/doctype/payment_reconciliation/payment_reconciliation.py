@@ -2,8 +2,9 @@
 # For license information, please see license.txt
 
 from __future__ import unicode_literals
+import re
 import frappe
-from frappe.utils import flt
+from frappe.utils import flt, cstr, getdate
 from frappe import msgprint, _
 from frappe.model.document import Document
 from erpnext.accounts.utils import get_outstanding_invoices
@@ -86,6 +87,74 @@ class PaymentReconciliation(Document):
 			ent.amount = flt(e.get('invoice_amount'))
 			ent.outstanding_amount = e.get('outstanding_amount')
 
+	def allocate_payments(self):
+		"""Allocate unreconciled payments against outstanding invoices.
+
+		Payments are first matched to invoices referred in their remark, then to invoices
+		with the same outstanding amount, and the rest are allocated to the oldest invoices first.
+		A payment allocated against multiple invoices is split into multiple rows."""
+		if not (self.get("payments") and self.get("invoices")):
+			self.get_unreconciled_entries()
+
+		invoices = sorted(self.get("invoices"), key=lambda d: (getdate(d.invoice_date), d.invoice_number))
+		outstanding = dict(((d.invoice_type, d.invoice_number), flt(d.outstanding_amount)) for d in invoices)
+
+		payments = sorted(self.get("payments"), key=lambda d: (getdate(d.posting_date), d.journal_entry))
+		unallocated = dict((p.voucher_detail_number, flt(p.amount)) for p in payments)
+		allocations = dict((p.voucher_detail_number, []) for p in payments)
+
+		def _allocate(payment, invoice, amount):
+			amount = flt(amount, self.precision("allocated_amount", "payments"))
+			if amount > 0:
+				allocations[payment.voucher_detail_number].append((invoice, amount))
+				unallocated[payment.voucher_detail_number] -= amount
+				outstanding[(invoice.invoice_type, invoice.invoice_number)] -= amount
+
+		# by reference in payment remark
+		for p in payments:
+			for inv in invoices:
+				if unallocated[p.voucher_detail_number] > 0 and is_mentioned_in(inv.invoice_number, p.remark) \
+					and outstanding[(inv.invoice_type, inv.invoice_number)] > 0:
+						_allocate(p, inv, min(unallocated[p.voucher_detail_number],
+							outstanding[(inv.invoice_type, inv.invoice_number)]))
+
+		# by amount
+		invoices_by_amount = {}
+		for inv in invoices:
+			invoices_by_amount.setdefault(outstanding[(inv.invoice_type, inv.invoice_number)], []).append(inv)
+
+		for p in payments:
+			if unallocated[p.voucher_detail_number] > 0 and not allocations[p.voucher_detail_number]:
+				for inv in invoices_by_amount.get(unallocated[p.voucher_detail_number], []):
+					if outstanding[(inv.invoice_type, inv.invoice_number)] == unallocated[p.voucher_detail_number]:
+						_allocate(p, inv, unallocated[p.voucher_detail_number])
+						break
+
+		# oldest invoice first
+		for p in payments:
+			for inv in invoices:
+				if unallocated[p.voucher_detail_number] <= 0:
+					break
+				if outstanding[(inv.invoice_type, inv.invoice_number)] > 0:
+					_allocate(p, inv, min(unallocated[p.voucher_detail_number],
+						outstanding[(inv.invoice_type, inv.invoice_number)]))
+
+		self.set("payments", [])
+		for p in payments:
+			unadjusted_amount = flt(p.amount)
+			for inv, amount in allocations[p.voucher_detail_number] or [(None, 0)]:
+				self.append("payments", {
+					"journal_entry": p.journal_entry,
+					"posting_date": p.posting_date,
+					"amount": unadjusted_amount,
+					"remark": p.remark,
+					"voucher_detail_number": p.voucher_detail_number,
+					"is_advance": p.is_advance,
+					"invoice_number": inv and (inv.invoice_type + " | " + inv.invoice_number),
+					"allocated_amount": amount
+				})
+				unadjusted_amount -= amount
+
 	def reconcile(self, args):
 		for e in self.get('payments'):
 			e.invoice_type = None
@@ -172,3 +241,9 @@ class PaymentReconciliation(Document):
 			cond += " and `{0}` <= {1}".format(dr_or_cr, flt(self.maximum_amount))
 
 		return cond
+
+def is_mentioned_in(name, remark):
+	"""Returns True if `name` appears in `remark` as a whole reference,
+	so that SINV-00012 or SINV-0001-1 do not match SINV-0001"""
+	return bool(name and re.search(r"(?<![\w\-/]){0}(?![\w\-/])".format(re.escape(name)),
+		cstr(remark), flags=re.UNICODE))
@@ -0,0 +1,17 @@
+# Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+from __future__ import unicode_literals
+import unittest
+from erpnext.accounts.doctype.payment_reconciliation.payment_reconciliation import is_mentioned_in
+
+class TestPaymentReconciliation(unittest.TestCase):
+	def test_invoice_mentioned_in_remark(self):
+		self.assertTrue(is_mentioned_in("SINV-0001", "Payment against SINV-0001"))
+		self.assertTrue(is_mentioned_in("SINV-0001", "Against SINV-0001, SINV-0002."))
+		self.assertTrue(is_mentioned_in("SINV-0001", "(SINV-0001)"))
+
+		self.assertFalse(is_mentioned_in("SINV-0001", "Payment against SINV-00012"))
+		self.assertFalse(is_mentioned_in("SINV-0001", "Payment against SINV-0001-1"))
+		self.assertFalse(is_mentioned_in("SINV-0001", "Payment against XSINV-0001"))
+		self.assertFalse(is_mentioned_in("SINV-0001", None))
@@ -39,7 +39,7 @@ class PaymentTool(Document):
 			
 			if v.payment_amount:
 				exchange_rate = get_exchange_rate(self.party_account, party_account_currency,
-					self.company, v.against_voucher_type, v.against_voucher_no)
+					self.company, v.against_voucher_type, v.against_voucher_no, posting_date=self.reference_date)
 				
 				d1 = jv.append("accounts")
 				d1.account = self.party_account
@@ -71,7 +71,8 @@ class PaymentTool(Document):
 			d2.account = self.payment_account
 			d2.account_currency = bank_account_currency
 			d2.account_type = bank_account_type
-			d2.exchange_rate = get_exchange_rate(self.payment_account, self.company)
+			d2.exchange_rate = get_exchange_rate(self.payment_account, bank_account_currency, self.company,
+				posting_date=self.reference_date)
 			d2.account_balance = get_balance_on(self.payment_account)
 		
 		amount_field_bank = 'debit_in_account_currency' if total_payment_amount < 0 \
@@ -64,7 +64,7 @@ class PeriodClosingVoucher(AccountsController):
 						if flt(acc.balance_in_account_currency) > 0 else 0,
 					"credit": abs(flt(acc.balance_in_company_currency)) \
 						if flt(acc.balance_in_company_currency) > 0 else 0
-				}))
+				}, acc.account_currency))
 
 				net_pl_balance += flt(acc.balance_in_company_currency)
 
@@ -77,19 +77,33 @@ class PeriodClosingVoucher(AccountsController):
 				"credit": abs(net_pl_balance) if net_pl_balance < 0 else 0
 			}))
 
-		from erpnext.accounts.general_ledger import make_gl_entries
-		make_gl_entries(gl_entries)
+		from erpnext.accounts.general_ledger import make_gl_entries_in_bulk
+		make_gl_entries_in_bulk(gl_entries)
 
 	def get_pl_balances(self):
-		"""Get balance for pl accounts"""
-		return frappe.db.sql("""
+		"""Get balance for pl accounts.
+
+		Ledger entries are filtered by account and posting date, so that the grouped
+		scan uses the (account, posting_date) index of GL Entry"""
+		pl_accounts = dict(frappe.db.sql("""select name, account_currency from `tabAccount`
+			where report_type = 'Profit and Loss' and is_group = 0 and docstatus < 2 and company = %s""",
+			self.company))
+
+		if not pl_accounts:
+			return []
+
+		balances = frappe.db.sql("""
 			select
-				t1.account, t2.account_currency,
-				sum(t1.debit_in_account_currency) - sum(t1.credit_in_account_currency) as balance_in_account_currency,
-				sum(t1.debit) - sum(t1.credit) as balance_in_company_currency
-			from `tabGL Entry` t1, `tabAccount` t2
-			where t1.account = t2.name and t2.report_type = 'Profit and Loss'
-			and t2.docstatus < 2 and t2.company = %s
-			and t1.posting_date between %s and %s
-			group by t1.account
-		""", (self.company, self.get("year_start_date"), self.posting_date), as_dict=1)
+				account,
+				sum(debit_in_account_currency) - sum(credit_in_account_currency) as balance_in_account_currency,
+				sum(debit) - sum(credit) as balance_in_company_currency
+			from `tabGL Entry`
+			where account in ({0}) and posting_date between %s and %s
+			group by account
+		""".format(", ".join(["%s"] * len(pl_accounts))),
+			tuple(pl_accounts.keys() + [self.get("year_start_date"), self.posting_date]), as_dict=1)
+
+		for d in balances:
+			d.account_currency = pl_accounts[d.account]
+
+		return balances
@@ -4,8 +4,9 @@
 
 from __future__ import unicode_literals
 import unittest
+import time
 import frappe
-from frappe.utils import flt, today
+from frappe.utils import cint, flt, today, add_days, date_diff
 from erpnext.accounts.utils import get_fiscal_year
 from erpnext.accounts.doctype.journal_entry.test_journal_entry import make_journal_entry
 
@@ -66,6 +67,64 @@ class TestPeriodClosingVoucher(unittest.TestCase):
 			self.assertEqual(gle_for_random_expense_account[0].amount_in_account_currency,
 				-1*random_expense_account[0].balance_in_account_currency)
 
+	def test_pl_balances_on_synthetic_ledger(self):
+		from erpnext.accounts import general_ledger
+
+		year_start_date, accounts = get_fiscal_year(today())[1], ["Sales - _TC",
+			"_Test Account Cost for Goods Sold - _TC"]
+
+		pcv = frappe.get_doc({
+			"doctype": "Period Closing Voucher",
+			"closing_account_head": "_Test Account Reserves and Surplus - _TC",
+			"company": "_Test Company",
+			"fiscal_year": get_fiscal_year(today())[0],
+			"posting_date": today(),
+			"remarks": "test"
+		})
+		pcv.year_start_date = year_start_date
+		opening = dict((d.account, d.balance_in_company_currency) for d in pcv.get_pl_balances())
+
+		generated = make_synthetic_gl_entries(accounts, year_start_date, 5000)
+		bulk_insert_size = general_ledger.bulk_insert_size
+
+		try:
+			start = time.time()
+			balances = dict((d.account, d.balance_in_company_currency) for d in pcv.get_pl_balances())
+			self.assertTrue(time.time() - start < 5)
+
+			for account in accounts:
+				self.assertEqual(flt(balances.get(account), 2),
+					flt(flt(opening.get(account)) + generated[account], 2))
+
+			# closing entries are inserted in batches, with names reserved from the GL series
+			general_ledger.bulk_insert_size = 2
+			series = get_gl_series()
+
+			pcv.insert()
+			pcv.submit()
+
+			gl_entries = frappe.db.sql("""select name, account, debit, credit from `tabGL Entry`
+				where voucher_type='Period Closing Voucher' and voucher_no=%s order by name""",
+				pcv.name, as_dict=1)
+
+			self.assertTrue(len(gl_entries) > 2)
+			self.assertEqual([d.name for d in gl_entries], ["GL{0:07d}".format(i)
+				for i in xrange(series + 1, series + len(gl_entries) + 1)])
+			self.assertEqual(get_gl_series(), series + len(gl_entries))
+
+			self.assertEqual(flt(sum([d.debit for d in gl_entries]), 2),
+				flt(sum([d.credit for d in gl_entries]), 2))
+
+			for account in accounts:
+				self.assertEqual(flt(sum([d.credit - d.debit for d in gl_entries
+					if d.account == account]), 2), flt(balances[account], 2))
+
+		finally:
+			general_ledger.bulk_insert_size = bulk_insert_size
+			if pcv.docstatus == 1:
+				pcv.cancel()
+			frappe.db.sql("delete from `tabGL Entry` where voucher_no='_T-PCV-Synthetic'")
+
 	def make_period_closing_voucher(self):
 		pcv = frappe.get_doc({
 			"doctype": "Period Closing Voucher",
@@ -80,6 +139,32 @@ class TestPeriodClosingVoucher(unittest.TestCase):
 
 		return pcv
 
+def make_synthetic_gl_entries(accounts, from_date, count):
+	"""Insert `count` GL Entries spread over the accounts and the days from `from_date` till today.
+	Returns dict of {account: debit - credit} of the inserted entries"""
+	days = max(date_diff(today(), from_date), 1)
+	fiscal_year = get_fiscal_year(today())[0]
+
+	values, balances = [], dict((account, 0) for account in accounts)
+	for i in xrange(count):
+		amount = (i % 97) + 1
+		balances[accounts[i % len(accounts)]] += amount if i % 3 else -amount
+		values.extend(["_T-PCV-Synthetic-{0:05d}".format(i), accounts[i % len(accounts)],
+			add_days(from_date, i % days), amount if i % 3 else 0, 0 if i % 3 else amount,
+			amount if i % 3 else 0, 0 if i % 3 else amount, fiscal_year])
+
+	frappe.db.sql("""insert into `tabGL Entry` (name, account, posting_date, debit, credit,
+			debit_in_account_currency, credit_in_account_currency, fiscal_year,
+			company, cost_center, voucher_type, voucher_no, docstatus)
+		values {0}""".format(", ".join(["""(%s, %s, %s, %s, %s, %s, %s, %s, '_Test Company',
+			'_Test Cost Center - _TC', 'Journal Entry', '_T-PCV-Synthetic', 1)"""] * count)),
+		tuple(values))
+
+	return balances
+
+def get_gl_series():
+	current = frappe.db.sql("select current from tabSeries where name='GL'")
+	return cint(current[0][0]) if current else 0
 
 test_dependencies = ["Customer", "Cost Center"]
 test_records = frappe.get_test_records("Period Closing Voucher")
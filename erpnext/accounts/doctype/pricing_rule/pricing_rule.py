@@ -110,16 +110,24 @@ def apply_pricing_rule(args):
 	item_list = args.get("item_list")
 	args.pop("item_list")
 
+	cache = {}
 	for item in item_list:
 		args_copy = copy.deepcopy(args)
 		args_copy.update(item)
-		out.append(get_pricing_rule_for_item(args_copy))
+		out.append(get_pricing_rule_for_item(args_copy, cache))
 
 	return out
 
-def get_pricing_rule_for_item(args):
+def get_pricing_rule_for_item(args, cache=None):
+	"""Returns the applicable Pricing Rule details for an item row.
+
+	`cache` is a dict shared between rows of the same transaction to avoid
+	repeating master and Pricing Rule lookups"""
 	if args.get("parenttype") == "Material Request": return {}
 
+	if cache is None:
+		cache = {}
+
 	item_details = frappe._dict({
 		"doctype": args.doctype,
 		"name": args.name,
@@ -130,8 +138,11 @@ def get_pricing_rule_for_item(args):
 		return item_details
 
 	if not (args.item_group and args.brand):
+		if ("Item", args.item_code) not in cache:
+			cache[("Item", args.item_code)] = frappe.db.get_value("Item", args.item_code,
+				["item_group", "brand"])
 		try:
-			args.item_group, args.brand = frappe.db.get_value("Item", args.item_code, ["item_group", "brand"])
+			args.item_group, args.brand = cache[("Item", args.item_code)]
 		except TypeError:
 			# invalid item_code
 			return item_details
@@ -139,15 +150,25 @@ def get_pricing_rule_for_item(args):
 			frappe.throw(_("Item Group not mentioned in item master for item {0}").format(args.item_code))
 
 	if args.customer and not (args.customer_group and args.territory):
-		customer = frappe.db.get_value("Customer", args.customer, ["customer_group", "territory"])
+		if ("Customer", args.customer) not in cache:
+			cache[("Customer", args.customer)] = frappe.db.get_value("Customer", args.customer,
+				["customer_group", "territory"])
+		customer = cache[("Customer", args.customer)]
 		if customer:
 			args.customer_group, args.territory = customer
 
 	elif args.supplier and not args.supplier_type:
-		args.supplier_type = frappe.db.get_value("Supplier", args.supplier, "supplier_type")
+		if ("Supplier", args.supplier) not in cache:
+			cache[("Supplier", args.supplier)] = frappe.db.get_value("Supplier", args.supplier,
+				"supplier_type")
+		args.supplier_type = cache[("Supplier", args.supplier)]
 
-	pricing_rules = get_pricing_rules(args)
-	pricing_rule = filter_pricing_rules(args, pricing_rules)
+	if not args.price_list: args.price_list = None
+	key = tuple([args.get(fieldname) for fieldname in pricing_rule_args])
+	if key not in cache:
+		cache[key] = get_pricing_rules(args)
+
+	pricing_rule = filter_pricing_rules(args, cache[key])
 
 	if pricing_rule:
 		item_details.pricing_rule = pricing_rule.name
@@ -163,6 +184,11 @@ def get_pricing_rule_for_item(args):
 
 	return item_details
 
+# args that decide which Pricing Rules are fetched for a row
+pricing_rule_args = ("item_code", "item_group", "brand", "company", "customer", "supplier",
+	"supplier_type", "campaign", "sales_partner", "customer_group", "territory", "price_list",
+	"transaction_date", "transaction_type")
+
 def get_pricing_rules(args):
 	def _get_tree_conditions(parenttype, allow_blank=True):
 		field = frappe.scrub(parenttype)
@@ -784,6 +784,38 @@ class TestSalesInvoice(unittest.TestCase):
 
 		set_perpetual_inventory(0)
 
+	def test_master_data_queries_do_not_grow_with_items(self):
+		make_stock_entry(item_code="_Test Item", target="_Test Warehouse - _TC", qty=500, basic_rate=100)
+
+		si = create_sales_invoice(qty=1, update_stock=1, do_not_save=True)
+		for i in xrange(499):
+			si.append("items", {
+				"item_code": "_Test Item",
+				"warehouse": "_Test Warehouse - _TC",
+				"qty": 1,
+				"rate": 100,
+				"income_account": "Sales - _TC",
+				"expense_account": "Cost of Goods Sold - _TC",
+				"cost_center": "_Test Cost Center - _TC"
+			})
+
+		queries = []
+		sql = frappe.db.sql
+		def count_queries(query, *args, **kwargs):
+			queries.append(query)
+			return sql(query, *args, **kwargs)
+
+		frappe.db.sql = count_queries
+		try:
+			si.insert()
+			si.submit()
+		finally:
+			frappe.db.sql = sql
+
+		# item masters are fetched once per validate, not once per row
+		for pattern in ("max_discount", "is_sales_item", "`tabProduct Bundle`"):
+			self.assertTrue(len([q for q in queries if pattern in q]) <= 2)
+
 	def test_discount_on_net_total(self):
 		si = frappe.copy_doc(test_records[2])
 		si.apply_discount_on = "Net Total"
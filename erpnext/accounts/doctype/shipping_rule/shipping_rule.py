@@ -28,6 +28,12 @@ class ShippingRule(Document):
 		elif not len([d.country for d in self.countries if d.country]):
 			frappe.throw(_("Please specify a country for this Shipping Rule or check Worldwide Shipping"))
 
+	def on_update(self):
+		frappe.cache().hdel("shipping_rule_conditions", self.name)
+
+	def on_trash(self):
+		frappe.cache().hdel("shipping_rule_conditions", self.name)
+
 	def validate_from_to_values(self):
 		zero_to_values = []
 
@@ -85,3 +91,15 @@ class ShippingRule(Document):
 					_("and") + " %s-%s = %s" % (d2.from_value, d2.to_value, fmt_money(d2.shipping_amount, currency=company_currency)))
 
 			msgprint("\n".join(messages), raise_exception=OverlappingConditionError)
+
+def get_shipping_rule_conditions(shipping_rule):
+	"""Returns cached (from_value, to_value) of conditions in the order they are applied"""
+	return frappe.cache().hget("shipping_rule_conditions", shipping_rule,
+		lambda: [(flt(d.from_value), flt(d.to_value))
+			for d in frappe.get_doc("Shipping Rule", shipping_rule).get("conditions")])
+
+def get_applicable_condition(shipping_rule, value):
+	"""Returns index of the condition applicable for `value`"""
+	for i, (from_value, to_value) in enumerate(get_shipping_rule_conditions(shipping_rule)):
+		if not to_value or (from_value <= value <= to_value):
+			return i
@@ -3,14 +3,17 @@
 
 from __future__ import unicode_literals
 import frappe
-from frappe.utils import flt, cstr, cint
+from frappe.utils import flt, cstr, cint, now
 from frappe import _
 from frappe.model.meta import get_field_precision
-from erpnext.accounts.utils import validate_expense_against_budget
+from erpnext.accounts.utils import validate_expenses_against_budget
 
 
 class StockAccountInvalidTransaction(frappe.ValidationError): pass
 
+# number of GL Entries inserted by one query in `make_gl_entries_in_bulk`
+bulk_insert_size = 500
+
 def make_gl_entries(gl_map, cancel=False, adv_adj=False, merge_entries=True, update_outstanding='Yes'):
 	if gl_map:
 		if not cancel:
@@ -79,13 +82,121 @@ def check_if_in_list(gle, gl_map):
 				return e
 
 def save_entries(gl_map, adv_adj, update_outstanding):
+	from erpnext.accounts.doctype.gl_entry.gl_entry import update_outstanding_amt_for_vouchers, \
+		get_outstanding_keys
+
 	validate_account_for_auto_accounting_for_stock(gl_map)
 	round_off_debit_credit(gl_map)
 
 	for entry in gl_map:
-		make_entry(entry, adv_adj, update_outstanding)
-		# check against budget
-		validate_expense_against_budget(entry)
+		# outstanding amount is updated for all entries together, after posting
+		make_entry(entry, adv_adj, "No")
+
+	# check against budget
+	validate_expenses_against_budget(gl_map)
+
+	if update_outstanding == 'Yes':
+		update_outstanding_amt_for_vouchers(get_outstanding_keys(gl_map))
+
+def make_gl_entries_in_bulk(gl_map, adv_adj=False):
+	"""Post GL Entries of a voucher with one insert per batch of rows.
+
+	For vouchers with many lines and no party or against voucher, like the
+	Period Closing Voucher. Accounts are validated together, in one query."""
+	from erpnext.accounts.doctype.gl_entry.gl_entry import validate_balance_type
+
+	gl_map = process_gl_map(gl_map)
+	if not gl_map or len(gl_map) < 2:
+		frappe.throw(_("Incorrect number of General Ledger Entries found. You might have selected a wrong Account in the transaction."))
+
+	round_off_debit_credit(gl_map)
+	accounts = validate_accounts_for_bulk_entries(gl_map, adv_adj)
+
+	names = get_gl_entry_names(len(gl_map))
+	for i in xrange(0, len(gl_map), bulk_insert_size):
+		insert_gl_entries(gl_map[i:i + bulk_insert_size], names[i:i + bulk_insert_size])
+
+	for account in accounts.values():
+		if account.balance_must_be:
+			validate_balance_type(account.name, adv_adj)
+
+	validate_expenses_against_budget(gl_map)
+
+def validate_accounts_for_bulk_entries(gl_map, adv_adj):
+	"""Run ledger, company, frozen and currency checks of GL Entry for all accounts together"""
+	from erpnext.accounts.doctype.gl_entry.gl_entry import check_freezing_date, validate_frozen_account
+	from erpnext.setup.doctype.company.company import get_company_currency
+	from erpnext.exceptions import InvalidAccountCurrency
+
+	check_freezing_date(gl_map[0].posting_date, adv_adj)
+	company_currency = get_company_currency(gl_map[0].company)
+
+	account_names = list(set([d.account for d in gl_map]))
+	accounts = dict((d.name, d) for d in frappe.db.sql("""select name, is_group, docstatus, company,
+			freeze_account, account_currency, balance_must_be
+		from tabAccount where name in ({0})""".format(", ".join(["%s"] * len(account_names))),
+		tuple(account_names), as_dict=1))
+
+	for entry in gl_map:
+		account = accounts.get(entry.account)
+		if not account:
+			frappe.throw(_("Account {0} does not exist").format(entry.account))
+
+		if account.is_group==1:
+			frappe.throw(_("Account {0} cannot be a Group").format(entry.account))
+
+		if account.docstatus==2:
+			frappe.throw(_("Account {0} is inactive").format(entry.account))
+
+		if account.company != entry.company:
+			frappe.throw(_("Account {0} does not belong to Company {1}").format(entry.account, entry.company))
+
+		if account.freeze_account == "Yes":
+			validate_frozen_account(entry.account, adv_adj)
+
+		if not entry.account_currency:
+			entry.account_currency = company_currency
+
+		if (account.account_currency or company_currency) != entry.account_currency:
+			frappe.throw(_("Accounting Entry for {0} can only be made in currency: {1}")
+				.format(entry.account, (account.account_currency or company_currency)), InvalidAccountCurrency)
+
+	return accounts
+
+def get_gl_entry_names(count):
+	"""Reserve `count` consecutive names of the GL Entry series (GL.#######)"""
+	current = frappe.db.sql("select current from tabSeries where name='GL' for update")
+	if current and current[0][0] is not None:
+		current = cint(current[0][0])
+		frappe.db.sql("update tabSeries set current = current + %s where name='GL'", count)
+	else:
+		current = 0
+		frappe.db.sql("insert into tabSeries (name, current) values ('GL', %s)", count)
+
+	return ["GL{0:07d}".format(i) for i in xrange(current + 1, current + count + 1)]
+
+def insert_gl_entries(gl_map, names):
+	"""Insert submitted GL Entries in a single query"""
+	modified, user = now(), frappe.session.user
+
+	rows = []
+	for name, entry in zip(names, gl_map):
+		gle = frappe.get_doc(dict(entry, doctype="GL Entry"))
+		gle.update({
+			"name": name,
+			"docstatus": 1,
+			"owner": user,
+			"modified_by": user,
+			"creation": modified,
+			"modified": modified
+		})
+		rows.append(gle.get_valid_dict())
+
+	columns = rows[0].keys()
+	frappe.db.sql("""insert into `tabGL Entry` ({columns}) values {values}""".format(
+		columns=", ".join(["`{0}`".format(c) for c in columns]),
+		values=", ".join(["({0})".format(", ".join(["%s"] * len(columns)))] * len(rows))),
+		tuple([row.get(c) for row in rows for c in columns]))
 
 def make_entry(args, adv_adj, update_outstanding):
 	args.update({"doctype": "GL Entry"})
@@ -157,7 +268,8 @@ def delete_gl_entries(gl_entries=None, voucher_type=None, voucher_no=None,
 		adv_adj=False, update_outstanding="Yes"):
 
 	from erpnext.accounts.doctype.gl_entry.gl_entry import validate_balance_type, \
-		check_freezing_date, update_outstanding_amt, validate_frozen_account
+		check_freezing_date, validate_frozen_account, update_outstanding_amt_for_vouchers, \
+		get_outstanding_keys
 
 	if not gl_entries:
 		gl_entries = frappe.db.sql("""select * from `tabGL Entry`
@@ -171,8 +283,8 @@ def delete_gl_entries(gl_entries=None, voucher_type=None, voucher_no=None,
 	for entry in gl_entries:
 		validate_frozen_account(entry["account"], adv_adj)
 		validate_balance_type(entry["account"], adv_adj)
-		validate_expense_against_budget(entry)
 
-		if entry.get("against_voucher") and update_outstanding == 'Yes':
-			update_outstanding_amt(entry["account"], entry.get("party_type"), entry.get("party"), entry.get("against_voucher_type"),
-				entry.get("against_voucher"), on_cancel=True)
+	validate_expenses_against_budget(gl_entries)
+
+	if update_outstanding == 'Yes':
+		update_outstanding_amt_for_vouchers(get_outstanding_keys(gl_entries), on_cancel=True)
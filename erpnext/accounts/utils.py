@@ -3,8 +3,9 @@
 
 from __future__ import unicode_literals
 
+import bisect
 import frappe
-from frappe.utils import nowdate, cstr, flt, now, getdate, add_months
+from frappe.utils import nowdate, cstr, flt, now, getdate, add_months, get_last_day
 from frappe import throw, _
 from frappe.utils import formatdate
 import frappe.desk.reportview
@@ -20,29 +21,73 @@ def get_fiscal_year(date=None, fiscal_year=None, label="Date", verbose=1, compan
 	return get_fiscal_years(date, fiscal_year, label, verbose, company)[0]
 
 def get_fiscal_years(transaction_date=None, fiscal_year=None, label="Date", verbose=1, company=None):
-	# if year start date is 2012-04-01, year end date should be 2013-03-31 (hence subdate)
-	cond = " disabled = 0"
+	intervals = get_fiscal_year_intervals()
+
 	if fiscal_year:
-		cond += " and fy.name = %(fiscal_year)s"
+		years = [d for d in intervals.years if d.name == fiscal_year]
+	elif transaction_date:
+		years = find_fiscal_years(intervals, getdate(transaction_date))
 	else:
-		cond += " and %(transaction_date)s >= fy.year_start_date and %(transaction_date)s <= fy.year_end_date"
+		years = []
 
 	if company:
-		cond += """ and (not exists(select name from `tabFiscal Year Company` fyc where fyc.parent = fy.name)
-			or exists(select company from `tabFiscal Year Company` fyc where fyc.parent = fy.name and fyc.company=%(company)s ))"""
-
-	fy = frappe.db.sql("""select fy.name, fy.year_start_date, fy.year_end_date from `tabFiscal Year` fy
-		where %s order by fy.year_start_date desc""" % cond, {
-			"fiscal_year": fiscal_year,
-			"transaction_date": transaction_date,
-			"company": company
-		})
+		years = [d for d in years if not d.companies or company in d.companies]
 
-	if not fy:
+	if not years:
 		error_msg = _("""{0} {1} not in any active Fiscal Year. For more details check {2}.""").format(label, formatdate(transaction_date), "https://erpnext.com/kb/accounts/fiscal-year-error")
 		if verbose==1: frappe.msgprint(error_msg)
 		raise FiscalYearError, error_msg
-	return fy
+
+	return [(d.name, d.year_start_date, d.year_end_date) for d in years]
+
+def get_fiscal_year_intervals():
+	"""Returns active fiscal years sorted by start date, loaded once per request
+	from cache and once from the database till a Fiscal Year is changed"""
+	if getattr(frappe.local, "fiscal_year_intervals", None) is None:
+		intervals = frappe.cache().get_value("fiscal_year_intervals")
+		if intervals is None:
+			intervals = build_fiscal_year_intervals()
+			frappe.cache().set_value("fiscal_year_intervals", intervals)
+
+		frappe.local.fiscal_year_intervals = intervals
+
+	return frappe.local.fiscal_year_intervals
+
+def build_fiscal_year_intervals():
+	companies = {}
+	for parent, company in frappe.db.sql("""select parent, company
+		from `tabFiscal Year Company`"""):
+		companies.setdefault(parent, []).append(company)
+
+	years = frappe.db.sql("""select name, year_start_date, year_end_date from `tabFiscal Year`
+		where disabled = 0 order by year_start_date asc""", as_dict=True)
+
+	for d in years:
+		d.companies = companies.get(d.name, [])
+
+	return frappe._dict({
+		"years": years,
+		"start_dates": [d.year_start_date for d in years],
+		"max_days": max([(d.year_end_date - d.year_start_date).days for d in years] or [0])
+	})
+
+def find_fiscal_years(intervals, date):
+	"""Returns fiscal years containing `date`, latest start date first"""
+	years = []
+
+	# years starting on or before the date, only those starting within the longest
+	# fiscal year's length can end on or after it
+	i = bisect.bisect_right(intervals.start_dates, date) - 1
+	while i >= 0 and (date - intervals.start_dates[i]).days <= intervals.max_days:
+		if intervals.years[i].year_end_date >= date:
+			years.append(intervals.years[i])
+		i -= 1
+
+	return years
+
+def clear_fiscal_year_cache():
+	frappe.cache().delete_value("fiscal_year_intervals")
+	frappe.local.fiscal_year_intervals = None
 
 def validate_fiscal_year(date, fiscal_year, label=_("Date"), doc=None):
 	years = [f[0] for f in get_fiscal_years(date, label=label)]
@@ -155,23 +200,56 @@ def add_cc(args=None):
 def reconcile_against_document(args):
 	"""
 		Cancel JV, Update aginst document, split if required and resubmit jv
+
+		Allocations are grouped by Journal Entry, so that GL Entries of each JV are
+		reposted once and outstanding amount of each invoice is updated once
 	"""
+	from erpnext.accounts.doctype.gl_entry.gl_entry import update_outstanding_amt_for_vouchers, \
+		get_outstanding_keys
+
+	check_if_jv_modified(args)
+
+	jv_allocations = {}
 	for d in args:
-		check_if_jv_modified(d)
 		validate_allocated_amount(d)
+		if d['voucher_no'] not in jv_allocations:
+			jv_allocations[d['voucher_no']] = []
+		jv_allocations[d['voucher_no']].append(d)
+
+	outstanding_keys = []
+	for voucher_no in sorted(jv_allocations):
+		jv_obj = frappe.get_doc('Journal Entry', voucher_no)
+		outstanding_keys += get_outstanding_keys(get_jv_references(jv_obj))
 
 		# cancel JV
-		jv_obj = frappe.get_doc('Journal Entry', d['voucher_no'])
+		jv_obj.make_gl_entries(cancel=1, adv_adj=1, update_outstanding="No")
 
-		jv_obj.make_gl_entries(cancel=1, adv_adj=1)
+		# update ref in JV Detail, partially adjusted rows are split
+		# and next allocation against the same row is made from the balance row
+		balance_rows = {}
+		for d in jv_allocations[voucher_no]:
+			jv_detail = balance_rows.get(d["voucher_detail_no"]) \
+				or jv_obj.get("accounts", {"name": d["voucher_detail_no"]})[0]
+			balance_rows[d["voucher_detail_no"]] = update_against_doc(d, jv_obj, jv_detail, save=False)
 
-		# update ref in JV Detail
-		update_against_doc(d, jv_obj)
+		# will work as update after submit
+		jv_obj.flags.ignore_validate_update_after_submit = True
+		jv_obj.save()
 
 		# re-submit JV
-		jv_obj = frappe.get_doc('Journal Entry', d['voucher_no'])
-		jv_obj.make_gl_entries(cancel = 0, adv_adj =1)
+		jv_obj.make_gl_entries(cancel = 0, adv_adj =1, update_outstanding="No")
+		outstanding_keys += get_outstanding_keys(get_jv_references(jv_obj))
 
+	update_outstanding_amt_for_vouchers(list(set(outstanding_keys)))
+
+def get_jv_references(jv_obj):
+	return [frappe._dict({
+		"account": d.account,
+		"party_type": d.party_type,
+		"party": d.party,
+		"against_voucher_type": d.reference_type,
+		"against_voucher": d.reference_name
+	}) for d in jv_obj.get("accounts")]
 
 def check_if_jv_modified(args):
 	"""
@@ -179,16 +257,26 @@ def check_if_jv_modified(args):
 		check if amount is same
 		check if jv is submitted
 	"""
-	ret = frappe.db.sql("""
-		select t2.{dr_or_cr} from `tabJournal Entry` t1, `tabJournal Entry Account` t2
-		where t1.name = t2.parent and t2.account = %(account)s
-		and t2.party_type = %(party_type)s and t2.party = %(party)s
-		and (t2.reference_type is null or t2.reference_type in ("", "Sales Order", "Purchase Order"))
-		and t1.name = %(voucher_no)s and t2.name = %(voucher_detail_no)s
-		and t1.docstatus=1 """.format(dr_or_cr = args.get("dr_or_cr")), args)
+	if isinstance(args, dict):
+		args = [args]
+
+	jv_details = {}
+	voucher_detail_nos = list(set([d["voucher_detail_no"] for d in args]))
+	if voucher_detail_nos:
+		for d in frappe.db.sql("""
+			select t1.name as voucher_no, t2.name as voucher_detail_no, t2.account, t2.party_type, t2.party
+			from `tabJournal Entry` t1, `tabJournal Entry Account` t2
+			where t1.name = t2.parent
+			and (t2.reference_type is null or t2.reference_type in ("", "Sales Order", "Purchase Order"))
+			and t2.name in ({0}) and t1.docstatus=1""".format(", ".join(["%s"] * len(voucher_detail_nos))),
+			tuple(voucher_detail_nos), as_dict=1):
+				jv_details[d.voucher_detail_no] = d
 
-	if not ret:
-		throw(_("""Payment Entry has been modified after you pulled it. Please pull it again."""))
+	for d in args:
+		jv_detail = jv_details.get(d["voucher_detail_no"])
+		if not jv_detail or jv_detail.voucher_no != d["voucher_no"] or jv_detail.account != d["account"] \
+			or jv_detail.party_type != d["party_type"] or jv_detail.party != d["party"]:
+				throw(_("""Payment Entry has been modified after you pulled it. Please pull it again."""))
 
 def validate_allocated_amount(args):
 	if args.get("allocated_amt") < 0:
@@ -196,11 +284,15 @@ def validate_allocated_amount(args):
 	elif args.get("allocated_amt") > args.get("unadjusted_amt"):
 		throw(_("Allocated amount can not greater than unadusted amount"))
 
-def update_against_doc(d, jv_obj):
+def update_against_doc(d, jv_obj, jv_detail=None, save=True):
 	"""
 		Updates against document, if partial amount splits into rows
+
+		Returns the new row with balance amount, if split
 	"""
-	jv_detail = jv_obj.get("accounts", {"name": d["voucher_detail_no"]})[0]
+	if not jv_detail:
+		jv_detail = jv_obj.get("accounts", {"name": d["voucher_detail_no"]})[0]
+
 	jv_detail.set(d["dr_or_cr"], d["allocated_amt"])
 	jv_detail.set('debit' if d['dr_or_cr']=='debit_in_account_currency' else 'credit',
 		d["allocated_amt"]*flt(jv_detail.exchange_rate))
@@ -211,26 +303,21 @@ def update_against_doc(d, jv_obj):
 	jv_detail.set("reference_type", d["against_voucher_type"])
 	jv_detail.set("reference_name", d["against_voucher"])
 
+	ch = None
 	if d['allocated_amt'] < d['unadjusted_amt']:
-		jvd = frappe.db.sql("""
-			select cost_center, balance, against_account, is_advance,
-				account_type, exchange_rate, account_currency
-			from `tabJournal Entry Account` where name = %s
-		""", d['voucher_detail_no'], as_dict=True)
-
 		amount_in_account_currency = flt(d['unadjusted_amt']) - flt(d['allocated_amt'])
-		amount_in_company_currency = amount_in_account_currency * flt(jvd[0]['exchange_rate'])
+		amount_in_company_currency = amount_in_account_currency * flt(jv_detail.exchange_rate)
 
 		# new entry with balance amount
 		ch = jv_obj.append("accounts")
 		ch.account = d['account']
-		ch.account_type = jvd[0]['account_type']
-		ch.account_currency = jvd[0]['account_currency']
-		ch.exchange_rate = jvd[0]['exchange_rate']
+		ch.account_type = jv_detail.account_type
+		ch.account_currency = jv_detail.account_currency
+		ch.exchange_rate = jv_detail.exchange_rate
 		ch.party_type = d["party_type"]
 		ch.party = d["party"]
-		ch.cost_center = cstr(jvd[0]["cost_center"])
-		ch.balance = flt(jvd[0]["balance"])
+		ch.cost_center = cstr(jv_detail.cost_center)
+		ch.balance = flt(jv_detail.balance)
 
 		ch.set(d['dr_or_cr'], amount_in_account_currency)
 		ch.set('debit' if d['dr_or_cr']=='debit_in_account_currency' else 'credit', amount_in_company_currency)
@@ -239,15 +326,18 @@ def update_against_doc(d, jv_obj):
 			else 'debit_in_account_currency', 0)
 		ch.set('credit' if d['dr_or_cr']== 'debit_in_account_currency' else 'debit', 0)
 
-		ch.against_account = cstr(jvd[0]["against_account"])
+		ch.against_account = cstr(jv_detail.against_account)
 		ch.reference_type = original_reference_type
 		ch.reference_name = original_reference_name
-		ch.is_advance = cstr(jvd[0]["is_advance"])
+		ch.is_advance = cstr(jv_detail.is_advance)
 		ch.docstatus = 1
 
-	# will work as update after submit
-	jv_obj.flags.ignore_validate_update_after_submit = True
-	jv_obj.save()
+	if save:
+		# will work as update after submit
+		jv_obj.flags.ignore_validate_update_after_submit = True
+		jv_obj.save()
+
+	return ch
 
 def remove_against_link_from_jv(ref_type, ref_no):
 	linked_jv = frappe.db.sql_list("""select parent from `tabJournal Entry Account`
@@ -296,7 +386,9 @@ def fix_total_debit_credit():
 				(d.diff, d.voucher_type, d.voucher_no))
 
 def get_stock_and_account_difference(account_list=None, posting_date=None):
-	from erpnext.stock.utils import get_stock_value_on
+	"""Returns {account: stock value - account balance} of warehouse accounts that are out of sync.
+	Balances and stock values of all the accounts are fetched together, in one query each."""
+	from erpnext.stock.utils import get_stock_values_on
 
 	if not posting_date: posting_date = nowdate()
 
@@ -306,57 +398,127 @@ def get_stock_and_account_difference(account_list=None, posting_date=None):
 		where account_type = 'Warehouse' and (warehouse is not null and warehouse != '')
 		and name in (%s)""" % ', '.join(['%s']*len(account_list)), account_list))
 
+	if not account_warehouse:
+		return difference
+
+	account_balances = get_account_balances(account_warehouse.keys(), posting_date)
+	stock_values = get_stock_values_on(account_warehouse.values(), posting_date)
+
 	for account, warehouse in account_warehouse.items():
-		account_balance = get_balance_on(account, posting_date, in_account_currency=False)
-		stock_value = get_stock_value_on(warehouse, posting_date)
+		account_balance = account_balances.get(account)
+		stock_value = stock_values.get(warehouse)
 		if abs(flt(stock_value) - flt(account_balance)) > 0.005:
 			difference.setdefault(account, flt(stock_value) - flt(account_balance))
 
 	return difference
 
+def get_account_balances(accounts, posting_date):
+	"""Returns {account: balance in company currency} of ledger accounts on `posting_date`"""
+	return dict(frappe.db.sql("""select account, sum(debit) - sum(credit)
+		from `tabGL Entry` where account in ({0}) and posting_date <= %s
+		group by account""".format(", ".join(["%s"] * len(accounts))),
+		tuple(list(accounts) + [posting_date])))
+
 def validate_expense_against_budget(args):
-	args = frappe._dict(args)
-	if frappe.db.get_value("Account", {"name": args.account, "root_type": "Expense"}):
-			budget = frappe.db.sql("""
-				select bd.budget_allocated, cc.distribution_id
-				from `tabCost Center` cc, `tabBudget Detail` bd
-				where cc.name=bd.parent and cc.name=%s and account=%s and bd.fiscal_year=%s
-			""", (args.cost_center, args.account, args.fiscal_year), as_dict=True)
-
-			if budget and budget[0].budget_allocated:
-				yearly_action, monthly_action = frappe.db.get_value("Company", args.company,
-					["yearly_bgt_flag", "monthly_bgt_flag"])
-				action_for = action = ""
-
-				if monthly_action in ["Stop", "Warn"]:
-					budget_amount = get_allocated_budget(budget[0].distribution_id,
-						args.posting_date, args.fiscal_year, budget[0].budget_allocated)
-
-					args["month_end_date"] = frappe.db.sql("select LAST_DAY(%s)",
-						args.posting_date)[0][0]
-					action_for, action = _("Monthly"), monthly_action
-
-				elif yearly_action in ["Stop", "Warn"]:
-					budget_amount = budget[0].budget_allocated
-					action_for, action = _("Annual"), yearly_action
-
-				if action_for:
-					actual_expense = get_actual_expense(args)
-					if actual_expense > budget_amount:
-						frappe.msgprint(_("{0} budget for Account {1} against Cost Center {2} will exceed by {3}").format(
-							_(action_for), args.account, args.cost_center, cstr(actual_expense - budget_amount)))
-						if action=="Stop":
-							raise BudgetError
+	validate_expenses_against_budget([args])
+
+def validate_expenses_against_budget(gl_entries):
+	"""Validate expense entries of a voucher against budgets of their cost centers.
+	Entries are checked together, with actual expenses of all of them fetched in one query."""
+	gl_entries = [frappe._dict(d) for d in gl_entries if d.get("account") and d.get("cost_center")]
+	if not gl_entries:
+		return
+
+	expense_accounts = frappe.db.sql_list("""select name from tabAccount
+		where root_type='Expense' and name in ({0})""".format(", ".join(["%s"] * len(gl_entries))),
+		tuple([d.account for d in gl_entries]))
+
+	# budget to be checked for each (company, cost center, account, fiscal year, posting date)
+	budgets = {}
+	for d in gl_entries:
+		if d.account in expense_accounts:
+			budget = get_budget_allocations(d.cost_center).get((d.account, d.fiscal_year))
+			if budget and budget.budget_allocated:
+				budgets.setdefault((d.company, d.cost_center, d.account, d.fiscal_year,
+					getdate(d.posting_date)), budget)
+
+	if not budgets:
+		return
+
+	budget_actions = {}
+	for company in set([key[0] for key in budgets]):
+		budget_actions[company] = frappe.db.get_value("Company", company,
+			["yearly_bgt_flag", "monthly_bgt_flag"])
+
+	monthly_expenses = get_monthly_expenses(budgets.keys())
+
+	for (company, cost_center, account, fiscal_year, posting_date), budget in sorted(budgets.items()):
+		yearly_action, monthly_action = budget_actions[company]
+		action_for = action = month_end_date = None
+
+		if monthly_action in ["Stop", "Warn"]:
+			budget_amount = get_allocated_budget(budget.distribution_id,
+				posting_date, fiscal_year, budget.budget_allocated)
+
+			month_end_date = get_last_day(posting_date)
+			action_for, action = _("Monthly"), monthly_action
+
+		elif yearly_action in ["Stop", "Warn"]:
+			budget_amount = budget.budget_allocated
+			action_for, action = _("Annual"), yearly_action
+
+		if action_for:
+			actual_expense = flt(sum([expense for month, expense
+				in monthly_expenses.get((company, cost_center, account, fiscal_year), [])
+				if not month_end_date or month <= month_end_date]))
+
+			if actual_expense > budget_amount:
+				frappe.msgprint(_("{0} budget for Account {1} against Cost Center {2} will exceed by {3}").format(
+					_(action_for), account, cost_center, cstr(actual_expense - budget_amount)))
+				if action=="Stop":
+					raise BudgetError
+
+def get_budget_allocations(cost_center):
+	"""Returns cached budgets of the cost center as {(account, fiscal_year): budget}"""
+	def _get():
+		budgets = {}
+		for d in frappe.db.sql("""select bd.account, bd.fiscal_year, bd.budget_allocated, cc.distribution_id
+			from `tabCost Center` cc, `tabBudget Detail` bd
+			where cc.name=bd.parent and cc.name=%s""", cost_center, as_dict=True):
+			budgets.setdefault((d.account, d.fiscal_year), d)
+
+		return budgets
+
+	return frappe.cache().hget("budget_allocations", cost_center, _get)
+
+def get_monthly_expenses(keys):
+	"""Returns actual expense per month till date for each (company, cost center, account, fiscal year)
+	as {key: [(month_end_date, expense)]}"""
+	companies, cost_centers, accounts, fiscal_years = [list(set(values)) for values in zip(*keys)[:4]]
+
+	def get_placeholders(values):
+		return ", ".join(["%s"] * len(values))
+
+	expenses = {}
+	for d in frappe.db.sql("""select company, cost_center, account, fiscal_year,
+			last_day(posting_date) as month_end_date, sum(debit) - sum(credit) as expense
+		from `tabGL Entry`
+		where company in ({0}) and cost_center in ({1}) and account in ({2}) and fiscal_year in ({3})
+		group by company, cost_center, account, fiscal_year, last_day(posting_date)""".format(
+			get_placeholders(companies), get_placeholders(cost_centers),
+			get_placeholders(accounts), get_placeholders(fiscal_years)),
+		tuple(companies + cost_centers + accounts + fiscal_years), as_dict=True):
+
+		expenses.setdefault((d.company, d.cost_center, d.account, d.fiscal_year), [])\
+			.append((getdate(d.month_end_date), flt(d.expense)))
+
+	return expenses
 
 def get_allocated_budget(distribution_id, posting_date, fiscal_year, yearly_budget):
 	if distribution_id:
-		distribution = {}
-		for d in frappe.db.sql("""select mdp.month, mdp.percentage_allocation
-			from `tabMonthly Distribution Percentage` mdp, `tabMonthly Distribution` md
-			where mdp.parent=md.name and md.fiscal_year=%s""", fiscal_year, as_dict=1):
-				distribution.setdefault(d.month, d.percentage_allocation)
+		distribution = get_monthly_distribution(distribution_id)
 
-	dt = frappe.db.get_value("Fiscal Year", fiscal_year, "year_start_date")
+	dt = frappe.db.get_value("Fiscal Year", fiscal_year, "year_start_date", cache=True)
 	budget_percentage = 0.0
 
 	while(dt <= getdate(posting_date)):
@@ -369,6 +531,18 @@ def get_allocated_budget(distribution_id, posting_date, fiscal_year, yearly_budg
 
 	return yearly_budget * budget_percentage / 100
 
+def get_monthly_distribution(distribution_id):
+	"""Returns cached percentage allocation per month of the Monthly Distribution"""
+	def _get():
+		distribution = {}
+		for d in frappe.db.sql("""select month, percentage_allocation
+			from `tabMonthly Distribution Percentage` where parent=%s""", distribution_id, as_dict=1):
+				distribution.setdefault(d.month, flt(d.percentage_allocation))
+
+		return distribution
+
+	return frappe.cache().hget("monthly_distribution", distribution_id, _get)
+
 def get_actual_expense(args):
 	args["condition"] = " and posting_date<='%s'" % args.month_end_date \
 		if args.get("month_end_date") else ""
@@ -10,6 +10,7 @@ from erpnext.accounts.utils import get_fiscal_year, validate_fiscal_year, get_ac
 from erpnext.utilities.transaction_base import TransactionBase
 from erpnext.controllers.recurring_document import convert_to_recurring, validate_recurring_document
 from erpnext.controllers.sales_and_purchase_return import validate_return
+from erpnext.controllers.master_data import preload_master_data
 from erpnext.accounts.party import get_party_account_currency
 from erpnext.exceptions import CustomerFrozen, InvalidCurrency
 
@@ -27,6 +28,8 @@ class AccountsController(TransactionBase):
 		return self.__company_currency
 
 	def validate(self):
+		preload_master_data(self)
+
 		if self.get("_action") and self._action != "update_after_submit":
 			self.set_missing_values(for_validate=True)
 		self.validate_date_with_fiscal_year()
@@ -104,6 +107,9 @@ class AccountsController(TransactionBase):
 		elif self.doctype == "Purchase Invoice":
 			validate_due_date(self.posting_date, self.due_date, "Supplier", self.supplier, self.company)
 
+	def get_transaction_date(self):
+		return self.get("posting_date") or self.get("transaction_date")
+
 	def set_price_list_currency(self, buying_or_selling):
 		if self.meta.get_field("currency"):
 			# price list part
@@ -118,7 +124,7 @@ class AccountsController(TransactionBase):
 
 				elif not self.plc_conversion_rate:
 					self.plc_conversion_rate = get_exchange_rate(
-						self.price_list_currency, self.company_currency)
+						self.price_list_currency, self.company_currency, self.get_transaction_date())
 
 			# currency
 			if not self.currency:
@@ -128,17 +134,27 @@ class AccountsController(TransactionBase):
 				self.conversion_rate = 1.0
 			elif not self.conversion_rate:
 				self.conversion_rate = get_exchange_rate(self.currency,
-					self.company_currency)
+					self.company_currency, self.get_transaction_date())
+
+	def set_missing_item_details(self, items=None):
+		"""set missing item values
+
+		:param items: Rows to be updated, all rows if not set"""
+		from erpnext.stock.get_item_details import get_item_details_for_rows
+
+		if items is None:
+			# rows already updated by the caller, e.g. shopping cart
+			if self.flags.ignore_item_details:
+				return
+
+			items = self.get("items")
 
-	def set_missing_item_details(self):
-		"""set missing item values"""
-		from erpnext.stock.get_item_details import get_item_details
-		
 		if self.doctype == "Purchase Invoice":
 			auto_accounting_for_stock = cint(frappe.defaults.get_global_default("auto_accounting_for_stock"))
 
 			if auto_accounting_for_stock:
 				stock_not_billed_account = self.get_company_default("stock_received_but_not_billed")
+				delivered_by_supplier = self.get_po_items_delivered_by_supplier()
 				
 			stock_items = self.get_stock_items()
 
@@ -147,7 +163,8 @@ class AccountsController(TransactionBase):
 			for fieldname in self.meta.get_valid_columns():
 				parent_dict[fieldname] = self.get(fieldname)
 
-			for item in self.get("items"):
+			rows, args_list = [], []
+			for item in items:
 				if item.get("item_code"):
 					args = parent_dict.copy()
 					args.update(item.as_dict())
@@ -157,36 +174,37 @@ class AccountsController(TransactionBase):
 					if self.get("is_subcontracted"):
 						args["is_subcontracted"] = self.is_subcontracted
 
-					ret = get_item_details(args)
-
-					for fieldname, value in ret.items():
-						if item.meta.get_field(fieldname) and value is not None:
-							if (item.get(fieldname) is None or fieldname in force_item_fields):
-								item.set(fieldname, value)
-
-							elif fieldname == "cost_center" and not item.get("cost_center"):
-								item.set(fieldname, value)
-
-							elif fieldname == "conversion_factor" and not item.get("conversion_factor"):
-								item.set(fieldname, value)
-
-					if ret.get("pricing_rule"):
-						item.set("discount_percentage", ret.get("discount_percentage"))
-						if ret.get("pricing_rule_for") == "Price":
-							item.set("pricing_list_rate", ret.get("pricing_list_rate"))
-
-						if item.price_list_rate:
-							item.rate = flt(item.price_list_rate *
-								(1.0 - (flt(item.discount_percentage) / 100.0)), item.precision("rate"))
-								
-					if self.doctype == "Purchase Invoice":
-						if auto_accounting_for_stock and item.item_code in stock_items \
-							and self.is_opening == 'No' \
-							and (not item.po_detail or not frappe.db.get_value("Purchase Order Item", 
-								item.po_detail, "delivered_by_supplier")):
-				
-								item.expense_account = stock_not_billed_account
-								item.cost_center = None
+					rows.append(item)
+					args_list.append(args)
+
+			for item, ret in zip(rows, get_item_details_for_rows(args_list)):
+				for fieldname, value in ret.items():
+					if item.meta.get_field(fieldname) and value is not None:
+						if (item.get(fieldname) is None or fieldname in force_item_fields):
+							item.set(fieldname, value)
+
+						elif fieldname == "cost_center" and not item.get("cost_center"):
+							item.set(fieldname, value)
+
+						elif fieldname == "conversion_factor" and not item.get("conversion_factor"):
+							item.set(fieldname, value)
+
+				if ret.get("pricing_rule"):
+					item.set("discount_percentage", ret.get("discount_percentage"))
+					if ret.get("pricing_rule_for") == "Price":
+						item.set("pricing_list_rate", ret.get("pricing_list_rate"))
+
+					if item.price_list_rate:
+						item.rate = flt(item.price_list_rate *
+							(1.0 - (flt(item.discount_percentage) / 100.0)), item.precision("rate"))
+							
+				if self.doctype == "Purchase Invoice":
+					if auto_accounting_for_stock and item.item_code in stock_items \
+						and self.is_opening == 'No' \
+						and (not item.po_detail or not delivered_by_supplier.get(item.po_detail)):
+			
+							item.expense_account = stock_not_billed_account
+							item.cost_center = None
 
 	def set_taxes(self):
 		if not self.meta.get_field("taxes"):
@@ -375,6 +393,14 @@ class AccountsController(TransactionBase):
 		from erpnext.accounts.utils import get_company_default
 		return get_company_default(self.company, fieldname)
 
+	def get_po_items_delivered_by_supplier(self):
+		po_details = list(set([d.po_detail for d in self.get("items") if d.po_detail]))
+		if not po_details:
+			return {}
+
+		return dict(frappe.db.sql("""select name, delivered_by_supplier from `tabPurchase Order Item`
+			where name in ({0})""".format(", ".join(["%s"] * len(po_details))), tuple(po_details)))
+
 	def get_stock_items(self):
 		stock_items = []
 		item_codes = list(set(item.item_code for item in self.get("items")))
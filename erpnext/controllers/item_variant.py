@@ -4,7 +4,7 @@
 from __future__ import unicode_literals
 import frappe
 from frappe import _
-from frappe.utils import cstr, flt
+from frappe.utils import cstr, flt, now
 import json
 
 class ItemVariantExistsError(frappe.ValidationError): pass
@@ -122,18 +122,116 @@ def create_variant(item, args):
 	return variant
 
 def copy_attributes_to_variant(item, variant):
-	from frappe.model import no_value_fields
-	for field in item.meta.fields:
-		if field.fieldtype not in no_value_fields and (not field.no_copy)\
-			and field.fieldname not in ("item_code", "item_name", "show_in_website"):
-			if variant.get(field.fieldname) != item.get(field.fieldname):
-				variant.set(field.fieldname, item.get(field.fieldname))
+	for fieldname in get_fields_to_copy(item):
+		if variant.get(fieldname) != item.get(fieldname):
+			variant.set(fieldname, item.get(fieldname))
 	variant.variant_of = item.name
 	variant.has_variants = 0
 	if variant.attributes:
-		variant.description += "\n"
-		for d in variant.attributes:
-			variant.description += "<p>" + d.attribute + ": " + cstr(d.attribute_value) + "</p>"
+		variant.description = get_variant_description(variant.description, variant.attributes)
+
+def get_fields_to_copy(item):
+	"""Fields of the template that are copied to its variants"""
+	from frappe.model import no_value_fields
+	return [field.fieldname for field in item.meta.fields
+		if field.fieldtype not in no_value_fields and (not field.no_copy)
+			and field.fieldname not in ("item_code", "item_name", "show_in_website")]
+
+def get_variant_description(description, attributes):
+	"""Template description followed by the variant's attribute values"""
+	description += "\n"
+	for d in attributes:
+		description += "<p>" + d.attribute + ": " + cstr(d.attribute_value) + "</p>"
+	return description
+
+def update_variants(template, user=None):
+	"""Copy changed values of `template` to all its variants and return the updated variants.
+
+	Variants are not saved one by one. Changed values are written with one update per
+	batch of variants that need the same fields, and dependent descriptions in BOMs and
+	Item Prices are refreshed in bulk. Progress is published to `user` if specified."""
+	from erpnext.setup.doctype.item_group.item_group import invalidate_cache_for
+
+	fields = [f for f in get_fields_to_copy(template)
+		if f not in ("variant_of", "has_variants", "description")]
+
+	variants = frappe.db.sql("""select name, description, {0} from `tabItem`
+		where variant_of=%s""".format(", ".join(["`{0}`".format(f) for f in fields])),
+		template.name, as_dict=1)
+
+	attributes = {}
+	for d in frappe.db.sql("""select parent, attribute, attribute_value from `tabItem Variant Attribute`
+		where parent in (select name from `tabItem` where variant_of=%s) order by idx""",
+		template.name, as_dict=1):
+			attributes.setdefault(d.parent, []).append(d)
+
+	# group variants by the fields that have changed
+	changed_fields, descriptions = {}, {}
+	for variant in variants:
+		changed = tuple([f for f in fields if variant.get(f) != template.get(f)])
+
+		description = template.description
+		if attributes.get(variant.name):
+			description = get_variant_description(description, attributes[variant.name])
+		if description != variant.description:
+			descriptions[variant.name] = description
+
+		if changed or variant.name in descriptions:
+			changed_fields.setdefault(changed, []).append(variant.name)
+
+	updated = []
+	total = sum([len(names) for names in changed_fields.values()])
+
+	for changed, names in changed_fields.items():
+		for i in xrange(0, len(names), 100):
+			batch = names[i:i + 100]
+			set_values = ["`{0}`=%s".format(f) for f in changed]
+			values = [template.get(f) for f in changed]
+
+			description_rows = [name for name in batch if name in descriptions]
+			if description_rows:
+				set_values.append("description = case name {0} else description end".format(
+					" ".join(["when %s then %s"] * len(description_rows))))
+				for name in description_rows:
+					values += [name, descriptions[name]]
+
+			set_values += ["synced_with_hub=0", "modified=%s", "modified_by=%s"]
+			values += [now(), frappe.session.user]
+
+			frappe.db.sql("""update `tabItem` set {0} where name in ({1})""".format(
+				", ".join(set_values), ", ".join(["%s"] * len(batch))), tuple(values + batch))
+
+			updated += batch
+			if user:
+				frappe.publish_realtime("progress", {"progress": [len(updated), total],
+					"title": _("Updating Variants")}, user=user)
+
+	update_variant_descriptions([name for name in updated if name in descriptions])
+
+	if updated:
+		clear_variant_matrix(template.name)
+		invalidate_cache_for(template, template.item_group)
+
+	return updated
+
+def update_variant_descriptions(variants):
+	"""Update descriptions of variants in Item Prices and BOMs, as done on saving an Item"""
+	for i in xrange(0, len(variants), 100):
+		condition = "in ({0})".format(", ".join(["%s"] * len(variants[i:i + 100])))
+		values = tuple(variants[i:i + 100])
+
+		frappe.db.sql("""update `tabItem Price` item_price, `tabItem` item
+			set item_price.item_description = item.description, item_price.modified = now()
+			where item_price.item_code = item.name and item.name {0}""".format(condition), values)
+
+		frappe.db.sql("""update `tabBOM` bom, `tabItem` item set bom.description = item.description
+			where bom.item = item.name and bom.docstatus < 2 and item.name {0}""".format(condition), values)
+
+		for doctype in ("BOM Item", "BOM Explosion Item"):
+			frappe.db.sql("""update `tab{0}` bom_item, `tabItem` item
+				set bom_item.description = item.description
+				where bom_item.item_code = item.name and bom_item.docstatus < 2
+				and item.name {1}""".format(doctype, condition), values)
 
 def make_variant_item_code(template, variant):
 	"""Uses template's item code and abbreviations to make variant's item code"""
@@ -165,3 +263,88 @@ def make_variant_item_code(template, variant):
 
 	if variant.item_code:
 		variant.item_name = variant.item_code
+
+def get_variant_matrix(template):
+	"""Returns the cached attribute matrix of variants of `template` shown on the website"""
+	return frappe.cache().hget("item_variant_matrix", template,
+		lambda: build_variant_matrix(template))
+
+def build_variant_matrix(template):
+	"""Build the attribute matrix of website variants of a template Item
+
+		- `variants`: list of {"name", "attributes"} in name order
+		- `variant_attributes`: {variant: {attribute: attribute_value}}
+		- `attribute_values`: {attribute: available values, in display order}
+		- `combinations`: set of tuples of attribute values, one for every leading part of the
+		  template's attributes that matches a variant, eg. (Blue,) and (Blue, Large)
+		- `variant_info`: variants as json, for the product page"""
+	attributes = frappe.db.sql_list("""select attribute from `tabItem Variant Attribute`
+		where parent=%s order by idx""", template)
+
+	variant_names = frappe.db.sql_list("""select name from `tabItem`
+		where variant_of=%s and show_in_website=1 order by name asc""", template)
+
+	variant_attributes, variants = {}, []
+	if variant_names:
+		rows = {}
+		for d in frappe.db.sql("""select parent, attribute, attribute_value
+			from `tabItem Variant Attribute` where parent in ({0})
+			order by idx""".format(", ".join(["%s"] * len(variant_names))),
+			tuple(variant_names), as_dict=1):
+				rows.setdefault(d.parent, []).append({"attribute": d.attribute,
+					"attribute_value": d.attribute_value})
+
+		for name in variant_names:
+			variants.append({"name": name, "attributes": rows.get(name, [])})
+			variant_attributes[name] = dict((d["attribute"], d["attribute_value"])
+				for d in rows.get(name, []))
+
+	# available values of each attribute, ordered by value for numeric attributes
+	# and by the sequence in Item Attribute for others
+	available_values = {}
+	for values in variant_attributes.values():
+		for attribute, value in values.items():
+			available_values.setdefault(attribute, set()).add(value)
+
+	numeric_attributes, ordered_values = [], {}
+	if attributes:
+		numeric_attributes = frappe.db.sql_list("""select name from `tabItem Attribute`
+			where name in ({0}) and numeric_values=1""".format(", ".join(["%s"] * len(attributes))),
+			tuple(attributes))
+
+		for d in frappe.db.sql("""select parent, attribute_value from `tabItem Attribute Value`
+			where parent in ({0}) order by idx asc""".format(", ".join(["%s"] * len(attributes))),
+			tuple(attributes), as_dict=1):
+				ordered_values.setdefault(d.parent, []).append(d.attribute_value)
+
+	attribute_values = {}
+	for attribute in attributes:
+		available = available_values.get(attribute, set())
+		if attribute in numeric_attributes:
+			attribute_values[attribute] = sorted(available, key=flt)
+		else:
+			attribute_values[attribute] = [v for v in ordered_values.get(attribute, []) if v in available]
+
+	combinations = set()
+	for values in variant_attributes.values():
+		if len(values) < len(attributes):
+			continue
+
+		combination = tuple(values.get(attribute) for attribute in attributes)
+		for i in xrange(1, len(combination) + 1):
+			combinations.add(combination[:i])
+
+	return {
+		"variants": variants,
+		"variant_attributes": variant_attributes,
+		"attribute_values": attribute_values,
+		"combinations": combinations,
+		"variant_info": json.dumps(variants)
+	}
+
+def clear_variant_matrix(template=None):
+	"""Clear cached variant matrix of `template`, or of all templates"""
+	if template:
+		frappe.cache().hdel("item_variant_matrix", template)
+	else:
+		frappe.cache().delete_value("item_variant_matrix")
@@ -0,0 +1,97 @@
+# Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+"""Request-scoped cache of master fields used while validating and posting transactions.
+
+Masters linked in a document are fetched with one query per table and kept in
+`frappe.local` till the end of the request. The cache is refreshed by `preload_master_data`,
+called from the `validate` of transactions (`AccountsController`, Journal Entry,
+Stock Entry and Stock Reconciliation). Entries are dropped when the master is saved,
+deleted or renamed. Values changed with `frappe.db.set_value` are only seen after the
+next refresh."""
+
+from __future__ import unicode_literals
+import frappe
+
+master_fields = {
+	"Item": ("stock_uom", "is_stock_item", "is_sales_item", "is_service_item",
+		"income_account", "max_discount", "tolerance"),
+	"Warehouse": ("company",),
+	"Account": ("report_type", "account_type", "account_currency", "company"),
+	"Company": ("default_currency", "cost_center", "stock_adjustment_account")
+}
+
+def get_master_data_cache():
+	if not getattr(frappe.local, "master_data_cache", None):
+		frappe.local.master_data_cache = {}
+	return frappe.local.master_data_cache
+
+def preload_master_data(doc):
+	"""Refresh the cache and load all masters linked in the document and its child tables"""
+	frappe.local.master_data_cache = {}
+
+	names = {}
+	for d in [doc] + doc.get_all_children():
+		for df in d.meta.get_link_fields():
+			if df.options in master_fields and d.get(df.fieldname):
+				names.setdefault(df.options, set()).add(d.get(df.fieldname))
+
+	for doctype, values in names.items():
+		load_master_data(doctype, values)
+
+	load_product_bundles(names.get("Item", []))
+
+def load_master_data(doctype, names):
+	"""Fetch master fields for all `names` not already in the cache in a single query"""
+	cache = get_master_data_cache().setdefault(doctype, {})
+	names = list(set([n for n in names if n and n not in cache]))
+
+	if names:
+		for d in frappe.db.sql("""select name, {fields} from `tab{doctype}`
+			where name in ({names})""".format(fields=", ".join(master_fields[doctype]),
+				doctype=doctype, names=", ".join(["%s"] * len(names))), tuple(names), as_dict=1):
+			cache[d.name] = d
+
+		# remember missing masters so that they are not queried again
+		for name in names:
+			cache.setdefault(name, None)
+
+	return cache
+
+def get_master_value(doctype, name, fieldname):
+	"""Returns value of `fieldname` of the master, loading it if not cached"""
+	master = load_master_data(doctype, [name]).get(name)
+	return master.get(fieldname) if master else None
+
+def load_product_bundles(item_codes):
+	"""Cache whether each item is the parent of a Product Bundle"""
+	cache = get_master_data_cache().setdefault("Product Bundle", {})
+	item_codes = list(set([i for i in item_codes if i and i not in cache]))
+
+	if item_codes:
+		bundles = frappe.db.sql_list("""select new_item_code from `tabProduct Bundle`
+			where new_item_code in ({0}) and docstatus != 2""".format(", ".join(["%s"] * len(item_codes))),
+			tuple(item_codes))
+
+		for item_code in item_codes:
+			cache[item_code] = item_code in bundles
+
+	return cache
+
+def is_product_bundle(item_code):
+	return load_product_bundles([item_code]).get(item_code)
+
+def clear_master_data_cache(doc, method=None, old=None, *args):
+	"""Drop cached values of an edited master (hooked to `on_update`, `on_trash` and `after_rename`)"""
+	cache = getattr(frappe.local, "master_data_cache", None)
+	if not cache:
+		return
+
+	if doc.doctype == "Product Bundle":
+		cache.get("Product Bundle", {}).pop(doc.new_item_code, None)
+	else:
+		cache.get(doc.doctype, {}).pop(doc.name, None)
+
+		# renamed, drop the old name
+		if old:
+			cache.get(doc.doctype, {}).pop(old, None)
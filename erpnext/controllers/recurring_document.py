@@ -19,6 +19,9 @@ date_field_map = {
 	"Purchase Invoice": "posting_date"
 }
 
+# number of due documents created by one background job
+recurring_batch_size = 50
+
 def create_recurring_documents():
 	manage_recurring_documents("Sales Order")
 	manage_recurring_documents("Sales Invoice")
@@ -28,12 +31,27 @@ def create_recurring_documents():
 def manage_recurring_documents(doctype, next_date=None, commit=True):
 	"""
 		Create recurring documents on specific date by copying the original one
-		and notify the concerned people
+		and notify the concerned people.
+
+		Due documents are split in batches that are created by background jobs.
+		If `commit` is False, they are created in the current transaction.
 	"""
-	next_date = next_date or nowdate()
+	next_date = cstr(next_date or nowdate())
 
-	date_field = date_field_map[doctype]
+	ref_documents = get_pending_recurring_documents(doctype, next_date)
+	if not ref_documents:
+		return
 
+	if commit:
+		import erpnext.tasks
+		for i in xrange(0, len(ref_documents), recurring_batch_size):
+			erpnext.tasks.make_recurring_documents.delay(frappe.local.site, doctype,
+				ref_documents[i:i + recurring_batch_size], next_date, event="bulk_long")
+	else:
+		make_recurring_documents(doctype, ref_documents, next_date, commit=False)
+
+def get_pending_recurring_documents(doctype, next_date):
+	"""Returns reference documents due on `next_date` that have not been copied yet"""
 	condition = " and ifnull(status, '') != 'Stopped'" if doctype in ("Sales Order", "Purchase Order") else ""
 
 	recurring_documents = frappe.db.sql("""select name, recurring_id
@@ -41,36 +59,65 @@ def manage_recurring_documents(doctype, next_date=None, commit=True):
 		and docstatus=1 and next_date=%s
 		and next_date <= ifnull(end_date, '2199-12-31') {1}""".format(doctype, condition), next_date)
 
-	exception_list = []
-	for ref_document, recurring_id in recurring_documents:
-		if not frappe.db.sql("""select name from `tab%s`
-				where %s=%s and recurring_id=%s and docstatus=1"""
-				% (doctype, date_field, '%s', '%s'), (next_date, recurring_id)):
-			try:
-				ref_wrapper = frappe.get_doc(doctype, ref_document)
-				if hasattr(ref_wrapper, "before_recurring"):
-					ref_wrapper.before_recurring()
-
-				new_document_wrapper = make_new_document(ref_wrapper, date_field, next_date)
-				send_notification(new_document_wrapper)
-				if commit:
-					frappe.db.commit()
-			except:
-				if commit:
-					frappe.db.rollback()
-
-					frappe.db.begin()
-					frappe.db.sql("update `tab%s` \
-						set is_recurring = 0 where name = %s" % (doctype, '%s'),
-						(ref_document))
-					notify_errors(ref_document, doctype, ref_wrapper.get("customer") or ref_wrapper.get("supplier"),
-						ref_wrapper.owner)
-					frappe.db.commit()
-
-				exception_list.append(frappe.get_traceback())
-			finally:
-				if commit:
-					frappe.db.begin()
+	if not recurring_documents:
+		return []
+
+	existing = get_existing_recurring_ids(doctype, [d[1] for d in recurring_documents], next_date)
+
+	return [ref_document for ref_document, recurring_id in recurring_documents
+		if recurring_id not in existing]
+
+def get_existing_recurring_ids(doctype, recurring_ids, next_date):
+	"""Returns recurring ids that already have a submitted copy on `next_date`"""
+	return set(frappe.db.sql_list("""select recurring_id from `tab{0}`
+		where {1}=%s and docstatus=1 and recurring_id in ({2})""".format(doctype,
+			date_field_map[doctype], ", ".join(["%s"] * len(recurring_ids))),
+		tuple([next_date] + list(recurring_ids))))
+
+def make_recurring_documents(doctype, ref_documents, next_date, commit=True):
+	"""Create copies of `ref_documents` on `next_date`, each in its own transaction.
+
+	The reference is locked and checked for an existing copy before it is copied,
+	so documents created by an interrupted or overlapping run are skipped."""
+	date_field = date_field_map[doctype]
+
+	new_documents, exception_list = [], []
+	for ref_document in ref_documents:
+		ref_wrapper = None
+		try:
+			recurring_id = frappe.db.sql("""select recurring_id from `tab{0}`
+				where name=%s for update""".format(doctype), ref_document)[0][0]
+
+			if get_existing_recurring_ids(doctype, [recurring_id], next_date):
+				continue
+
+			ref_wrapper = frappe.get_doc(doctype, ref_document)
+			if hasattr(ref_wrapper, "before_recurring"):
+				ref_wrapper.before_recurring()
+
+			new_documents.append(make_new_document(ref_wrapper, date_field, next_date))
+			if commit:
+				frappe.db.commit()
+		except:
+			if commit:
+				frappe.db.rollback()
+
+				frappe.db.begin()
+				frappe.db.sql("update `tab%s` \
+					set is_recurring = 0 where name = %s" % (doctype, '%s'),
+					(ref_document))
+
+				ref_wrapper = ref_wrapper or frappe.get_doc(doctype, ref_document)
+				notify_errors(ref_document, doctype, ref_wrapper.get("customer") or ref_wrapper.get("supplier"),
+					ref_wrapper.owner)
+				frappe.db.commit()
+
+			exception_list.append(frappe.get_traceback())
+		finally:
+			if commit:
+				frappe.db.begin()
+
+	exception_list.extend(send_notifications(new_documents))
 
 	if exception_list:
 		exception_message = "\n\n".join([cstr(d) for d in exception_list])
@@ -117,13 +164,42 @@ def get_next_date(dt, mcount, day=None):
 
 	return dt
 
-def send_notification(new_rv):
+def send_notifications(new_documents):
+	"""Send one email per set of recipients for all generated documents.
+
+	Returns list of tracebacks of emails that could not be sent"""
+	documents_by_recipients = {}
+	for d in new_documents:
+		documents_by_recipients.setdefault(d.notification_email_address, []).append(d)
+
+	exception_list = []
+	for documents in documents_by_recipients.values():
+		try:
+			send_notification(documents)
+		except:
+			exception_list.append(frappe.get_traceback())
+
+	return exception_list
+
+def send_notification(new_documents):
 	"""Notify concerned persons about recurring document generation"""
+	if not isinstance(new_documents, list):
+		new_documents = [new_documents]
+
+	new_rv = new_documents[0]
+	if len(new_documents) == 1:
+		subject = _("New {0}: #{1}").format(new_rv.doctype, new_rv.name)
+		message = _("Please find attached {0} #{1}").format(new_rv.doctype, new_rv.name)
+	else:
+		names = comma_and(["#" + d.name for d in new_documents])
+		subject = _("New {0}: {1}").format(_(new_rv.doctype), names)
+		message = _("Please find attached {0} {1}").format(_(new_rv.doctype), names)
 
 	frappe.sendmail(new_rv.notification_email_address,
-		subject=  _("New {0}: #{1}").format(new_rv.doctype, new_rv.name),
-		message = _("Please find attached {0} #{1}").format(new_rv.doctype, new_rv.name),
-		attachments = [frappe.attach_print(new_rv.doctype, new_rv.name, file_name=new_rv.name, print_format=new_rv.recurring_print_format)])
+		subject = subject,
+		message = message,
+		attachments = [frappe.attach_print(d.doctype, d.name, file_name=d.name,
+			print_format=d.recurring_print_format) for d in new_documents])
 
 def notify_errors(doc, doctype, party, owner):
 	from frappe.utils.user import get_system_managers
@@ -7,6 +7,8 @@ from frappe.utils import cint, flt, cstr, comma_or
 from erpnext.setup.utils import get_company_currency
 from frappe import _, throw
 from erpnext.stock.get_item_details import get_available_qty
+from erpnext.controllers.master_data import load_master_data, get_master_value, \
+	load_product_bundles, is_product_bundle
 
 from erpnext.controllers.stock_controller import StockController
 
@@ -150,14 +152,18 @@ class SellingController(StockController):
 			throw(_("Order Type must be one of {0}").format(comma_or(valid_types)))
 
 	def validate_max_discount(self):
+		load_master_data("Item", [d.item_code for d in self.get("items")])
+
 		for d in self.get("items"):
-			discount = flt(frappe.db.get_value("Item", d.item_code, "max_discount"))
+			discount = flt(get_master_value("Item", d.item_code, "max_discount"))
 
 			if discount and flt(d.discount_percentage) > discount:
 				frappe.throw(_("Maxiumm discount for Item {0} is {1}%").format(d.item_code, discount))
 
 	def get_item_list(self):
 		il = []
+		load_product_bundles([d.item_code for d in self.get("items")])
+
 		for d in self.get("items"):
 			if d.qty is None:
 				frappe.throw(_("Row {0}: Qty is mandatory").format(d.idx))
@@ -191,8 +197,7 @@ class SellingController(StockController):
 		return il
 
 	def has_product_bundle(self, item_code):
-		return frappe.db.sql("""select name from `tabProduct Bundle`
-			where new_item_code=%s and docstatus != 2""", item_code)
+		return is_product_bundle(item_code)
 
 	def get_already_delivered_qty(self, current_docname, so, so_detail):
 		delivered_via_dn = frappe.db.sql("""select sum(qty) from `tabDelivery Note Item`
@@ -227,13 +232,14 @@ class SellingController(StockController):
 					frappe.throw(_("Sales Order {0} is {1}").format(d.get(ref_fieldname), status))
 
 def check_active_sales_items(obj):
+	items = load_master_data("Item", [d.item_code for d in obj.get("items")])
+
 	for d in obj.get("items"):
 		if d.item_code:
-			item = frappe.db.sql("""select docstatus, is_sales_item,
-				is_service_item, income_account from tabItem where name = %s""",
-				d.item_code, as_dict=True)[0]
+			item = items[d.item_code]
 			if item.is_sales_item == 0 and item.is_service_item == 0:
 				frappe.throw(_("Item {0} must be Sales or Service Item in {1}").format(d.item_code, d.idx))
 			if getattr(d, "income_account", None) and not item.income_account:
 				frappe.db.set_value("Item", d.item_code, "income_account",
 					d.income_account)
+				item.income_account = d.income_account
@@ -6,6 +6,7 @@ import frappe
 from frappe.utils import flt, comma_or
 from frappe import msgprint, _, throw
 from frappe.model.document import Document
+from erpnext.controllers.master_data import get_master_value
 
 def validate_status(status, options):
 	if status not in options:
@@ -117,34 +118,38 @@ class StatusUpdater(Document):
 				# if target_ref_field is not specified, the programmer does not want to validate qty / amount
 				continue
 
-			# get unique transactions to update
-			for d in self.get_all_children():
-				if d.doctype == args['source_dt'] and d.get(args["join_field"]):
-					args['name'] = d.get(args['join_field'])
-
-					# get all qty where qty > target_field
-					item = frappe.db.sql("""select item_code, `{target_ref_field}`,
-						`{target_field}`, parenttype, parent from `tab{target_dt}`
-						where `{target_ref_field}` < `{target_field}`
-						and name=%s and docstatus=1""".format(**args),
-						args['name'], as_dict=1)
-					if item:
-						item = item[0]
-						item['idx'] = d.idx
-						item['target_ref_field'] = args['target_ref_field'].replace('_', ' ')
-
-						if not item[args['target_ref_field']]:
-							msgprint(_("Note: System will not check over-delivery and over-booking for Item {0} as quantity or amount is 0").format(item.item_code))
-						elif args.get('no_tolerance'):
-							item['reduce_by'] = item[args['target_field']] - item[args['target_ref_field']]
-							if item['reduce_by'] > .01:
-								msgprint(_("Allowance for over-{0} crossed for Item {1}")
-									.format(args["overflow_type"], item.item_code))
-								throw(_("{0} must be reduced by {1} or you should increase overflow tolerance")
-									.format(_(item.target_ref_field.title()), item["reduce_by"]))
-
-						else:
-							self.check_overflow_with_tolerance(item, args)
+			detail_ids = self.get_linked_names(args['source_dt'], args['join_field'])
+			if not detail_ids:
+				continue
+
+			# get all qty where qty > target_field, for all rows at once
+			overflow_items = {}
+			for item in frappe.db.sql("""select name, item_code, `{target_ref_field}`,
+				`{target_field}`, parenttype, parent from `tab{target_dt}`
+				where `{target_ref_field}` < `{target_field}`
+				and name in ({detail_ids}) and docstatus=1""".format(
+					detail_ids=", ".join(["%s"] * len(detail_ids)), **args),
+				tuple(detail_ids), as_dict=1):
+					overflow_items[item.name] = item
+
+			for d in self.get_all_children(args['source_dt']):
+				if d.get(args["join_field"]) in overflow_items:
+					item = frappe._dict(overflow_items[d.get(args["join_field"])])
+					item['idx'] = d.idx
+					item['target_ref_field'] = args['target_ref_field'].replace('_', ' ')
+
+					if not item[args['target_ref_field']]:
+						msgprint(_("Note: System will not check over-delivery and over-booking for Item {0} as quantity or amount is 0").format(item.item_code))
+					elif args.get('no_tolerance'):
+						item['reduce_by'] = item[args['target_field']] - item[args['target_ref_field']]
+						if item['reduce_by'] > .01:
+							msgprint(_("Allowance for over-{0} crossed for Item {1}")
+								.format(args["overflow_type"], item.item_code))
+							throw(_("{0} must be reduced by {1} or you should increase overflow tolerance")
+								.format(_(item.target_ref_field.title()), item["reduce_by"]))
+
+					else:
+						self.check_overflow_with_tolerance(item, args)
 
 	def check_overflow_with_tolerance(self, item, args):
 		"""
@@ -171,6 +176,9 @@ class StatusUpdater(Document):
 
 			:param change_modified: If true, updates `modified` and `modified_by` for target parent doc
 		"""
+		# {target_dt: {detail_id: {target_field: value}}}
+		target_values = {}
+
 		for args in self.status_updater:
 			# condition to include current record (if submit or no if cancel)
 			if self.docstatus == 1:
@@ -183,70 +191,96 @@ class StatusUpdater(Document):
 				args['set_modified'] = ', modified = now(), modified_by = "{0}"'\
 					.format(frappe.db.escape(frappe.session.user))
 
-			self._update_children(args)
+			for detail_id, value in self._get_children_values(args).items():
+				target_values.setdefault(args['target_dt'], {})\
+					.setdefault(detail_id, {})[args['target_field']] = value
+
+		for target_dt, values in target_values.items():
+			self._update_children(target_dt, values)
 
+		for args in self.status_updater:
 			if "percent_join_field" in args:
 				self._update_percent_field(args)
 
-	def _update_children(self, args):
-		"""Update quantities or amount in child table"""
-		for d in self.get_all_children():
-			if d.doctype != args['source_dt']:
-				continue
-
-			# updates qty in the child table
-			args['detail_id'] = d.get(args['join_field'])
-
-			args['second_source_condition'] = ""
-			if args.get('second_source_dt') and args.get('second_source_field') \
-					and args.get('second_join_field'):
-				if not args.get("second_source_extra_cond"):
-					args["second_source_extra_cond"] = ""
-
-				args['second_source_condition'] = """ + ifnull((select sum(%(second_source_field)s)
-					from `tab%(second_source_dt)s`
-					where `%(second_join_field)s`="%(detail_id)s"
-					and (`tab%(second_source_dt)s`.docstatus=1) %(second_source_extra_cond)s), 0) """ % args
-
-			if args['detail_id']:
-				if not args.get("extra_cond"): args["extra_cond"] = ""
-
-				frappe.db.sql("""update `tab%(target_dt)s`
-					set %(target_field)s = (select ifnull(sum(%(source_field)s), 0)
-						from `tab%(source_dt)s` where `%(join_field)s`="%(detail_id)s"
-						and (docstatus=1 %(cond)s) %(extra_cond)s) %(second_source_condition)s
-					where name='%(detail_id)s'""" % args)
+	def get_linked_names(self, source_dt, fieldname):
+		"""Returns unique values of `fieldname` in rows of child table `source_dt`"""
+		return list(set([d.get(fieldname) for d in self.get_all_children(source_dt)
+			if d.get(fieldname)]))
+
+	def _get_children_values(self, args):
+		"""Returns qty or amount of all linked rows in the target table, summed
+		with one grouped query per source table"""
+		detail_ids = self.get_linked_names(args['source_dt'], args['join_field'])
+		if not detail_ids:
+			return {}
+
+		if not args.get("extra_cond"): args["extra_cond"] = ""
+		args['detail_ids'] = ", ".join(["%s"] * len(detail_ids))
+
+		values = dict.fromkeys(detail_ids, 0.0)
+		for detail_id, value in frappe.db.sql("""select `%(join_field)s`, ifnull(sum(%(source_field)s), 0)
+			from `tab%(source_dt)s` where `%(join_field)s` in (%(detail_ids)s)
+			and (docstatus=1 %(cond)s) %(extra_cond)s
+			group by `%(join_field)s`""" % args, tuple(detail_ids)):
+				values[detail_id] = flt(value)
+
+		if args.get('second_source_dt') and args.get('second_source_field') \
+				and args.get('second_join_field'):
+			if not args.get("second_source_extra_cond"):
+				args["second_source_extra_cond"] = ""
+
+			for detail_id, value in frappe.db.sql("""select `%(second_join_field)s`,
+				ifnull(sum(%(second_source_field)s), 0)
+				from `tab%(second_source_dt)s` where `%(second_join_field)s` in (%(detail_ids)s)
+				and (`tab%(second_source_dt)s`.docstatus=1) %(second_source_extra_cond)s
+				group by `%(second_join_field)s`""" % args, tuple(detail_ids)):
+					values[detail_id] += flt(value)
+
+		return values
+
+	def _update_children(self, target_dt, values):
+		"""Update quantities or amount in child table, one statement for all rows and fields"""
+		set_values, params = [], []
+		for fieldname in set([f for row in values.values() for f in row]):
+			rows = [(detail_id, row[fieldname]) for detail_id, row in values.items() if fieldname in row]
+			set_values.append("`{0}` = case name {1} else `{0}` end".format(fieldname,
+				" ".join(["when %s then %s"] * len(rows))))
+			for row in rows:
+				params.extend(row)
+
+		frappe.db.sql("""update `tab{0}` set {1} where name in ({2})""".format(target_dt,
+			", ".join(set_values), ", ".join(["%s"] * len(values))), tuple(params + values.keys()))
 
 	def _update_percent_field(self, args):
-		"""Update percent field in parent transaction"""
-		unique_transactions = set([d.get(args['percent_join_field']) for d in self.get_all_children(args['source_dt'])])
-
-		for name in unique_transactions:
-			if not name:
-				continue
+		"""Update percent field in all linked parent transactions"""
+		names = self.get_linked_names(args['source_dt'], args['percent_join_field'])
+		if not names:
+			return
 
-			args['name'] = name
-
-			# update percent complete in the parent table
-			if args.get('target_parent_field'):
-				frappe.db.sql("""update `tab%(target_parent_dt)s`
-					set %(target_parent_field)s = round(
-						ifnull((select
-							ifnull(sum(if(%(target_ref_field)s > %(target_field)s, %(target_field)s, %(target_ref_field)s)), 0)
-							/ sum(%(target_ref_field)s) * 100
-						from `tab%(target_dt)s` where parent="%(name)s"), 0), 2)
-						%(set_modified)s
-					where name='%(name)s'""" % args)
-
-			# update field
-			if args.get('status_field'):
-				frappe.db.sql("""update `tab%(target_parent_dt)s`
-					set %(status_field)s = if(%(target_parent_field)s<0.001,
-						'Not %(keyword)s', if(%(target_parent_field)s>=99.99,
-						'Fully %(keyword)s', 'Partly %(keyword)s'))
-					where name='%(name)s'""" % args)
-
-			if args.get("set_modified"):
+		args['names'] = ", ".join(["%s"] * len(names))
+
+		# update percent complete in the parent table
+		if args.get('target_parent_field'):
+			frappe.db.sql("""update `tab%(target_parent_dt)s` parent_doc
+				left join (select parent,
+						ifnull(sum(if(%(target_ref_field)s > %(target_field)s, %(target_field)s, %(target_ref_field)s)), 0)
+						/ sum(%(target_ref_field)s) * 100 as per_completed
+					from `tab%(target_dt)s` where parent in (%(names)s) group by parent) child
+				on child.parent = parent_doc.name
+				set parent_doc.%(target_parent_field)s = round(ifnull(child.per_completed, 0), 2)
+					%(set_modified)s
+				where parent_doc.name in (%(names)s)""" % args, tuple(names + names))
+
+		# update field
+		if args.get('status_field'):
+			frappe.db.sql("""update `tab%(target_parent_dt)s`
+				set %(status_field)s = if(%(target_parent_field)s<0.001,
+					'Not %(keyword)s', if(%(target_parent_field)s>=99.99,
+					'Fully %(keyword)s', 'Partly %(keyword)s'))
+				where name in (%(names)s)""" % args, tuple(names))
+
+		if args.get("set_modified"):
+			for name in names:
 				target = frappe.get_doc(args["target_parent_dt"], name)
 				target.set_status(update=True)
 				target.notify_update()
@@ -293,7 +327,7 @@ def get_tolerance_for(item_code, item_tolerance={}, global_tolerance=None):
 	if item_tolerance.get(item_code):
 		return item_tolerance[item_code], item_tolerance, global_tolerance
 
-	tolerance = flt(frappe.db.get_value('Item',item_code,'tolerance') or 0)
+	tolerance = flt(get_master_value('Item', item_code, 'tolerance') or 0)
 
 	if not tolerance:
 		if global_tolerance == None:
@@ -8,6 +8,7 @@ from frappe import msgprint, _
 import frappe.defaults
 from erpnext.accounts.general_ledger import make_gl_entries, delete_gl_entries, process_gl_map
 from erpnext.stock.utils import get_incoming_rate
+from erpnext.controllers.master_data import load_master_data, get_master_value
 
 from erpnext.controllers.accounts_controller import AccountsController
 
@@ -166,7 +167,7 @@ class StockController(AccountsController):
 			frappe.throw(_("Expense or Difference account is mandatory for Item {0} as it impacts overall stock value").format(item.item_code))
 
 		else:
-			is_expense_account = frappe.db.get_value("Account",
+			is_expense_account = get_master_value("Account",
 				item.get("expense_account"), "report_type")=="Profit and Loss"
 			if self.doctype not in ("Purchase Receipt", "Stock Reconciliation", "Stock Entry") and not is_expense_account:
 				frappe.throw(_("Expense / Difference account ({0}) must be a 'Profit or Loss' account")
@@ -185,7 +186,7 @@ class StockController(AccountsController):
 			"voucher_no": self.name,
 			"voucher_detail_no": d.name,
 			"actual_qty": (self.docstatus==1 and 1 or -1)*flt(d.get("stock_qty")),
-			"stock_uom": frappe.db.get_value("Item", args.get("item_code") or d.get("item_code"), "stock_uom"),
+			"stock_uom": get_master_value("Item", args.get("item_code") or d.get("item_code"), "stock_uom"),
 			"incoming_rate": 0,
 			"company": self.company,
 			"fiscal_year": self.fiscal_year,
@@ -253,8 +254,11 @@ class StockController(AccountsController):
 		self.update_reserved_qty()
 
 		sl_entries = []
-		for d in self.get_item_list():
-			if frappe.db.get_value("Item", d.item_code, "is_stock_item") == 1 and flt(d.qty):
+		item_list = self.get_item_list()
+		load_master_data("Item", [d.item_code for d in item_list])
+
+		for d in item_list:
+			if get_master_value("Item", d.item_code, "is_stock_item") == 1 and flt(d.qty):
 				return_rate = 0
 				if cint(self.is_return) and self.return_against and self.docstatus==1:
 					return_rate = self.get_incoming_rate_for_sales_return(d.item_code,
@@ -309,6 +313,7 @@ class StockController(AccountsController):
 
 		warehouses = list(set([d.warehouse for d in
 			self.get("items") if getattr(d, "warehouse", None)]))
+		load_master_data("Warehouse", warehouses)
 
 		for w in warehouses:
 			validate_warehouse_company(w, self.company)
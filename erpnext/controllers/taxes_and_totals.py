@@ -17,6 +17,7 @@ class calculate_taxes_and_totals(object):
 
 	def calculate(self):
 		self.discount_amount_applied = False
+		self._item_tax_rates = {}
 		self._calculate()
 
 		if self.doc.meta.get_field("discount_amount"):
@@ -97,7 +98,7 @@ class calculate_taxes_and_totals(object):
 			return
 
 		for item in self.doc.get("items"):
-			item_tax_map = self._load_item_tax_rate(item.item_tax_rate)
+			item_tax_map = self._get_item_tax_rates(item)[0]
 			cumulated_tax_fraction = 0
 			for i, tax in enumerate(self.doc.get("taxes")):
 				tax.tax_fraction_for_current_item = self.get_current_tax_fraction(tax, item_tax_map)
@@ -121,6 +122,16 @@ class calculate_taxes_and_totals(object):
 	def _load_item_tax_rate(self, item_tax_rate):
 		return json.loads(item_tax_rate) if item_tax_rate else {}
 
+	def _get_item_tax_rates(self, item):
+		"""Returns (item_tax_map, tax rate for each tax row) for the item,
+		parsed once for each distinct `item_tax_rate`"""
+		if item.item_tax_rate not in self._item_tax_rates:
+			item_tax_map = self._load_item_tax_rate(item.item_tax_rate)
+			self._item_tax_rates[item.item_tax_rate] = (item_tax_map,
+				[self._get_tax_rate(tax, item_tax_map) for tax in self.doc.get("taxes")])
+
+		return self._item_tax_rates[item.item_tax_rate]
+
 	def get_current_tax_fraction(self, tax, item_tax_map):
 		"""
 			Get tax fraction for calculating tax exclusive amount
@@ -164,98 +175,120 @@ class calculate_taxes_and_totals(object):
 		self.doc.round_floats_in(self.doc, ["total", "base_total", "net_total", "base_net_total"])
 
 	def calculate_taxes(self):
+		"""Calculate tax amount of each item for each tax row.
+
+		Precisions and row dependencies are resolved once per tax row, values for the
+		current item are kept in lists and set in tax rows after the last item"""
+		taxes, items = self.doc.get("taxes"), self.doc.get("items")
+		if not (taxes and items):
+			return
+
+		conversion_rate = self.doc.conversion_rate
+		net_total = self.doc.net_total
+		last_item_idx = len(items) - 1
+		accumulate_tax_amount = not (self.discount_amount_applied and self.doc.apply_discount_on=="Grand Total")
+
+		charge_type, row_idx, actual_amount, has_category, is_valuation, is_deduct = [], [], [], [], [], []
+		tax_amount_precision, total_precision, base_tax_amount_precision = [], [], []
+		for tax in taxes:
+			charge_type.append(tax.charge_type)
+			row_idx.append(cint(tax.row_id) - 1)
+			has_category.append(bool(getattr(tax, "category", None)))
+			is_valuation.append(tax.get("category") == "Valuation")
+			is_deduct.append(tax.get("add_deduct_tax") == "Deduct")
+			tax_amount_precision.append(tax.precision("tax_amount"))
+			total_precision.append(tax.precision("total"))
+			base_tax_amount_precision.append(tax.precision("base_tax_amount"))
+			actual_amount.append(flt(tax.tax_amount, tax_amount_precision[-1]))
+
 		# maintain actual tax rate based on idx
-		actual_tax_dict = dict([[tax.idx, flt(tax.tax_amount, tax.precision("tax_amount"))]
-			for tax in self.doc.get("taxes") if tax.charge_type == "Actual"])
+		actual_tax_dict = dict([[tax.idx, actual_amount[i]]
+			for i, tax in enumerate(taxes) if tax.charge_type == "Actual"])
 
-		for n, item in enumerate(self.doc.get("items")):
-			item_tax_map = self._load_item_tax_rate(item.item_tax_rate)
+		tax_amount = [tax.tax_amount for tax in taxes]
+		tax_amount_after_discount_amount = [tax.tax_amount_after_discount_amount for tax in taxes]
+		total = [tax.total for tax in taxes]
+		tax_amount_for_current_item = [tax.tax_amount_for_current_item for tax in taxes]
+		grand_total_for_current_item = [tax.grand_total_for_current_item for tax in taxes]
+		item_wise_tax_detail = [tax.item_wise_tax_detail for tax in taxes]
 
-			for i, tax in enumerate(self.doc.get("taxes")):
+		for n, item in enumerate(items):
+			tax_rates = self._get_item_tax_rates(item)[1]
+			item_key = item.item_code or item.item_name
+
+			for i, tax in enumerate(taxes):
 				# tax_amount represents the amount of tax for the current step
-				current_tax_amount = self.get_current_tax_amount(item, tax, item_tax_map)
+				tax_rate = tax_rates[i]
+				if charge_type[i] == "Actual":
+					# distribute the tax amount proportionally to each item row
+					current_tax_amount = item.net_amount*actual_amount[i] / net_total if net_total else 0.0
+				elif charge_type[i] == "On Net Total":
+					current_tax_amount = (tax_rate / 100.0) * item.net_amount
+				elif charge_type[i] == "On Previous Row Amount":
+					current_tax_amount = (tax_rate / 100.0) * tax_amount_for_current_item[row_idx[i]]
+				elif charge_type[i] == "On Previous Row Total":
+					current_tax_amount = (tax_rate / 100.0) * grand_total_for_current_item[row_idx[i]]
+				else:
+					current_tax_amount = 0.0
+
+				current_tax_amount = flt(current_tax_amount, tax_amount_precision[i])
+
+				# store tax breakup for each item
+				item_wise_tax_amount = current_tax_amount*conversion_rate
+				if item_wise_tax_detail[i].get(item_key):
+					item_wise_tax_amount += item_wise_tax_detail[i][item_key][1]
+				item_wise_tax_detail[i][item_key] = [tax_rate, flt(item_wise_tax_amount, base_tax_amount_precision[i])]
 
 				# Adjust divisional loss to the last item
-				if tax.charge_type == "Actual":
+				if charge_type[i] == "Actual":
 					actual_tax_dict[tax.idx] -= current_tax_amount
-					if n == len(self.doc.get("items")) - 1:
+					if n == last_item_idx:
 						current_tax_amount += actual_tax_dict[tax.idx]
 
 				# accumulate tax amount into tax.tax_amount
-				if tax.charge_type != "Actual" and \
-					not (self.discount_amount_applied and self.doc.apply_discount_on=="Grand Total"):
-						tax.tax_amount += current_tax_amount
+				if charge_type[i] != "Actual" and accumulate_tax_amount:
+					tax_amount[i] += current_tax_amount
 
 				# store tax_amount for current item as it will be used for
 				# charge type = 'On Previous Row Amount'
-				tax.tax_amount_for_current_item = current_tax_amount
+				tax_amount_for_current_item[i] = current_tax_amount
 
 				# set tax after discount
-				tax.tax_amount_after_discount_amount += current_tax_amount
+				tax_amount_after_discount_amount[i] += current_tax_amount
 
-				if getattr(tax, "category", None):
+				if has_category[i]:
 					# if just for valuation, do not add the tax amount in total
 					# hence, setting it as 0 for further steps
-					current_tax_amount = 0.0 if (tax.category == "Valuation") \
-						else current_tax_amount
+					current_tax_amount = 0.0 if is_valuation[i] else current_tax_amount
 
-					current_tax_amount *= -1.0 if (tax.add_deduct_tax == "Deduct") else 1.0
+					current_tax_amount *= -1.0 if is_deduct[i] else 1.0
 
 				# Calculate tax.total viz. grand total till that step
 				# note: grand_total_for_current_item contains the contribution of
 				# item's amount, previously applied tax and the current tax on that item
 				if i==0:
-					tax.grand_total_for_current_item = flt(item.net_amount + current_tax_amount, tax.precision("total"))
+					grand_total_for_current_item[i] = flt(item.net_amount + current_tax_amount, total_precision[i])
 				else:
-					tax.grand_total_for_current_item = \
-						flt(self.doc.get("taxes")[i-1].grand_total_for_current_item + current_tax_amount, tax.precision("total"))
+					grand_total_for_current_item[i] = \
+						flt(grand_total_for_current_item[i-1] + current_tax_amount, total_precision[i])
 
 				# in tax.total, accumulate grand total of each item
-				tax.total += tax.grand_total_for_current_item
-
-				# set precision in the last item iteration
-				if n == len(self.doc.get("items")) - 1:
-					self.round_off_totals(tax)
-
-					# adjust Discount Amount loss in last tax iteration
-					if i == (len(self.doc.get("taxes")) - 1) and self.discount_amount_applied \
-						and self.doc.discount_amount and self.doc.apply_discount_on == "Grand Total":
-							self.adjust_discount_amount_loss(tax)
-
-
-
-	def get_current_tax_amount(self, item, tax, item_tax_map):
-		tax_rate = self._get_tax_rate(tax, item_tax_map)
-		current_tax_amount = 0.0
-
-		if tax.charge_type == "Actual":
-			# distribute the tax amount proportionally to each item row
-			actual = flt(tax.tax_amount, tax.precision("tax_amount"))
-			current_tax_amount = item.net_amount*actual / self.doc.net_total if self.doc.net_total else 0.0
-
-		elif tax.charge_type == "On Net Total":
-			current_tax_amount = (tax_rate / 100.0) * item.net_amount
-		elif tax.charge_type == "On Previous Row Amount":
-			current_tax_amount = (tax_rate / 100.0) * \
-				self.doc.get("taxes")[cint(tax.row_id) - 1].tax_amount_for_current_item
-		elif tax.charge_type == "On Previous Row Total":
-			current_tax_amount = (tax_rate / 100.0) * \
-				self.doc.get("taxes")[cint(tax.row_id) - 1].grand_total_for_current_item
-
-		current_tax_amount = flt(current_tax_amount, tax.precision("tax_amount"))
-
-		self.set_item_wise_tax(item, tax, tax_rate, current_tax_amount)
-
-		return current_tax_amount
-
-	def set_item_wise_tax(self, item, tax, tax_rate, current_tax_amount):
-		# store tax breakup for each item
-		key = item.item_code or item.item_name
-		item_wise_tax_amount = current_tax_amount*self.doc.conversion_rate
-		if tax.item_wise_tax_detail.get(key):
-			item_wise_tax_amount += tax.item_wise_tax_detail[key][1]
-
-		tax.item_wise_tax_detail[key] = [tax_rate,flt(item_wise_tax_amount, tax.precision("base_tax_amount"))]
+				total[i] += grand_total_for_current_item[i]
+
+		for i, tax in enumerate(taxes):
+			tax.tax_amount = tax_amount[i]
+			tax.tax_amount_after_discount_amount = tax_amount_after_discount_amount[i]
+			tax.total = total[i]
+			tax.tax_amount_for_current_item = tax_amount_for_current_item[i]
+			tax.grand_total_for_current_item = grand_total_for_current_item[i]
+
+			# set precision after the last item
+			self.round_off_totals(tax)
+
+		# adjust Discount Amount loss in last tax
+		if self.discount_amount_applied and self.doc.discount_amount \
+			and self.doc.apply_discount_on == "Grand Total":
+				self.adjust_discount_amount_loss(taxes[-1])
 
 	def round_off_totals(self, tax):
 		tax.total = flt(tax.total, tax.precision("total"))
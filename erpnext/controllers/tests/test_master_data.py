@@ -0,0 +1,34 @@
+# Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+from __future__ import unicode_literals
+
+import unittest
+import frappe
+from frappe.utils import flt
+from erpnext.controllers.master_data import get_master_value, get_master_data_cache, \
+	clear_master_data_cache
+
+class TestMasterData(unittest.TestCase):
+	def test_refreshed_on_stock_entry_validate(self):
+		from erpnext.stock.doctype.stock_entry.test_stock_entry import make_stock_entry
+
+		tolerance = frappe.db.get_value("Item", "_Test Item", "tolerance")
+		get_master_value("Item", "_Test Item", "tolerance")
+
+		frappe.db.set_value("Item", "_Test Item", "tolerance", flt(tolerance) + 5)
+		try:
+			se = make_stock_entry(target="_Test Warehouse - _TC", qty=5, basic_rate=100,
+				do_not_submit=True)
+			self.assertEquals(flt(get_master_value("Item", "_Test Item", "tolerance")), flt(tolerance) + 5)
+			frappe.delete_doc("Stock Entry", se.name)
+		finally:
+			frappe.db.set_value("Item", "_Test Item", "tolerance", tolerance)
+
+	def test_cleared_on_rename(self):
+		get_master_value("Warehouse", "_Test Warehouse - _TC", "company")
+		self.assertTrue("_Test Warehouse - _TC" in get_master_data_cache()["Warehouse"])
+
+		# after_rename passes the old and new name
+		clear_master_data_cache(frappe._dict({"doctype": "Warehouse", "name": "_Test Warehouse Renamed - _TC"}),
+			"after_rename", "_Test Warehouse - _TC", "_Test Warehouse Renamed - _TC", False)
+		self.assertFalse("_Test Warehouse - _TC" in get_master_data_cache()["Warehouse"])
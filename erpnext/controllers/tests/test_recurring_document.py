@@ -126,6 +126,12 @@ def _test_recurring_document(obj, base_doc, date_field, first_and_last_day):
 
 		obj.assertEquals(i+2, len(recurred_documents))
 
+		# running again on the same date does not create another copy
+		manage_recurring_documents(base_doc.doctype, next_date=next_date, commit=False)
+		obj.assertEquals(i+2, frappe.db.sql("""select count(*) from `tab%s`
+			where recurring_id=%s and docstatus=1""" % (base_doc.doctype, '%s'),
+			(base_doc.recurring_id))[0][0])
+
 		new_doc = frappe.get_doc(base_doc.doctype, recurred_documents[0][0])
 
 		for fieldname in ["is_recurring", "recurring_type",
@@ -0,0 +1,163 @@
+# Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+from __future__ import unicode_literals
+
+import json
+import unittest
+import frappe
+from frappe.utils import cint, flt
+from erpnext.controllers.taxes_and_totals import calculate_taxes_and_totals
+
+class TestTaxesAndTotals(unittest.TestCase):
+	def test_calculate_taxes_parity(self):
+		# inclusive taxes, On Previous Row Amount / Total, Actual, item-wise tax rate
+		# and discount amount on grand total and on net total, in base and foreign currency
+		for apply_discount_on, currency, conversion_rate in (("Grand Total", "INR", 1),
+			("Net Total", "INR", 1), ("Grand Total", "USD", 50)):
+
+			args = {
+				"apply_discount_on": apply_discount_on,
+				"currency": currency,
+				"conversion_rate": conversion_rate
+			}
+
+			doc = make_sales_invoice(args)
+			calculate_taxes_and_totals(doc)
+
+			expected = make_sales_invoice(args)
+			baseline_calculate_taxes_and_totals(expected)
+
+			for fieldname in ("total", "base_total", "net_total", "base_net_total",
+				"total_taxes_and_charges", "base_total_taxes_and_charges",
+				"grand_total", "base_grand_total", "discount_amount", "base_discount_amount"):
+					self.assertEqual(doc.get(fieldname), expected.get(fieldname), fieldname)
+
+			for item, expected_item in zip(doc.get("items"), expected.get("items")):
+				for fieldname in ("net_rate", "net_amount", "base_net_rate", "base_net_amount"):
+					self.assertEqual(item.get(fieldname), expected_item.get(fieldname), fieldname)
+
+			for tax, expected_tax in zip(doc.get("taxes"), expected.get("taxes")):
+				for fieldname in ("tax_amount", "tax_amount_after_discount_amount", "total",
+					"base_tax_amount", "base_tax_amount_after_discount_amount", "base_total"):
+						self.assertEqual(tax.get(fieldname), expected_tax.get(fieldname),
+							"{0} of row {1}".format(fieldname, tax.idx))
+
+				self.assertEqual(json.loads(tax.item_wise_tax_detail),
+					json.loads(expected_tax.item_wise_tax_detail))
+
+def make_sales_invoice(args):
+	doc = frappe.copy_doc(frappe.get_test_records("Sales Invoice")[3])
+	doc.update(args)
+	doc.discount_amount = 104.95
+
+	# same item tax rate as the first row, so that the parsed rates are reused
+	item = frappe.copy_doc(doc.get("items")[0])
+	item.item_code = item.item_name = "_Test Item"
+	item.qty = 3
+	doc.append("items", item)
+
+	doc.append("taxes", {
+		"doctype": "Sales Taxes and Charges",
+		"charge_type": "On Previous Row Amount",
+		"account_head": "_Test Account Service Tax - _TC",
+		"cost_center": "_Test Cost Center - _TC",
+		"description": "Service Tax",
+		"rate": 10,
+		"row_id": 8,
+	})
+
+	return doc
+
+class baseline_calculate_taxes_and_totals(calculate_taxes_and_totals):
+	"""Tax calculation as it was before tax row settings were resolved once per row"""
+	def calculate_taxes(self):
+		# maintain actual tax rate based on idx
+		actual_tax_dict = dict([[tax.idx, flt(tax.tax_amount, tax.precision("tax_amount"))]
+			for tax in self.doc.get("taxes") if tax.charge_type == "Actual"])
+
+		for n, item in enumerate(self.doc.get("items")):
+			item_tax_map = self._load_item_tax_rate(item.item_tax_rate)
+
+			for i, tax in enumerate(self.doc.get("taxes")):
+				# tax_amount represents the amount of tax for the current step
+				current_tax_amount = self.get_current_tax_amount(item, tax, item_tax_map)
+
+				# Adjust divisional loss to the last item
+				if tax.charge_type == "Actual":
+					actual_tax_dict[tax.idx] -= current_tax_amount
+					if n == len(self.doc.get("items")) - 1:
+						current_tax_amount += actual_tax_dict[tax.idx]
+
+				# accumulate tax amount into tax.tax_amount
+				if tax.charge_type != "Actual" and \
+					not (self.discount_amount_applied and self.doc.apply_discount_on=="Grand Total"):
+						tax.tax_amount += current_tax_amount
+
+				# store tax_amount for current item as it will be used for
+				# charge type = 'On Previous Row Amount'
+				tax.tax_amount_for_current_item = current_tax_amount
+
+				# set tax after discount
+				tax.tax_amount_after_discount_amount += current_tax_amount
+
+				if getattr(tax, "category", None):
+					# if just for valuation, do not add the tax amount in total
+					# hence, setting it as 0 for further steps
+					current_tax_amount = 0.0 if (tax.category == "Valuation") \
+						else current_tax_amount
+
+					current_tax_amount *= -1.0 if (tax.add_deduct_tax == "Deduct") else 1.0
+
+				# Calculate tax.total viz. grand total till that step
+				# note: grand_total_for_current_item contains the contribution of
+				# item's amount, previously applied tax and the current tax on that item
+				if i==0:
+					tax.grand_total_for_current_item = flt(item.net_amount + current_tax_amount, tax.precision("total"))
+				else:
+					tax.grand_total_for_current_item = \
+						flt(self.doc.get("taxes")[i-1].grand_total_for_current_item + current_tax_amount, tax.precision("total"))
+
+				# in tax.total, accumulate grand total of each item
+				tax.total += tax.grand_total_for_current_item
+
+				# set precision in the last item iteration
+				if n == len(self.doc.get("items")) - 1:
+					self.round_off_totals(tax)
+
+					# adjust Discount Amount loss in last tax iteration
+					if i == (len(self.doc.get("taxes")) - 1) and self.discount_amount_applied \
+						and self.doc.discount_amount and self.doc.apply_discount_on == "Grand Total":
+							self.adjust_discount_amount_loss(tax)
+
+	def get_current_tax_amount(self, item, tax, item_tax_map):
+		tax_rate = self._get_tax_rate(tax, item_tax_map)
+		current_tax_amount = 0.0
+
+		if tax.charge_type == "Actual":
+			# distribute the tax amount proportionally to each item row
+			actual = flt(tax.tax_amount, tax.precision("tax_amount"))
+			current_tax_amount = item.net_amount*actual / self.doc.net_total if self.doc.net_total else 0.0
+
+		elif tax.charge_type == "On Net Total":
+			current_tax_amount = (tax_rate / 100.0) * item.net_amount
+		elif tax.charge_type == "On Previous Row Amount":
+			current_tax_amount = (tax_rate / 100.0) * \
+				self.doc.get("taxes")[cint(tax.row_id) - 1].tax_amount_for_current_item
+		elif tax.charge_type == "On Previous Row Total":
+			current_tax_amount = (tax_rate / 100.0) * \
+				self.doc.get("taxes")[cint(tax.row_id) - 1].grand_total_for_current_item
+
+		current_tax_amount = flt(current_tax_amount, tax.precision("tax_amount"))
+
+		self.set_item_wise_tax(item, tax, tax_rate, current_tax_amount)
+
+		return current_tax_amount
+
+	def set_item_wise_tax(self, item, tax, tax_rate, current_tax_amount):
+		# store tax breakup for each item
+		key = item.item_code or item.item_name
+		item_wise_tax_amount = current_tax_amount*self.doc.conversion_rate
+		if tax.item_wise_tax_detail.get(key):
+			item_wise_tax_amount += tax.item_wise_tax_detail[key][1]
+
+		tax.item_wise_tax_detail[key] = [tax_rate,flt(item_wise_tax_amount, tax.precision("base_tax_amount"))]
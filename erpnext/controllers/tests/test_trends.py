@@ -0,0 +1,34 @@
+# Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+from __future__ import unicode_literals
+
+import unittest
+from frappe.utils import getdate
+from erpnext.controllers.trends import rollup_group_by_data, get_period_date_ranges
+
+class TestTrends(unittest.TestCase):
+	def test_rollup_group_by_data(self):
+		# item_code, item_name, customer, qty, amount, total qty, total amount
+		data = [
+			["_Test Item", "_Test Item", "_Test Customer", 5, 500, 5, 500],
+			["_Test Item", "_Test Item", "_Test Customer 1", None, None, 2, 200],
+			["_Test Item 2", "_Test Item 2", "_Test Customer", 1, 50, 1, 50]
+		]
+
+		self.assertEqual(rollup_group_by_data(data, 2), [
+			["_Test Item", "_Test Item", "", 5, 500, 7, 700],
+			["", "", "_Test Customer", 5, 500, 5, 500],
+			["", "", "_Test Customer 1", None, None, 2, 200],
+			["_Test Item 2", "_Test Item 2", "", 1, 50, 1, 50],
+			["", "", "_Test Customer", 1, 50, 1, 50]
+		])
+
+	def test_period_date_ranges_for_date_range(self):
+		ranges = get_period_date_ranges("Quarterly", year_start_date="2014-11-01",
+			year_end_date="2015-06-15")
+
+		self.assertEqual(ranges, [
+			[getdate("2014-11-01"), getdate("2015-01-31")],
+			[getdate("2015-02-01"), getdate("2015-04-30")],
+			[getdate("2015-05-01"), getdate("2015-06-15")]
+		])
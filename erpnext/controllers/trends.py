@@ -3,7 +3,7 @@
 
 from __future__ import unicode_literals
 import frappe
-from frappe.utils import getdate
+from frappe.utils import getdate, flt, cstr, formatdate
 from frappe import _
 
 def get_columns(filters, trans):
@@ -23,130 +23,153 @@ def get_columns(filters, trans):
 
 	conditions = {"based_on_select": based_on_details["based_on_select"], "period_wise_select": period_select,
 		"columns": columns, "group_by": based_on_details["based_on_group_by"], "grbc": group_by_cols, "trans": trans,
+		"based_on_cols": based_on_details["based_on_cols"], "trans_date": get_trans_date(trans),
 		"addl_tables": based_on_details["addl_tables"], "addl_tables_relational_cond": based_on_details.get("addl_tables_relational_cond", "")}
 
 	return conditions
 
 def validate_filters(filters):
-	for f in ["Fiscal Year", "Based On", "Period", "Company"]:
+	for f in ["Based On", "Period", "Company"]:
 		if not filters.get(f.lower().replace(" ", "_")):
 			frappe.throw(_("{0} is mandatory").format(f))
-			
-	if not frappe.db.exists("Fiscal Year", filters.get("fiscal_year")):
-		frappe.throw(_("Fiscal Year: {0} does not exists").format(filters.get("fiscal_year")))
-		
+
+	if filters.get("from_date") or filters.get("to_date"):
+		if not (filters.get("from_date") and filters.get("to_date")):
+			frappe.throw(_("Please set both From Date and To Date"))
+
+		if getdate(filters.get("from_date")) > getdate(filters.get("to_date")):
+			frappe.throw(_("From Date must be before To Date"))
+
+	else:
+		if not filters.get("fiscal_year"):
+			frappe.throw(_("{0} is mandatory").format(_("Fiscal Year")))
+
+		if not frappe.db.exists("Fiscal Year", filters.get("fiscal_year")):
+			frappe.throw(_("Fiscal Year: {0} does not exists").format(filters.get("fiscal_year")))
+
 	if filters.get("based_on") == filters.get("group_by"):
 		frappe.throw(_("'Based On' and 'Group By' can not be same"))
 
+def get_date_range(filters):
+	"""Returns (from_date, to_date) from date filters, or from Fiscal Year if not set"""
+	if filters.get("from_date") and filters.get("to_date"):
+		return getdate(filters.get("from_date")), getdate(filters.get("to_date"))
+
+	year_start_date, year_end_date = frappe.db.get_value("Fiscal Year",
+		filters.get("fiscal_year"), ["year_start_date", "year_end_date"])
+
+	return getdate(year_start_date), getdate(year_end_date)
+
+def get_trans_date(trans):
+	if trans in ['Purchase Receipt', 'Delivery Note', 'Purchase Invoice', 'Sales Invoice']:
+		return 'posting_date'
+	else:
+		return 'transaction_date'
+
 def get_data(filters, conditions):
-	data = []
-	inc, cond= '',''
+	"""Returns report rows, fetched in a single grouped query.
+
+	If `group_by` is set, the query is grouped by both `based_on` and `group_by` columns
+	and subtotal rows for each `based_on` value are rolled up here"""
+	cond = ''
 	query_details =  conditions["based_on_select"] + conditions["period_wise_select"]
 
 	if conditions["based_on_select"] in ["t1.project_name,", "t2.project_name,"]:
 		cond = 'and '+ conditions["based_on_select"][:-1] +' IS Not NULL'
 
+	from_date, to_date = get_date_range(filters)
+	group_by, order_by = conditions["group_by"], ""
+
 	if filters.get("group_by"):
-		sel_col = ''
-		ind = conditions["columns"].index(conditions["grbc"][0])
-
-		if filters.get("group_by") == 'Item':
-			sel_col = 't2.item_code'
-		elif filters.get("group_by") == 'Customer':
-			sel_col = 't1.customer'
-		elif filters.get("group_by") == 'Supplier':
-			sel_col = 't1.supplier'
-
-		if filters.get('based_on') in ['Item','Customer','Supplier']:
-			inc = 2
-		else :
-			inc = 1
-		data1 = frappe.db.sql(""" select %s from `tab%s` t1, `tab%s Item` t2 %s
-					where t2.parent = t1.name and t1.company = %s and t1.fiscal_year = %s and
-					t1.docstatus = 1 %s %s
-					group by %s
-				""" % (query_details,  conditions["trans"],  conditions["trans"], conditions["addl_tables"], "%s",
-					"%s", conditions.get("addl_tables_relational_cond"), cond, conditions["group_by"]), (filters.get("company"),
-					filters["fiscal_year"]),as_list=1)
-
-		for d in range(len(data1)):
-			#to add blanck column
-			dt = data1[d]
-			dt.insert(ind,'')
-			data.append(dt)
-
-			#to get distinct value of col specified by group_by in filter
-			row = frappe.db.sql("""select DISTINCT(%s) from `tab%s` t1, `tab%s Item` t2 %s
-						where t2.parent = t1.name and t1.company = %s and t1.fiscal_year = %s
-						and t1.docstatus = 1 and %s = %s %s
-					""" %
-					(sel_col,  conditions["trans"],  conditions["trans"], conditions["addl_tables"],
-						"%s", "%s", conditions["group_by"], "%s", conditions.get("addl_tables_relational_cond")),
-					(filters.get("company"), filters.get("fiscal_year"), data1[d][0]), as_list=1)
-
-			for i in range(len(row)):
-				des = ['' for q in range(len(conditions["columns"]))]
-
-				#get data for group_by filter
-				row1 = frappe.db.sql(""" select %s , %s from `tab%s` t1, `tab%s Item` t2 %s
-							where t2.parent = t1.name and t1.company = %s and t1.fiscal_year = %s
-							and t1.docstatus = 1 and %s = %s and %s = %s %s
-						""" %
-						(sel_col, conditions["period_wise_select"], conditions["trans"],
-						 	conditions["trans"], conditions["addl_tables"], "%s", "%s", sel_col,
-							"%s", conditions["group_by"], "%s", conditions.get("addl_tables_relational_cond")),
-						(filters.get("company"), filters.get("fiscal_year"), row[i][0],
-							data1[d][0]), as_list=1)
-
-				des[ind] = row[i]
-				for j in range(1,len(conditions["columns"])-inc):
-					des[j+inc] = row1[0][j]
-
-				data.append(des)
-	else:
-		data = frappe.db.sql(""" select %s from `tab%s` t1, `tab%s Item` t2 %s
-					where t2.parent = t1.name and t1.company = %s and t1.fiscal_year = %s and
-					t1.docstatus = 1 %s %s
-					group by %s
-				""" %
-				(query_details, conditions["trans"], conditions["trans"], conditions["addl_tables"],
-					"%s", "%s", cond, conditions.get("addl_tables_relational_cond", ""), conditions["group_by"]),
-				(filters.get("company"), filters.get("fiscal_year")), as_list=1)
+		sel_col = {
+			"Item": "t2.item_code",
+			"Customer": "t1.customer",
+			"Supplier": "t1.supplier"
+		}.get(filters.get("group_by"))
+
+		query_details = conditions["based_on_select"] + sel_col + ", " + conditions["period_wise_select"]
+		group_by = order_by = "{0}, {1}".format(conditions["group_by"], sel_col)
+
+	data = frappe.db.sql(""" select %s from `tab%s` t1, `tab%s Item` t2 %s
+				where t2.parent = t1.name and t1.company = %s
+				and t1.%s between %s and %s
+				and t1.docstatus = 1 %s %s
+				group by %s %s
+			""" %
+			(query_details, conditions["trans"], conditions["trans"], conditions["addl_tables"],
+				"%s", conditions["trans_date"], "%s", "%s", cond, conditions.get("addl_tables_relational_cond", ""),
+				group_by, "order by " + order_by if order_by else ""),
+			(filters.get("company"), from_date, to_date), as_list=1)
+
+	if filters.get("group_by"):
+		data = rollup_group_by_data(data, len(conditions["based_on_cols"]))
 
 	return data
 
+def rollup_group_by_data(data, based_on_col_count):
+	"""Converts rows grouped by (based_on, group_by) into a subtotal row per `based_on` value
+	followed by a row per `group_by` value.
+
+	Each input row is [based_on columns..., group_by value, period values..., totals]"""
+	out = []
+	subtotal_row = None
+
+	for row in data:
+		based_on_values, values = row[:based_on_col_count], row[based_on_col_count+1:]
+
+		if subtotal_row is None or subtotal_row[0] != based_on_values[0]:
+			subtotal_row = list(based_on_values) + [''] + [None] * len(values)
+			out.append(subtotal_row)
+
+		for i, value in enumerate(values):
+			if value is not None:
+				subtotal_row[based_on_col_count + 1 + i] = \
+					flt(subtotal_row[based_on_col_count + 1 + i]) + flt(value)
+
+		out.append([''] * based_on_col_count + [row[based_on_col_count]] + list(values))
+
+	return out
+
 def get_mon(dt):
 	return getdate(dt).strftime("%b")
 
 def period_wise_columns_query(filters, trans):
 	query_details = ''
 	pwc = []
-	bet_dates = get_period_date_ranges(filters.get("period"), filters.get("fiscal_year"))
+	from_date, to_date = get_date_range(filters)
+	bet_dates = get_period_date_ranges(filters.get("period"), year_start_date=from_date,
+		year_end_date=to_date)
 
-	if trans in ['Purchase Receipt', 'Delivery Note', 'Purchase Invoice', 'Sales Invoice']:
-		trans_date = 'posting_date'
-	else:
-		trans_date = 'transaction_date'
+	trans_date = get_trans_date(trans)
 
-	if filters.get("period") != 'Yearly':
+	# show year in column labels if periods span across calendar years
+	with_year = bool(filters.get("from_date")) and from_date.year != to_date.year
+
+	if filters.get("period") != 'Yearly' or len(bet_dates) > 1:
 		for dt in bet_dates:
-			get_period_wise_columns(dt, filters.get("period"), pwc)
+			get_period_wise_columns(dt, filters.get("period"), pwc, with_year)
 			query_details = get_period_wise_query(dt, trans_date, query_details)
 	else:
-		pwc = [_(filters.get("fiscal_year")) + " ("+_("Qty") + "):Float:120",
-			_(filters.get("fiscal_year")) + " ("+ _("Amt") + "):Currency:120"]
+		label = filters.get("fiscal_year") if not filters.get("from_date") \
+			else "{0} - {1}".format(formatdate(from_date), formatdate(to_date))
+
+		pwc = [_(label) + " ("+_("Qty") + "):Float:120",
+			_(label) + " ("+ _("Amt") + "):Currency:120"]
 		query_details = " SUM(t2.qty), SUM(t2.base_net_amount),"
 
 	query_details += 'SUM(t2.qty), SUM(t2.base_net_amount)'
 	return pwc, query_details
 
-def get_period_wise_columns(bet_dates, period, pwc):
+def get_period_wise_columns(bet_dates, period, pwc, with_year=False):
+	def _label(dt):
+		return _(get_mon(dt)) + (" " + cstr(getdate(dt).year) if with_year else "")
+
 	if period == 'Monthly':
-		pwc += [_(get_mon(bet_dates[0])) + " (" + _("Qty") + "):Float:120",
-			_(get_mon(bet_dates[0])) + " (" + _("Amt") + "):Currency:120"]
+		pwc += [_label(bet_dates[0]) + " (" + _("Qty") + "):Float:120",
+			_label(bet_dates[0]) + " (" + _("Amt") + "):Currency:120"]
 	else:
-		pwc += [_(get_mon(bet_dates[0])) + "-" + _(get_mon(bet_dates[1])) + " (" + _("Qty") + "):Float:120",
-			_(get_mon(bet_dates[0])) + "-" + _(get_mon(bet_dates[1])) + " (" + _("Amt") + "):Currency:120"]
+		pwc += [_label(bet_dates[0]) + "-" + _label(bet_dates[1]) + " (" + _("Qty") + "):Float:120",
+			_label(bet_dates[0]) + "-" + _label(bet_dates[1]) + " (" + _("Amt") + "):Currency:120"]
 
 def get_period_wise_query(bet_dates, trans_date, query_details):
 	query_details += """SUM(IF(t1.%(trans_date)s BETWEEN '%(sd)s' AND '%(ed)s', t2.qty, NULL)),
@@ -155,13 +178,18 @@ def get_period_wise_query(bet_dates, trans_date, query_details):
 	return query_details
 
 @frappe.whitelist(allow_guest=True)
-def get_period_date_ranges(period, fiscal_year=None, year_start_date=None):
+def get_period_date_ranges(period, fiscal_year=None, year_start_date=None, year_end_date=None):
 	from dateutil.relativedelta import relativedelta
 
 	if not year_start_date:
 		year_start_date, year_end_date = frappe.db.get_value("Fiscal Year",
 			fiscal_year, ["year_start_date", "year_end_date"])
 
+	elif not year_end_date:
+		year_end_date = getdate(year_start_date) + relativedelta(years=1, days=-1)
+
+	year_start_date, year_end_date = getdate(year_start_date), getdate(year_end_date)
+
 	increment = {
 		"Monthly": 1,
 		"Quarterly": 3,
@@ -170,14 +198,12 @@ def get_period_date_ranges(period, fiscal_year=None, year_start_date=None):
 	}.get(period)
 
 	period_date_ranges = []
-	for i in xrange(1, 13, increment):
-		period_end_date = getdate(year_start_date) + relativedelta(months=increment, days=-1)
-		if period_end_date > getdate(year_end_date):
+	while year_start_date <= year_end_date:
+		period_end_date = year_start_date + relativedelta(months=increment, days=-1)
+		if period_end_date > year_end_date:
 			period_end_date = year_end_date
 		period_date_ranges.append([year_start_date, period_end_date])
 		year_start_date = period_end_date + relativedelta(days=1)
-		if period_end_date == year_end_date:
-			break
 
 	return period_date_ranges
 
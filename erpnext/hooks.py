@@ -113,6 +113,62 @@ doc_events = {
 	},
 	"Address": {
 		"validate": "erpnext.shopping_cart.cart.set_customer_in_address"
+	},
+	"Item": {
+		"on_update": "erpnext.controllers.master_data.clear_master_data_cache",
+		"on_trash": "erpnext.controllers.master_data.clear_master_data_cache",
+		"after_rename": "erpnext.controllers.master_data.clear_master_data_cache"
+	},
+	"Warehouse": {
+		"on_update": "erpnext.controllers.master_data.clear_master_data_cache",
+		"on_trash": "erpnext.controllers.master_data.clear_master_data_cache",
+		"after_rename": "erpnext.controllers.master_data.clear_master_data_cache"
+	},
+	"Account": {
+		"on_update": "erpnext.controllers.master_data.clear_master_data_cache",
+		"on_trash": "erpnext.controllers.master_data.clear_master_data_cache",
+		"after_rename": "erpnext.controllers.master_data.clear_master_data_cache"
+	},
+	"Company": {
+		"on_update": ["erpnext.controllers.master_data.clear_master_data_cache",
+			"erpnext.startup.boot.clear_boot_cache"],
+		"on_trash": ["erpnext.controllers.master_data.clear_master_data_cache",
+			"erpnext.startup.boot.clear_boot_cache"],
+		"after_rename": ["erpnext.controllers.master_data.clear_master_data_cache",
+			"erpnext.startup.boot.clear_boot_cache"]
+	},
+	"Product Bundle": {
+		"on_update": "erpnext.controllers.master_data.clear_master_data_cache",
+		"on_trash": "erpnext.controllers.master_data.clear_master_data_cache"
+	},
+	"Style Settings": {
+		"on_update": "erpnext.startup.boot.clear_boot_cache"
+	},
+	"Website Settings": {
+		"on_update": "erpnext.startup.boot.clear_boot_cache"
+	},
+	"Notification Control": {
+		"on_update": "erpnext.startup.boot.clear_boot_cache"
+	},
+	"System Settings": {
+		"on_update": "erpnext.startup.boot.clear_boot_cache"
+	},
+	"Global Defaults": {
+		"on_update": "erpnext.startup.boot.clear_boot_cache"
+	},
+	"Letter Head": {
+		"on_update": "erpnext.startup.boot.clear_boot_cache",
+		"on_trash": "erpnext.startup.boot.clear_boot_cache",
+		"after_rename": "erpnext.startup.boot.clear_boot_cache"
+	},
+	"Country": {
+		"on_update": "erpnext.startup.boot.clear_boot_cache",
+		"on_trash": "erpnext.startup.boot.clear_boot_cache"
+	},
+	"Currency": {
+		"on_update": "erpnext.startup.boot.clear_boot_cache",
+		"on_trash": "erpnext.startup.boot.clear_boot_cache",
+		"after_rename": "erpnext.startup.boot.clear_boot_cache"
 	}
 }
 
@@ -126,7 +182,8 @@ scheduler_events = {
 		"erpnext.support.doctype.issue.issue.auto_close_tickets",
 		"erpnext.accounts.doctype.fiscal_year.fiscal_year.auto_create_fiscal_year",
 		"erpnext.hr.doctype.employee.employee.send_birthday_reminders",
-		"erpnext.projects.doctype.task.task.set_tasks_as_overdue"
+		"erpnext.projects.doctype.task.task.set_tasks_as_overdue",
+		"erpnext.setup.utils.update_exchange_rates"
 	]
 }
 
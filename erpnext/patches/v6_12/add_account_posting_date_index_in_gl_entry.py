@@ -0,0 +1,5 @@
+from __future__ import unicode_literals
+
+def execute():
+	from erpnext.accounts.doctype.gl_entry.gl_entry import on_doctype_update
+	on_doctype_update()
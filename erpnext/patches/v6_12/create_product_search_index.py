@@ -0,0 +1,8 @@
+from __future__ import unicode_literals
+import frappe
+
+def execute():
+	frappe.reload_doctype("Item")
+
+	from erpnext.utilities.product_search import rebuild_product_search_index
+	rebuild_product_search_index()
@@ -366,7 +366,8 @@ erpnext.TransactionController = erpnext.taxes_and_totals.extend({
 			method: "erpnext.setup.utils.get_exchange_rate",
 			args: {
 				from_currency: from_currency,
-				to_currency: to_currency
+				to_currency: to_currency,
+				transaction_date: this.frm.doc.posting_date || this.frm.doc.transaction_date
 			},
 			callback: function(r) {
 				callback(flt(r.message));
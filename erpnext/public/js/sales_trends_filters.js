@@ -47,6 +47,16 @@ var get_filters = function(){
 			"options":'Fiscal Year',
 			"default": sys_defaults.fiscal_year
 		},
+		{
+			"fieldname":"from_date",
+			"label": __("From Date"),
+			"fieldtype": "Date"
+		},
+		{
+			"fieldname":"to_date",
+			"label": __("To Date"),
+			"fieldtype": "Date"
+		},
 		{
 			"fieldname":"company",
 			"label": __("Company"),
@@ -84,6 +84,35 @@ class TestSalesOrder(unittest.TestCase):
 		so.load_from_db()
 		self.assertEquals(so.get("items")[0].delivered_qty, 9)
 
+	def test_update_qty_for_multiple_rows(self):
+		so = make_sales_order(item_list=[{
+			"item_code": item_code,
+			"warehouse": "_Test Warehouse - _TC",
+			"qty": 10,
+			"rate": 100,
+			"conversion_factor": 1.0
+		} for item_code in ("_Test Item", "_Test Item Home Desktop 100", "_Test Item")])
+
+		frappe.db.set_value("Stock Settings", None, "allow_negative_stock", 1)
+
+		dn = make_delivery_note(so.name)
+		for d, qty in zip(dn.get("items"), (10, 4, 1)):
+			d.qty = qty
+		dn.insert()
+		dn.submit()
+
+		so.load_from_db()
+		self.assertEquals([d.delivered_qty for d in so.get("items")], [10, 4, 1])
+		self.assertEquals(so.per_delivered, 50)
+		self.assertEquals(so.delivery_status, "Partly Delivered")
+
+		dn.cancel()
+
+		so.load_from_db()
+		self.assertEquals([d.delivered_qty for d in so.get("items")], [0, 0, 0])
+		self.assertEquals(so.per_delivered, 0)
+		self.assertEquals(so.delivery_status, "Not Delivered")
+
 	def test_reserved_qty_for_partial_delivery(self):
 		existing_reserved_qty = get_reserved_qty()
 
@@ -6,14 +6,24 @@
 from __future__ import unicode_literals
 import frappe
 from frappe import _
+from frappe.utils import getdate
+from erpnext.setup.utils import clear_exchange_rate_cache
 from frappe.model.document import Document
 
 class CurrencyExchange(Document):
 	def autoname(self):
 		self.name = self.from_currency + "-" + self.to_currency
+		if self.date:
+			self.name += "-" + getdate(self.date).strftime("%Y-%m-%d")
 
 	def validate(self):
 		self.validate_value("exchange_rate", ">", 0)
 
 		if self.from_currency == self.to_currency:
 			frappe.throw(_("From Currency and To Currency cannot be same"))
+
+	def on_update(self):
+		clear_exchange_rate_cache()
+
+	def on_trash(self):
+		clear_exchange_rate_cache()
@@ -3,5 +3,43 @@
 from __future__ import unicode_literals
 
 
-import frappe
-test_records = frappe.get_test_records('Currency Exchange')
\ No newline at end of file
+import frappe, unittest
+from erpnext.setup.utils import get_exchange_rate, import_exchange_rates, clear_exchange_rate_cache
+
+test_records = frappe.get_test_records('Currency Exchange')
+
+class TestCurrencyExchange(unittest.TestCase):
+	def test_dated_exchange_rate(self):
+		frappe.db.sql("""delete from `tabCurrency Exchange`
+			where from_currency='USD' and to_currency='INR' and date is not null""")
+		clear_exchange_rate_cache()
+
+		# rate without date from test records
+		self.assertEquals(get_exchange_rate("USD", "INR", "2015-12-01"), 60.0)
+
+		import_exchange_rates([("2015-12-01", "USD", "INR", 65.0), ("2015-12-10", "USD", "INR", 66.0)])
+
+		self.assertEquals(get_exchange_rate("USD", "INR", "2015-11-30"), 60.0)
+		self.assertEquals(get_exchange_rate("USD", "INR", "2015-12-01"), 65.0)
+		self.assertEquals(get_exchange_rate("USD", "INR", "2015-12-09"), 65.0)
+		self.assertEquals(get_exchange_rate("USD", "INR", "2015-12-20"), 66.0)
+
+		# updating a dated rate
+		import_exchange_rates([("2015-12-10", "USD", "INR", 67.0)])
+		self.assertEquals(get_exchange_rate("USD", "INR", "2015-12-20"), 67.0)
+
+		# existing rates are kept when not updating
+		import_exchange_rates([("2015-12-10", "USD", "INR", 68.0), ("2016-01-05", "USD", "INR", 69.0)],
+			update_existing=False)
+		self.assertEquals(get_exchange_rate("USD", "INR", "2015-12-20"), 67.0)
+
+		# last rate of the previous year is effective till the first rate of the year
+		self.assertEquals(get_exchange_rate("USD", "INR", "2016-01-04"), 67.0)
+		self.assertEquals(get_exchange_rate("USD", "INR", "2016-01-05"), 69.0)
+		self.assertEquals(get_exchange_rate("USD", "INR", "2017-06-01"), 69.0)
+
+		for name in frappe.db.sql_list("""select name from `tabCurrency Exchange`
+			where from_currency='USD' and to_currency='INR' and date is not null"""):
+			frappe.delete_doc("Currency Exchange", name)
+
+		self.assertEquals(get_exchange_rate("USD", "INR", "2015-12-20"), 60.0)
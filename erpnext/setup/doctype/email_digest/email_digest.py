@@ -5,15 +5,23 @@ from __future__ import unicode_literals
 import frappe
 from frappe import _
 from frappe.utils import fmt_money, formatdate, format_time, now_datetime, \
-	get_url_to_form, get_url_to_list, flt
+	get_url_to_form, get_url_to_list, flt, getdate, nowdate
 from datetime import timedelta
 from dateutil.relativedelta import relativedelta
 from frappe.core.doctype.user.user import STANDARD_USERS
 import frappe.desk.notifications
-from erpnext.accounts.utils import get_balance_on
+from erpnext.accounts.utils import get_fiscal_year, FiscalYearError
 
 user_specific_content = ["calendar_events", "todo_list"]
 
+accounting_cards = ("income", "expenses_booked", "income_year_to_date", "expense_year_to_date",
+	"invoiced_amount", "payables", "bank_balance")
+
+# root types of profit and loss accounts and account types of balance sheet accounts
+# for which balances are computed for the cards
+pl_root_types = ("Income", "Expense")
+balance_sheet_account_types = ("Bank", "Payable", "Receivable")
+
 from frappe.model.document import Document
 class EmailDigest(Document):
 	def __init__(self, arg1, arg2=None):
@@ -21,7 +29,6 @@ class EmailDigest(Document):
 
 		self.from_date, self.to_date = self.get_from_to_date()
 		self.set_dates()
-		self._accounts = {}
 		self.currency = frappe.db.get_value("Company", self.company,
 			"default_currency")
 
@@ -151,25 +158,16 @@ class EmailDigest(Document):
 		if not user_id:
 			user_id = frappe.session.user
 
-		todo_list = frappe.db.sql("""select *
-			from `tabToDo` where (owner=%s or assigned_by=%s) and status="Open"
-			order by field(priority, 'High', 'Medium', 'Low') asc, date asc limit 20""",
-			(user_id, user_id), as_dict=True)
-
-		for t in todo_list:
-			t.link = get_url_to_form("ToDo", t.name)
-
-		return todo_list
+		return get_todo_lists([user_id])[user_id]
 
 	def set_accounting_cards(self, context):
 		"""Create accounting cards if checked"""
 
 		cache = frappe.cache()
 		context.cards = []
-		for key in ("income", "expenses_booked", "income_year_to_date", "expense_year_to_date",
-			"invoiced_amount", "payables", "bank_balance"):
+		for key in accounting_cards:
 			if self.get(key):
-				cache_key = "email_digest:card:{0}:{1}".format(self.company, key)
+				cache_key = "email_digest:card:{0}:{1}:{2}".format(self.company, self.frequency, key)
 				card = cache.get(cache_key)
 
 				if card:
@@ -198,7 +196,7 @@ class EmailDigest(Document):
 
 	def get_income(self):
 		"""Get income for given period"""
-		income, past_income = self.get_period_amounts(self.get_root_type_accounts("income"))
+		income, past_income = self.get_period_amounts("Income")
 
 		return {
 			"label": self.meta.get_label("income"),
@@ -216,14 +214,9 @@ class EmailDigest(Document):
 
 	def get_year_to_date_balance(self, root_type):
 		"""Get income to date"""
-		balance = 0.0
-
-		for account in self.get_root_type_accounts(root_type):
-			balance += get_balance_on(account, date = self.future_to_date)
-
 		return {
 			"label": self.meta.get_label(root_type + "_year_to_date"),
-			"value": balance
+			"value": self.get_balance(root_type.title(), self.future_to_date)
 		}
 
 	def get_bank_balance(self):
@@ -237,7 +230,7 @@ class EmailDigest(Document):
 		return self.get_type_balance('invoiced_amount', 'Receivable')
 
 	def get_expenses_booked(self):
-		expense, past_expense = self.get_period_amounts(self.get_root_type_accounts("expense"))
+		expense, past_expense = self.get_period_amounts("Expense")
 
 		return {
 			"label": self.meta.get_label("expenses_booked"),
@@ -245,40 +238,29 @@ class EmailDigest(Document):
 			"last_value": past_expense
 		}
 
-	def get_period_amounts(self, accounts):
+	def get_period_amounts(self, root_type):
 		"""Get amounts for current and past periods"""
-		balance = past_balance = 0.0
-		for account in accounts:
-			balance += (get_balance_on(account, date = self.future_to_date)
-				- get_balance_on(account, date = self.future_from_date))
+		balance = self.get_balance(root_type, self.future_to_date) \
+			- self.get_balance(root_type, self.future_from_date)
 
-			past_balance += (get_balance_on(account, date = self.past_to_date)
-				- get_balance_on(account, date = self.past_from_date))
+		past_balance = self.get_balance(root_type, self.past_to_date) \
+			- self.get_balance(root_type, self.past_from_date)
 
 		return balance, past_balance
 
 	def get_type_balance(self, fieldname, account_type):
-		accounts = [d.name for d in \
-			frappe.db.get_all("Account", filters={"account_type": account_type,
-				"company": self.company, "is_group": 0})]
-
-		balance = prev_balance = 0.0
-		for account in accounts:
-			balance += get_balance_on(account, date=self.future_from_date)
-			prev_balance += get_balance_on(account, date=self.past_from_date)
-
 		return {
 			'label': self.meta.get_label(fieldname),
-			'value': balance,
-			'last_value': prev_balance
+			'value': self.get_balance(account_type, self.future_from_date),
+			'last_value': self.get_balance(account_type, self.past_from_date)
 		}
 
-	def get_root_type_accounts(self, root_type):
-		if not root_type in self._accounts:
-			self._accounts[root_type] = [d.name for d in \
-				frappe.db.get_all("Account", filters={"root_type": root_type.title(),
-					"company": self.company, "is_group": 0})]
-		return self._accounts[root_type]
+	def get_balance(self, key, date):
+		"""Balance of root type or account type `key` of the company on `date`"""
+		return get_digest_balances(self.company, self.get_balance_dates())[getdate(date)].get(key, 0.0)
+
+	def get_balance_dates(self):
+		return [self.future_from_date, self.future_to_date, self.past_from_date, self.past_to_date]
 
 	def get_from_to_date(self):
 		today = now_datetime().date()
@@ -339,11 +321,128 @@ class EmailDigest(Document):
 def send():
 	now_date = now_datetime().date()
 
+	digests = []
 	for ed in frappe.db.sql("""select name from `tabEmail Digest`
 			where enabled=1 and docstatus<2""", as_list=1):
 		ed_obj = frappe.get_doc('Email Digest', ed[0])
 		if (now_date == ed_obj.get_next_sending()):
-			ed_obj.send()
+			digests.append(ed_obj)
+
+	# compute figures of all digests of a company and to-do lists of all recipients together
+	dates = {}
+	for ed_obj in digests:
+		if any([ed_obj.get(key) for key in accounting_cards]):
+			dates.setdefault(ed_obj.company, []).extend(ed_obj.get_balance_dates())
+
+	for company in dates:
+		get_digest_balances(company, dates[company])
+
+	get_todo_lists(list(set([user for ed_obj in digests
+		for user in (ed_obj.recipient_list or "").split("\n") if user])))
+
+	for ed_obj in digests:
+		ed_obj.send()
+
+def get_digest_balances(company, dates):
+	"""Returns balances of the company on each of the dates as {date: {key: balance}}
+	where key is a root type in `pl_root_types` or an account type in `balance_sheet_account_types`.
+
+	Balances are computed like `get_balance_on` for all the dates together, with one
+	grouped query for profit and loss and one for balance sheet accounts. They are
+	kept till the end of the request, to be shared by all digests of the company."""
+	if not getattr(frappe.local, "email_digest_balances", None):
+		frappe.local.email_digest_balances = {}
+
+	balances = frappe.local.email_digest_balances.setdefault(company, {})
+	missing = list(set([getdate(d) for d in dates if getdate(d) not in balances]))
+
+	year_start_dates = {}
+	for date in missing:
+		balances[date] = {}
+		year_start_date = get_year_start_date(date)
+
+		# like `get_balance_on`, balance is 0 on dates before the first fiscal year
+		if year_start_date:
+			year_start_dates[date] = year_start_date
+
+	if year_start_dates:
+		load_balances(company, balances, year_start_dates.keys(), "root_type", pl_root_types,
+			from_dates=year_start_dates)
+		load_balances(company, balances, year_start_dates.keys(), "account_type",
+			balance_sheet_account_types)
+
+	return balances
+
+def load_balances(company, balances, dates, group_by, keys, from_dates=None):
+	"""Set balance of accounts grouped by `group_by` on each of the dates in one query.
+
+	If `from_dates` is set (profit and loss accounts), only entries on or after
+	the from date of each date are summed"""
+	values = {"company": company, "to_date": max(dates)}
+	conditions = ["acc.{0} in ({1})".format(group_by,
+		", ".join(["%(key_{0})s".format(i) for i in xrange(len(keys))]))]
+
+	for i, key in enumerate(keys):
+		values["key_{0}".format(i)] = key
+
+	columns = []
+	for i, date in enumerate(dates):
+		values["date_{0}".format(i)] = date
+		if from_dates:
+			values["from_date_{0}".format(i)] = from_dates[date]
+			date_condition = "gle.posting_date between %(from_date_{0})s and %(date_{0})s".format(i)
+		else:
+			date_condition = "gle.posting_date <= %(date_{0})s".format(i)
+
+		columns.append("sum(if({0}, gle.debit_in_account_currency - gle.credit_in_account_currency, 0))"
+			.format(date_condition))
+
+	if from_dates:
+		values["from_date"] = min(from_dates.values())
+		conditions.append("gle.posting_date >= %(from_date)s and gle.voucher_type != 'Period Closing Voucher'")
+
+	for d in frappe.db.sql("""select acc.{group_by}, {columns}
+		from `tabGL Entry` gle, `tabAccount` acc
+		where gle.account = acc.name and acc.company = %(company)s and acc.is_group = 0
+			and gle.posting_date <= %(to_date)s and {conditions}
+		group by acc.{group_by}""".format(group_by=group_by, columns=", ".join(columns),
+			conditions=" and ".join(conditions)), values):
+
+		for i, date in enumerate(dates):
+			balances[date][d[0]] = flt(d[i + 1])
+
+def get_year_start_date(date):
+	"""Start of the fiscal year of `date` used for profit and loss balances, as in `get_balance_on`"""
+	try:
+		return get_fiscal_year(date, verbose=0)[1]
+	except FiscalYearError:
+		if getdate(date) > getdate(nowdate()):
+			return get_fiscal_year(nowdate(), verbose=0)[1]
+
+def get_todo_lists(users):
+	"""Returns open to-dos (20 per user, by priority) of each user as {user: todo_list},
+	fetched for all users not loaded in the request in one query"""
+	if not getattr(frappe.local, "email_digest_todo_lists", None):
+		frappe.local.email_digest_todo_lists = {}
+
+	todo_lists = frappe.local.email_digest_todo_lists
+	missing = [user for user in set(users) if user not in todo_lists]
+
+	if missing:
+		for user in missing:
+			todo_lists[user] = []
+
+		for t in frappe.db.sql("""select *
+			from `tabToDo` where (owner in ({0}) or assigned_by in ({0})) and status="Open"
+			order by field(priority, 'High', 'Medium', 'Low') asc, date asc""".format(
+				", ".join(["%s"] * len(missing))), tuple(missing + missing), as_dict=True):
+
+			t.link = get_url_to_form("ToDo", t.name)
+			for user in set([t.owner, t.assigned_by]):
+				if user in missing and len(todo_lists[user]) < 20:
+					todo_lists[user].append(t)
+
+	return todo_lists
 
 @frappe.whitelist()
 def get_digest_msg(name):
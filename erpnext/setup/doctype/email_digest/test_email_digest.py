@@ -5,8 +5,28 @@ from __future__ import unicode_literals
 
 import frappe
 import unittest
+from frappe.utils import flt, getdate, nowdate, add_days
+from erpnext.accounts.utils import get_balance_on
+from erpnext.setup.doctype.email_digest.email_digest import get_digest_balances
 
 # test_records = frappe.get_test_records('Email Digest')
 
 class TestEmailDigest(unittest.TestCase):
-	pass
+	def test_digest_balances(self):
+		from erpnext.accounts.doctype.journal_entry.test_journal_entry import make_journal_entry
+
+		make_journal_entry("_Test Bank - _TC", "Sales - _TC", 400, "_Test Cost Center - _TC", submit=True)
+
+		frappe.local.email_digest_balances = {}
+		dates = [getdate(nowdate()), getdate(add_days(nowdate(), -7))]
+		balances = get_digest_balances("_Test Company", dates)
+
+		for date in dates:
+			for key, filters in (("Income", {"root_type": "Income"}), ("Expense", {"root_type": "Expense"}),
+				("Bank", {"account_type": "Bank"})):
+
+				filters.update({"company": "_Test Company", "is_group": 0})
+				expected = sum([get_balance_on(d.name, date=date)
+					for d in frappe.get_all("Account", filters=filters)])
+
+				self.assertEquals(flt(balances[date].get(key), 2), flt(expected, 2))
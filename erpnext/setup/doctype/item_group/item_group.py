@@ -4,11 +4,12 @@
 from __future__ import unicode_literals
 import frappe
 import urllib
-from frappe.utils import nowdate
+from frappe.utils import nowdate, cint
 from frappe.utils.nestedset import NestedSet
 from frappe.website.website_generator import WebsiteGenerator
 from frappe.website.render import clear_cache
 from frappe.website.doctype.website_slideshow.website_slideshow import get_slideshow
+from erpnext.utilities.product_search import search_products
 
 
 class ItemGroup(NestedSet, WebsiteGenerator):
@@ -25,6 +26,7 @@ class ItemGroup(NestedSet, WebsiteGenerator):
 	def on_update(self):
 		NestedSet.on_update(self)
 		WebsiteGenerator.on_update(self)
+		clear_item_group_cache()
 		invalidate_cache_for(self)
 		self.validate_name_with_item()
 		self.validate_one_root()
@@ -32,10 +34,13 @@ class ItemGroup(NestedSet, WebsiteGenerator):
 	def after_rename(self, olddn, newdn, merge=False):
 		NestedSet.after_rename(self, olddn, newdn, merge)
 		WebsiteGenerator.after_rename(self, olddn, newdn, merge)
+		clear_item_group_cache()
+		frappe.cache().delete_value("item_group_product_list:" + olddn)
 
 	def on_trash(self):
 		NestedSet.on_trash(self)
 		WebsiteGenerator.on_trash(self)
+		clear_item_group_cache()
 
 	def set_parent_website_route(self):
 		"""Overwrite `parent_website_route` from `WebsiteGenerator`.
@@ -63,7 +68,22 @@ class ItemGroup(NestedSet, WebsiteGenerator):
 
 		return context
 
-def get_product_list_for_group(product_group=None, start=0, limit=10):
+def get_product_list_for_group(product_group=None, start=0, limit=10, search=None):
+	if search:
+		data = search_products(search, [d[0] for d in get_child_groups(product_group)], start, limit)
+		for d in data:
+			d.route = ((d.parent_website_route + "/") if d.parent_website_route else "") \
+				+ (d.page_name or "")
+
+		return [get_item_for_list_in_html(r) for r in data]
+
+	data = frappe.cache().hget("item_group_product_list:" + product_group,
+		"{0}:{1}:{2}".format(start, limit, nowdate()),
+		lambda: get_product_rows_for_group(product_group, start, limit))
+
+	return [get_item_for_list_in_html(r) for r in data]
+
+def get_product_rows_for_group(product_group, start=0, limit=10):
 	child_groups = ", ".join(['"' + i[0] + '"' for i in get_child_groups(product_group)])
 
 	# base query
@@ -79,17 +99,18 @@ def get_product_list_for_group(product_group=None, start=0, limit=10):
 			or name in (select parent from `tabWebsite Item Group` where item_group in ({child_groups})))
 			""".format(child_groups=child_groups)
 
-	query += """order by weightage desc, modified desc limit %s, %s""" % (start, limit)
-
-	data = frappe.db.sql(query, {"product_group": product_group, "today": nowdate()}, as_dict=1)
+	query += """order by weightage desc, modified desc limit %s, %s""" % (cint(start), cint(limit))
 
-	return [get_item_for_list_in_html(r) for r in data]
+	return frappe.db.sql(query, {"product_group": product_group, "today": nowdate()}, as_dict=1)
 
 def get_child_groups(item_group_name):
-	item_group = frappe.get_doc("Item Group", item_group_name)
-	return frappe.db.sql("""select name
-		from `tabItem Group` where lft>=%(lft)s and rgt<=%(rgt)s
-			and show_in_website = 1""", {"lft": item_group.lft, "rgt": item_group.rgt})
+	def _get():
+		item_group = frappe.get_doc("Item Group", item_group_name)
+		return frappe.db.sql("""select name
+			from `tabItem Group` where lft>=%(lft)s and rgt<=%(rgt)s
+				and show_in_website = 1""", {"lft": item_group.lft, "rgt": item_group.rgt})
+
+	return frappe.cache().hget("item_group_child_groups", item_group_name, _get)
 
 def get_item_for_list_in_html(context):
 	# add missing absolute link in files
@@ -99,27 +120,62 @@ def get_item_for_list_in_html(context):
 	return frappe.get_template("templates/includes/product_in_grid.html").render(context)
 
 def get_group_item_count(item_group):
-	child_groups = ", ".join(['"' + i[0] + '"' for i in get_child_groups(item_group)])
-	return frappe.db.sql("""select count(*) from `tabItem`
-		where docstatus = 0 and show_in_website = 1
-		and (item_group in (%s)
-			or name in (select parent from `tabWebsite Item Group`
-				where item_group in (%s))) """ % (child_groups, child_groups))[0][0]
-
+	counts = frappe.cache().get_value("item_group_item_counts")
+	if counts is None:
+		counts = get_group_item_counts()
+		frappe.cache().set_value("item_group_item_counts", counts)
+
+	return counts.get(item_group, 0)
+
+def get_group_item_counts():
+	"""Returns number of website items in the subtree of every Item Group,
+	computed in one pass over all items and groups"""
+	groups = frappe.db.sql("""select name, lft, rgt, show_in_website
+		from `tabItem Group`""", as_dict=True)
+
+	# groups containing each visible group (including itself)
+	ancestors = {}
+	for g in groups:
+		if g.show_in_website:
+			ancestors[g.name] = [d.name for d in groups if d.lft <= g.lft and d.rgt >= g.rgt]
+
+	items_in_subtree = {}
+	for item_code, item_group in frappe.db.sql("""select name, item_group from `tabItem`
+			where docstatus = 0 and show_in_website = 1
+		union
+		select wig.parent, wig.item_group from `tabWebsite Item Group` wig, `tabItem` item
+			where wig.parent = item.name and item.docstatus = 0 and item.show_in_website = 1"""):
+		for group in ancestors.get(item_group, []):
+			items_in_subtree.setdefault(group, set()).add(item_code)
+
+	return dict((group, len(items)) for group, items in items_in_subtree.items())
 
 def get_parent_item_groups(item_group_name):
-	item_group = frappe.get_doc("Item Group", item_group_name)
-	return frappe.db.sql("""select name, page_name from `tabItem Group`
-		where lft <= %s and rgt >= %s
-		and show_in_website=1
-		order by lft asc""", (item_group.lft, item_group.rgt), as_dict=True)
+	def _get():
+		item_group = frappe.get_doc("Item Group", item_group_name)
+		return frappe.db.sql("""select name, page_name from `tabItem Group`
+			where lft <= %s and rgt >= %s
+			and show_in_website=1
+			order by lft asc""", (item_group.lft, item_group.rgt), as_dict=True)
+
+	return frappe.cache().hget("item_group_parents", item_group_name, _get)
 
 def invalidate_cache_for(doc, item_group=None):
 	if not item_group:
 		item_group = doc.name
 
 	for d in get_parent_item_groups(item_group):
+		frappe.cache().delete_value("item_group_product_list:" + d.name)
+
 		d = frappe.get_doc("Item Group", d.name)
 		route = d.get_route()
 		if route:
 			clear_cache(route)
+
+	frappe.cache().delete_value("item_group_item_counts")
+
+def clear_item_group_cache():
+	"""Clear cached tree and listings of all groups, when a group is added, moved or removed"""
+	frappe.cache().delete_value(["item_group_child_groups", "item_group_parents",
+		"item_group_item_counts"] + ["item_group_product_list:" + name
+			for name in frappe.db.sql_list("select name from `tabItem Group`")])
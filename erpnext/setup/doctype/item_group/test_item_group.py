@@ -205,3 +205,26 @@ class TestItem(unittest.TestCase):
 	def test_merge_group_into_leaf(self):
 		self.assertRaises(NestedSetInvalidMergeError, frappe.rename_doc, "Item Group", "_Test Item Group B",
 			"_Test Item Group B - 3", merge=True)
+
+	def test_cached_product_list(self):
+		from erpnext.stock.doctype.item.test_item import make_item
+		from erpnext.setup.doctype.item_group.item_group import (get_group_item_count,
+			get_product_rows_for_group, get_product_list_for_group)
+
+		item_group = frappe.get_doc("Item Group", "_Test Item Group Desktops")
+		item_group.show_in_website = 1
+		item_group.save()
+
+		frappe.delete_doc_if_exists("Item", "_Test Website Desktop")
+		count = get_group_item_count("_Test Item Group Desktops")
+		get_product_list_for_group("_Test Item Group Desktops")
+
+		make_item("_Test Website Desktop", {"item_group": "_Test Item Group Desktops",
+			"show_in_website": 1})
+
+		# cache is cleared when the item is saved
+		self.assertEquals(get_group_item_count("_Test Item Group Desktops"), count + 1)
+		self.assertEquals(len(get_product_list_for_group("_Test Item Group Desktops")),
+			len(get_product_rows_for_group("_Test Item Group Desktops")))
+		self.assertTrue("_Test Website Desktop" in
+			[d.name for d in get_product_rows_for_group("_Test Item Group Desktops")])
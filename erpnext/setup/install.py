@@ -4,6 +4,7 @@
 from __future__ import unicode_literals
 
 import frappe
+from erpnext.utilities.product_search import setup_product_search_table
 
 default_mail_footer = """<div style="padding: 7px; text-align: right; color: #888"><small>Sent via
 	<a style="color: #888" href="http://erpnext.org">ERPNext</a></div>"""
@@ -15,6 +16,7 @@ def after_install():
 	from erpnext.setup.setup_wizard.setup_wizard import add_all_roles_to
 	add_all_roles_to("Administrator")
 	add_web_forms()
+	setup_product_search_table()
 	frappe.db.commit()
 
 def feature_setup():
@@ -2,12 +2,14 @@
 # License: GNU General Public License v3. See license.txt
 
 from __future__ import unicode_literals
+import bisect
 import frappe
 from frappe import _, throw
-from frappe.utils import flt
+from frappe.utils import flt, getdate, nowdate
+from erpnext.controllers.master_data import get_master_value
 
 def get_company_currency(company):
-	currency = frappe.db.get_value("Company", company, "default_currency", cache=True)
+	currency = get_master_value("Company", company, "default_currency")
 	if not currency:
 		currency = frappe.db.get_default("currency")
 	if not currency:
@@ -62,33 +64,117 @@ def before_tests():
 	frappe.db.commit()
 
 @frappe.whitelist()
-def get_exchange_rate(from_currency, to_currency):
+def get_exchange_rate(from_currency, to_currency, transaction_date=None):
+	"""Returns exchange rate from Currency Exchange effective on `transaction_date` (today
+	by default). Rates of a currency pair are loaded a year at a time and looked up by date,
+	they are never fetched from the network here (see `update_exchange_rates`)."""
 	if from_currency == to_currency:
 		return 1
-	
-	exchange = "%s-%s" % (from_currency, to_currency)
-	value = flt(frappe.db.get_value("Currency Exchange", exchange, "exchange_rate"))
+
+	transaction_date = getdate(transaction_date or nowdate())
+	rates = get_exchange_rates(from_currency, to_currency, transaction_date.year)
+
+	# latest dated rate on or before the date, else the rate without date
+	i = bisect.bisect_right(rates.dates, transaction_date) - 1
+	value = rates.rates[i] if i >= 0 else rates.default
 
 	if not value:
+		frappe.msgprint(_("Unable to find exchange rate for {0} to {1}").format(from_currency, to_currency))
+		return 0.0
+
+	return value
+
+def get_exchange_rates(from_currency, to_currency, year):
+	"""Returns rates of the currency pair effective in the year, cached for the request and in redis"""
+	if getattr(frappe.local, "exchange_rates", None) is None:
+		frappe.local.exchange_rates = {}
+
+	key = "{0}:{1}:{2}".format(from_currency, to_currency, year)
+	if key not in frappe.local.exchange_rates:
+		frappe.local.exchange_rates[key] = frappe.cache().hget("currency_exchange_rates", key,
+			lambda: build_exchange_rates(from_currency, to_currency, year))
+
+	return frappe.local.exchange_rates[key]
+
+def build_exchange_rates(from_currency, to_currency, year):
+	"""Returns the rate without date and the dated rates of the year, starting with the
+	last rate before the year which is effective till the first rate of the year"""
+	year_start_date = getdate("{0}-01-01".format(year))
+	rates = frappe._dict({"default": None, "dates": [], "rates": []})
+
+	default = frappe.db.sql("""select exchange_rate from `tabCurrency Exchange`
+		where from_currency=%s and to_currency=%s and ifnull(date, '')=''""", (from_currency, to_currency))
+	if default:
+		rates.default = flt(default[0][0])
+
+	for date, exchange_rate in frappe.db.sql("""(select date, exchange_rate from `tabCurrency Exchange`
+			where from_currency=%(from_currency)s and to_currency=%(to_currency)s
+			and date < %(year_start_date)s order by date desc limit 1)
+		union all
+		(select date, exchange_rate from `tabCurrency Exchange`
+			where from_currency=%(from_currency)s and to_currency=%(to_currency)s
+			and date >= %(year_start_date)s and date <= %(year_end_date)s)
+		order by date asc""", {
+			"from_currency": from_currency,
+			"to_currency": to_currency,
+			"year_start_date": year_start_date,
+			"year_end_date": getdate("{0}-12-31".format(year))
+		}):
+		rates.dates.append(getdate(date))
+		rates.rates.append(flt(exchange_rate))
+
+	return rates
+
+def clear_exchange_rate_cache():
+	frappe.cache().delete_value("currency_exchange_rates")
+	frappe.local.exchange_rates = None
+
+def import_exchange_rates(rows, update_existing=True):
+	"""Create or update dated exchange rates from rows of (date, from currency, to currency, rate),
+	e.g. read from a rate file with `frappe.utils.csvutils.read_csv_content`
+
+	:param update_existing: If not set, rates already present for the date are left as they are."""
+	for date, from_currency, to_currency, exchange_rate in rows:
+		name = frappe.db.get_value("Currency Exchange", {"date": getdate(date),
+			"from_currency": from_currency, "to_currency": to_currency})
+
+		if name:
+			if not update_existing:
+				continue
+			doc = frappe.get_doc("Currency Exchange", name)
+		else:
+			doc = frappe.new_doc("Currency Exchange")
+			doc.update({
+				"date": getdate(date),
+				"from_currency": from_currency,
+				"to_currency": to_currency
+			})
+
+		doc.exchange_rate = flt(exchange_rate)
+		doc.save()
+
+def update_exchange_rates():
+	"""Fetch today's rates of price list currencies into company currencies, for pairs
+	without a rate set manually (scheduled daily). Existing rates of today are not overwritten"""
+	pairs = frappe.db.sql("""select distinct pl.currency, company.default_currency
+		from `tabPrice List` pl, `tabCompany` company
+		where pl.enabled=1 and pl.currency != company.default_currency
+			and not exists(select name from `tabCurrency Exchange` ce
+				where ce.from_currency=pl.currency and ce.to_currency=company.default_currency
+				and (ifnull(ce.date, '')='' or ce.date=%s))""", nowdate())
+
+	import requests
+	rows = []
+	for from_currency, to_currency in pairs:
 		try:
-			cache = frappe.cache()
-			key = "currency_exchange_rate:{0}:{1}".format(from_currency, to_currency)
-			value = cache.get(key)
-
-			if not value:
-				import requests
-				response = requests.get("http://api.fixer.io/latest", params={
-					"base": from_currency,
-					"symbols": to_currency
-				})
-				# expire in 6 hours
-				response.raise_for_status()
-				value = response.json()["rates"][to_currency]
-				cache.setex(key, value, 6 * 60 * 60)
-
-			return flt(value)
-		except:
-			frappe.msgprint(_("Unable to find exchange rate for {0} to {1}").format(from_currency, to_currency))
-			return 0.0
-	else:
-		return value
+			response = requests.get("http://api.fixer.io/latest", params={
+				"base": from_currency,
+				"symbols": to_currency
+			}, timeout=10)
+			response.raise_for_status()
+			rows.append((nowdate(), from_currency, to_currency, response.json()["rates"][to_currency]))
+		except Exception:
+			# tried again on the next run
+			continue
+
+	import_exchange_rates(rows, update_existing=False)
@@ -8,6 +8,7 @@ import frappe.defaults
 from frappe.utils import cint, flt, get_fullname, cstr
 from erpnext.utilities.doctype.address.address import get_address_display
 from erpnext.shopping_cart.doctype.shopping_cart_settings.shopping_cart_settings import get_shopping_cart_settings
+from erpnext.accounts.doctype.shipping_rule.shipping_rule import get_applicable_condition
 from frappe.utils.nestedset import get_root_of
 
 class WebsitePriceListMissingError(frappe.ValidationError): pass
@@ -71,20 +72,25 @@ def update_cart(item_code, qty, with_items=False):
 	quotation = _get_cart_quotation()
 
 	qty = flt(qty)
+	updated_items = []
 	if qty == 0:
 		quotation.set("items", quotation.get("items", {"item_code": ["!=", item_code]}))
 	else:
 		quotation_items = quotation.get("items", {"item_code": item_code})
 		if not quotation_items:
-			quotation.append("items", {
+			updated_items.append(quotation.append("items", {
 				"doctype": "Quotation Item",
 				"item_code": item_code,
 				"qty": qty
-			})
+			}))
 		else:
 			quotation_items[0].qty = qty
+			updated_items.append(quotation_items[0])
 
-	apply_cart_settings(quotation=quotation)
+	if quotation.get("__islocal") or not quotation.selling_price_list:
+		apply_cart_settings(quotation=quotation)
+	else:
+		update_cart_items(quotation, updated_items)
 
 	quotation.flags.ignore_permissions = True
 	quotation.save()
@@ -214,7 +220,7 @@ def apply_cart_settings(party=None, quotation=None):
 	if not quotation:
 		quotation = _get_cart_quotation(party)
 
-	cart_settings = frappe.get_doc("Shopping Cart Settings")
+	cart_settings = get_shopping_cart_settings()
 
 	set_price_list_and_rate(quotation, cart_settings)
 
@@ -224,6 +230,25 @@ def apply_cart_settings(party=None, quotation=None):
 
 	_apply_shipping_rule(party, quotation, cart_settings)
 
+def update_cart_items(quotation, items):
+	"""Reprice only the updated rows of a saved cart. Price list and taxes of the cart
+	are kept, shipping charges are applied again only if the new total falls under
+	another condition of the shipping rule"""
+	last_total = flt(quotation.base_net_total)
+
+	for item in items:
+		item.price_list_rate = item.discount_percentage = item.rate = item.amount = None
+
+	quotation.set_missing_item_details(items)
+	quotation.calculate_taxes_and_totals()
+
+	if quotation.shipping_rule and (get_applicable_condition(quotation.shipping_rule, last_total)
+		!= get_applicable_condition(quotation.shipping_rule, flt(quotation.base_net_total))):
+		quotation.apply_shipping_rule()
+
+	# other rows are already priced, do not fetch their details again on save
+	quotation.flags.ignore_item_details = True
+
 def set_price_list_and_rate(quotation, cart_settings):
 	"""set price list based on billing territory"""
 
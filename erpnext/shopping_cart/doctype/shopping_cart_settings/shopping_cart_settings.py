@@ -40,8 +40,9 @@ class ShoppingCartSettings(Document):
 			if currency != company_currency]
 
 		if expected_to_exist:
-			exists = frappe.db.sql_list("""select name from `tabCurrency Exchange`
-				where name in (%s)""" % (", ".join(["%s"]*len(expected_to_exist)),),
+			exists = frappe.db.sql_list("""select concat(from_currency, "-", to_currency)
+				from `tabCurrency Exchange`
+				where concat(from_currency, "-", to_currency) in (%s)""" % (", ".join(["%s"]*len(expected_to_exist)),),
 				tuple(expected_to_exist))
 
 			missing = list(set(expected_to_exist).difference(exists))
@@ -3,66 +3,198 @@
 
 from __future__ import unicode_literals
 
+import json
 import frappe
 from frappe.utils import cint, fmt_money
 from erpnext.shopping_cart.cart import _get_cart_quotation
 from erpnext.shopping_cart.doctype.shopping_cart_settings.shopping_cart_settings import is_cart_enabled
 
+# seconds for which stock status of a product is cached
+stock_cache_ttl = 60
+
+# maximum number of products in one batch request
+max_batch_size = 100
+
 @frappe.whitelist(allow_guest=True)
 def get_product_info(item_code):
 	"""get product price / stock info"""
+	return get_product_info_for_items([item_code]).get(item_code) or {}
+
+@frappe.whitelist(allow_guest=True)
+def get_product_info_for_items(item_codes):
+	"""get price / stock info of a list of products, e.g. for listing pages
+
+	Returns dict {item_code: {"price": ..., "stock": ..., "uom": ..., "qty": ...}}"""
 	if not is_cart_enabled():
 		return {}
 
-	qty = 0
+	if isinstance(item_codes, basestring):
+		item_codes = json.loads(item_codes)
+
+	item_codes = list(set(item_codes))[:max_batch_size]
+
 	cart_quotation = _get_cart_quotation()
-	template_item_code = frappe.db.get_value("Item", item_code, "variant_of")
-	in_stock = get_qty_in_stock(item_code, template_item_code)
-	price = get_price(item_code, template_item_code, cart_quotation.selling_price_list)
-
-	if price:
-		price["formatted_price"] = fmt_money(price["price_list_rate"], currency=price["currency"])
-
-		price["currency"] = not cint(frappe.db.get_default("hide_currency_symbol")) \
-			and (frappe.db.get_value("Currency", price.currency, "symbol") or price.currency) \
-			or ""
-
-		if frappe.session.user != "Guest":
-			item = cart_quotation.get({"item_code": item_code})
-			if item:
-				qty = item[0].qty
-
-	return {
-		"price": price,
-		"stock": in_stock,
-		"uom": frappe.db.get_value("Item", item_code, "stock_uom"),
-		"qty": qty
-	}
-
-def get_qty_in_stock(item_code, template_item_code):
-	warehouse = frappe.db.get_value("Item", item_code, "website_warehouse")
-	if not warehouse and template_item_code and template_item_code != item_code:
-		warehouse = frappe.db.get_value("Item", template_item_code, "website_warehouse")
-
-	if warehouse:
-		in_stock = frappe.db.sql("""select actual_qty from tabBin where
-			item_code=%s and warehouse=%s""", (item_code, warehouse))
-		if in_stock:
-			in_stock = in_stock[0][0] > 0 and 1 or 0
-
-	else:
-		in_stock = -1
+	items = get_item_info(item_codes)
+	prices = get_prices(items, cart_quotation.selling_price_list)
+	in_stock = get_qty_in_stock(items)
 
-	return in_stock
+	hide_currency_symbol = cint(frappe.db.get_default("hide_currency_symbol"))
 
-def get_price(item_code, template_item_code, price_list):
-	if price_list:
-		price = frappe.get_all("Item Price", fields=["price_list_rate", "currency"],
-			filters={"price_list": price_list, "item_code": item_code})
+	cart_qty = {}
+	if frappe.session.user != "Guest":
+		for d in cart_quotation.get("items"):
+			cart_qty.setdefault(d.item_code, d.qty)
 
-		if not price:
-			price = frappe.get_all("Item Price", fields=["price_list_rate", "currency"],
-				filters={"price_list": price_list, "item_code": template_item_code})
+	out = {}
+	for item_code, item in items.items():
+		qty = 0
+		price = prices.get(item_code)
 
 		if price:
-			return price[0]
+			price = frappe._dict(price)
+			price["currency"] = "" if hide_currency_symbol else price.currency_symbol
+			del price["currency_symbol"]
+			qty = cart_qty.get(item_code, 0)
+
+		out[item_code] = {
+			# cached empty price is only a marker, items without price get None
+			"price": price or None,
+			"stock": in_stock.get(item_code),
+			"uom": item.stock_uom,
+			"qty": qty
+		}
+
+	return out
+
+def get_item_info(item_codes):
+	"""Returns cached template, stock uom and website warehouse of items"""
+	cache = frappe.cache()
+	items, missing = {}, []
+
+	for item_code in item_codes:
+		item = cache.hget("product_item_info", item_code)
+		if item is None:
+			missing.append(item_code)
+		else:
+			items[item_code] = item
+
+	if missing:
+		for item in frappe.db.sql("""select item.name, item.variant_of, item.stock_uom,
+				if(ifnull(item.website_warehouse, '')='' and item.variant_of != item.name,
+					template.website_warehouse, item.website_warehouse) as website_warehouse
+			from `tabItem` item left join `tabItem` template on template.name = item.variant_of
+			where item.name in ({0})""".format(", ".join(["%s"] * len(missing))),
+			tuple(missing), as_dict=1):
+
+			cache.hset("product_item_info", item.name, item)
+			items[item.name] = item
+
+	return items
+
+def get_prices(items, price_list):
+	"""Returns cached price of items in the price list, falling back to the template's price"""
+	if not price_list:
+		return {}
+
+	cache = frappe.cache()
+	prices, missing = {}, []
+
+	for item_code in items:
+		price = cache.hget("product_price", get_price_key(price_list, item_code))
+		if price is None:
+			missing.append(item_code)
+		else:
+			prices[item_code] = price
+
+	if missing:
+		item_codes = list(set(missing + [items[i].variant_of for i in missing if items[i].variant_of]))
+
+		item_prices = {}
+		for d in frappe.db.sql("""select item_code, price_list_rate, currency
+			from `tabItem Price` where price_list=%s and item_code in ({0})""".format(
+				", ".join(["%s"] * len(item_codes))), tuple([price_list] + item_codes), as_dict=1):
+			item_prices.setdefault(d.item_code, d)
+
+		currency_symbols = get_currency_symbols([d.currency for d in item_prices.values()])
+
+		for item_code in missing:
+			d = item_prices.get(item_code) or item_prices.get(items[item_code].variant_of)
+
+			# empty dict for items without price, so that they are not queried again
+			price = {}
+			if d:
+				price = {
+					"price_list_rate": d.price_list_rate,
+					"formatted_price": fmt_money(d.price_list_rate, currency=d.currency),
+					"currency_symbol": currency_symbols.get(d.currency) or d.currency
+				}
+
+			cache.hset("product_price", get_price_key(price_list, item_code), price)
+			prices[item_code] = price
+
+	return prices
+
+def get_currency_symbols(currencies):
+	currencies = list(set([c for c in currencies if c]))
+	if not currencies:
+		return {}
+
+	return dict(frappe.db.sql("""select name, symbol from `tabCurrency`
+		where name in ({0})""".format(", ".join(["%s"] * len(currencies))), tuple(currencies)))
+
+def get_price_key(price_list, item_code):
+	return "{0}:{1}".format(price_list, item_code)
+
+def get_qty_in_stock(items):
+	"""Returns 1 if in stock, 0 if not and -1 if item has no website warehouse.
+
+	Stock status is cached for `stock_cache_ttl` seconds"""
+	cache = frappe.cache()
+	in_stock, missing = {}, []
+
+	for item_code, item in items.items():
+		if not item.website_warehouse:
+			in_stock[item_code] = -1
+			continue
+
+		value = cache.get(get_stock_key(item_code))
+		if value is None:
+			missing.append(item_code)
+		else:
+			in_stock[item_code] = cint(value)
+
+	if missing:
+		actual_qty = dict(((d.item_code, d.warehouse), d.actual_qty) for d in frappe.db.sql("""
+			select item_code, warehouse, actual_qty from tabBin
+			where item_code in ({0})""".format(", ".join(["%s"] * len(missing))),
+			tuple(missing), as_dict=1))
+
+		for item_code in missing:
+			in_stock[item_code] = 1 if actual_qty.get((item_code,
+				items[item_code].website_warehouse), 0) > 0 else 0
+			cache.setex(get_stock_key(item_code), in_stock[item_code], stock_cache_ttl)
+
+	return in_stock
+
+def get_stock_key(item_code):
+	return "product_in_stock:{0}:{1}".format(frappe.local.site, item_code)
+
+def clear_product_info(item_code):
+	"""Clear cached details of the item and its variants"""
+	item_codes = [item_code] + frappe.db.sql_list("""select name from `tabItem`
+		where variant_of=%s""", item_code)
+
+	for d in item_codes:
+		frappe.cache().hdel("product_item_info", d)
+		frappe.cache().delete(get_stock_key(d))
+
+def clear_product_price(price_list, item_code):
+	"""Clear cached price of the item and of its variants that use the template's price"""
+	item_codes = [item_code] + frappe.db.sql_list("""select name from `tabItem`
+		where variant_of=%s""", item_code)
+
+	for d in item_codes:
+		frappe.cache().hdel("product_price", get_price_key(price_list, d))
+
+def clear_product_stock(item_code):
+	frappe.cache().delete(get_stock_key(item_code))
@@ -82,6 +82,60 @@ class TestShoppingCart(unittest.TestCase):
 		self.assertEquals(quotation.net_total, 70)
 		self.assertEquals(len(quotation.get("items")), 2)
 
+	def test_update_cart_reprices_updated_item(self):
+		self.test_add_to_cart()
+
+		item_price = frappe.db.get_value("Item Price", {"price_list": "_Test Price List India",
+			"item_code": "_Test Item"})
+		frappe.db.set_value("Item Price", item_price, "price_list_rate", 15)
+
+		try:
+			# only the updated row is priced again
+			update_cart("_Test Item 2", 2)
+			quotation = self.test_get_cart_customer()
+			self.assertEquals(quotation.get("items")[0].amount, 10)
+			self.assertEquals(quotation.get("items")[1].amount, 40)
+			self.assertEquals(quotation.net_total, 50)
+
+			update_cart("_Test Item", 2)
+			quotation = self.test_get_cart_customer()
+			self.assertEquals(quotation.get("items")[0].amount, 30)
+			self.assertEquals(quotation.net_total, 70)
+		finally:
+			frappe.db.set_value("Item Price", item_price, "price_list_rate", 10)
+
+	def test_get_product_info_for_items(self):
+		from erpnext.shopping_cart.product import get_product_info_for_items
+		self.login_as_customer()
+
+		info = get_product_info_for_items(["_Test Item", "_Test Item 2"])
+		self.assertEquals(info["_Test Item"]["price"]["price_list_rate"], 10)
+		self.assertEquals(info["_Test Item 2"]["price"]["price_list_rate"], 20)
+
+		# cached price is cleared when Item Price is updated
+		frappe.set_user("Administrator")
+		item_price = frappe.get_doc("Item Price", frappe.db.get_value("Item Price",
+			{"price_list": "_Test Price List India", "item_code": "_Test Item"}))
+		item_price.price_list_rate = 15
+		item_price.save()
+
+		try:
+			self.login_as_customer()
+			info = get_product_info_for_items('["_Test Item"]')
+			self.assertEquals(info["_Test Item"]["price"]["price_list_rate"], 15)
+		finally:
+			frappe.set_user("Administrator")
+			item_price.price_list_rate = 10
+			item_price.save()
+
+	def test_get_product_info_without_price(self):
+		from erpnext.shopping_cart.product import get_product_info
+		self.login_as_customer()
+
+		# no Item Price in _Test Price List India, also when the empty price is served from cache
+		for i in xrange(2):
+			self.assertFalse(get_product_info("_Test Item Home Desktop 200")["price"])
+
 	def test_remove_from_cart(self):
 		# first, add to cart
 		self.test_add_to_cart()
@@ -3,40 +3,91 @@
 
 
 from __future__ import unicode_literals
+import cPickle
 import frappe
+from frappe.utils import cint
+
+# seconds for which the boot payload is cached
+boot_cache_ttl = 5 * 60
 
 def boot_session(bootinfo):
 	"""boot session - send website info if guest"""
 	import frappe
 
-	bootinfo.custom_css = frappe.db.get_value('Style Settings', None, 'custom_css') or ''
-	bootinfo.website_settings = frappe.get_doc('Website Settings')
+	payload = get_boot_payload()
+
+	bootinfo.custom_css = payload.custom_css
+	bootinfo.website_settings = payload.website_settings
 
 	if frappe.session['user']!='Guest':
-		bootinfo.letter_heads = get_letter_heads()
+		bootinfo.letter_heads = payload.letter_heads
 
 		update_page_info(bootinfo)
 
-		load_country_and_currency(bootinfo)
+		bootinfo.docs += payload.docs
 
-		bootinfo.notification_settings = frappe.get_doc("Notification Control",
-			"Notification Control")
+		bootinfo.notification_settings = payload.notification_settings
 
 		# if no company, show a dialog box to create a new company
-		bootinfo.customer_count = frappe.db.sql("""select count(*) from tabCustomer""")[0][0]
+		bootinfo.customer_count = 1 if frappe.db.sql("""select name from tabCustomer limit 1""") else 0
 
 		if not bootinfo.customer_count:
-			bootinfo.setup_complete = frappe.db.sql("""select name from
-				tabCompany limit 1""") and 'Yes' or 'No'
+			bootinfo.setup_complete = payload.companies and 'Yes' or 'No'
+
+		bootinfo.docs += payload.companies
+
+def get_boot_payload():
+	"""Returns boot info that is the same for all sessions.
+
+	The payload is cached under the current boot cache version, which is incremented
+	by `clear_boot_cache` when one of its source documents is changed. It also expires
+	after `boot_cache_ttl` seconds, as a payload built before the change is committed
+	can be cached under the new version"""
+	cache = frappe.cache()
+	cache_key = get_boot_payload_key(cint(cache.get_value("erpnext_boot_version")))
+
+	payload = cache.get(cache_key)
+	if payload:
+		return cPickle.loads(payload)
+
+	payload = build_boot_payload()
+	cache.setex(cache_key, cPickle.dumps(payload), boot_cache_ttl)
+
+	return payload
+
+def build_boot_payload():
+	payload = frappe._dict()
+	payload.custom_css = frappe.db.get_value('Style Settings', None, 'custom_css') or ''
+	payload.website_settings = frappe.get_doc('Website Settings').as_dict()
+	payload.letter_heads = get_letter_heads()
+
+	payload.docs = []
+	load_country_and_currency(payload)
+
+	payload.notification_settings = frappe.get_doc("Notification Control",
+		"Notification Control").as_dict()
+
+	payload.companies = frappe.db.sql("""select name, default_currency, cost_center,
+		default_terms, default_letter_head from `tabCompany`""",
+		as_dict=1, update={"doctype":":Company"})
+
+	return payload
+
+def clear_boot_cache(doc=None, method=None, *args):
+	"""Invalidate cached boot payload (hooked to its source doctypes)"""
+	cache = frappe.cache()
+	version = cint(cache.get_value("erpnext_boot_version"))
+
+	cache.set_value("erpnext_boot_version", version + 1)
+	cache.delete(get_boot_payload_key(version))
 
-		bootinfo.docs += frappe.db.sql("""select name, default_currency, cost_center,
-			default_terms, default_letter_head from `tabCompany`""",
-			as_dict=1, update={"doctype":":Company"})
+def get_boot_payload_key(version):
+	return "erpnext_boot_payload:{0}:{1}".format(frappe.local.site, version)
 
 def load_country_and_currency(bootinfo):
 	country = frappe.db.get_default("country")
 	if country and frappe.db.exists("Country", country):
-		bootinfo.docs += [frappe.get_doc("Country", country)]
+		bootinfo.docs += [frappe.get_doc("Country", country).as_dict()]
 
 	bootinfo.docs += frappe.db.sql("""select * from tabCurrency
 		where enabled=1""", as_dict=1, update={"doctype":":Currency"})
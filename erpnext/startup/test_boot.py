@@ -0,0 +1,55 @@
+# Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+from __future__ import unicode_literals
+
+import unittest
+import frappe
+from erpnext.startup.boot import boot_session
+
+class TestBoot(unittest.TestCase):
+	def test_notification_control_change(self):
+		notification_control = frappe.get_doc("Notification Control")
+		sales_invoice = notification_control.sales_invoice
+
+		get_bootinfo()
+		try:
+			notification_control.sales_invoice = 0 if sales_invoice else 1
+			notification_control.save()
+
+			self.assertEquals(get_bootinfo().notification_settings.sales_invoice,
+				notification_control.sales_invoice)
+		finally:
+			notification_control.sales_invoice = sales_invoice
+			notification_control.save()
+
+		self.assertEquals(get_bootinfo().notification_settings.sales_invoice, sales_invoice)
+
+	def test_new_company(self):
+		if frappe.db.exists("Company", "_Test Boot Company"):
+			frappe.delete_doc("Company", "_Test Boot Company")
+
+		self.assertFalse("_Test Boot Company" in get_companies(get_bootinfo()))
+
+		company = frappe.get_doc({
+			"doctype": "Company",
+			"company_name": "_Test Boot Company",
+			"abbr": "_TBC",
+			"country": "India",
+			"default_currency": "INR",
+			"chart_of_accounts": "Standard"
+		}).insert()
+
+		try:
+			self.assertTrue(company.name in get_companies(get_bootinfo()))
+		finally:
+			frappe.delete_doc("Company", company.name)
+
+		self.assertFalse(company.name in get_companies(get_bootinfo()))
+
+def get_bootinfo():
+	bootinfo = frappe._dict({"docs": [], "page_info": {}})
+	boot_session(bootinfo)
+	return bootinfo
+
+def get_companies(bootinfo):
+	return [d.name for d in bootinfo.docs if d.get("doctype")==":Company"]
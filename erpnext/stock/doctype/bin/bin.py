@@ -17,6 +17,10 @@ class Bin(Document):
 		self.projected_qty = flt(self.actual_qty) + flt(self.ordered_qty) + \
 		 	flt(self.indented_qty) + flt(self.planned_qty) - flt(self.reserved_qty)
 
+	def on_update(self):
+		from erpnext.shopping_cart.product import clear_product_stock
+		clear_product_stock(self.item_code)
+
 	def validate_mandatory(self):
 		qf = ['actual_qty', 'reserved_qty', 'ordered_qty', 'indented_qty']
 		for f in qf:
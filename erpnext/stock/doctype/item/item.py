@@ -3,16 +3,18 @@
 
 from __future__ import unicode_literals
 import frappe
-import json
 import urllib
-import itertools
 from frappe import msgprint, _
 from frappe.utils import cstr, flt, cint, getdate, now_datetime, formatdate
 from frappe.website.website_generator import WebsiteGenerator
 from erpnext.setup.doctype.item_group.item_group import invalidate_cache_for, get_parent_item_groups
 from frappe.website.render import clear_cache
 from frappe.website.doctype.website_slideshow.website_slideshow import get_slideshow
-from erpnext.controllers.item_variant import get_variant, copy_attributes_to_variant, ItemVariantExistsError
+from erpnext.controllers.item_variant import (get_variant, update_variants,
+	get_variant_matrix, clear_variant_matrix, ItemVariantExistsError)
+from erpnext.utilities.product_search import update_product_search_index, delete_from_index
+from erpnext.shopping_cart.product import clear_product_info
+import erpnext.tasks
 
 class WarehouseNotSet(frappe.ValidationError): pass
 
@@ -77,6 +79,9 @@ class Item(WebsiteGenerator):
 	def on_update(self):
 		super(Item, self).on_update()
 		invalidate_cache_for_item(self)
+		self.clear_variant_matrix()
+		update_product_search_index(self)
+		clear_product_info(self.name)
 		self.validate_name_with_item_group()
 		self.update_item_price()
 		self.update_variants()
@@ -186,14 +191,14 @@ class Item(WebsiteGenerator):
 			context.no_cache = True
 
 			# load variants
-			# also used in set_attribute_context
-			context.variants = frappe.get_all("Item",
-				filters={"variant_of": self.name, "show_in_website": 1}, order_by="name asc")
+			# also used in set_attribute_context and set_disabled_attributes
+			context.variant_matrix = get_variant_matrix(self.name)
+			context.variants = context.variant_matrix["variants"]
 
 			variant = frappe.form_dict.variant
 			if not variant and context.variants:
 				# the case when the item is opened for the first time from its list
-				variant = context.variants[0]
+				variant = context.variants[0]["name"]
 
 			if variant:
 				context.variant = frappe.get_doc("Item", variant)
@@ -215,83 +220,34 @@ class Item(WebsiteGenerator):
 
 	def set_attribute_context(self, context):
 		if self.has_variants:
-			attribute_values_available = {}
-			context.attribute_values = {}
+			context.attribute_values = context.variant_matrix["attribute_values"]
 			context.selected_attributes = {}
 
-			# load attributes
-			for v in context.variants:
-				v.attributes = frappe.get_all("Item Variant Attribute",
-					fields=["attribute", "attribute_value"], filters={"parent": v.name})
+			if context.variant:
+				context.selected_attributes = context.variant_matrix["variant_attributes"]\
+					.get(context.variant.name, {})
 
-				for attr in v.attributes:
-					values = attribute_values_available.setdefault(attr.attribute, [])
-					if attr.attribute_value not in values:
-						values.append(attr.attribute_value)
-
-					if v.name==context.variant.name:
-						context.selected_attributes[attr.attribute] = attr.attribute_value
-
-			# filter attributes, order based on attribute table
-			for attr in self.attributes:
-				values = context.attribute_values.setdefault(attr.attribute, [])
-
-				if cint(frappe.db.get_value("Item Attribute", attr.attribute, "numeric_values")):
-					for val in sorted(attribute_values_available.get(attr.attribute, []), key=flt):
-						values.append(val)
-
-				else:
-					# get list of values defined (for sequence)
-					for attr_value in frappe.db.get_all("Item Attribute Value",
-						fields=["attribute_value"], filters={"parent": attr.attribute}, order_by="idx asc"):
-
-						if attr_value.attribute_value in attribute_values_available.get(attr.attribute, []):
-							values.append(attr_value.attribute_value)
-
-			context.variant_info = json.dumps(context.variants)
+			context.variant_info = context.variant_matrix["variant_info"]
 
 	def set_disabled_attributes(self, context):
 		"""Disable selection options of attribute combinations that do not result in a variant"""
-		if not self.attributes:
+		if not (self.has_variants and self.attributes):
 			return
 
 		context.disabled_attributes = {}
-		attributes = [attr.attribute for attr in self.attributes]
-
-		def find_variant(combination):
-			for variant in context.variants:
-				if len(variant.attributes) < len(attributes):
-					continue
-
-				if "combination" not in variant:
-					ref_combination = []
-
-					for attr in variant.attributes:
-						idx = attributes.index(attr.attribute)
-						ref_combination.insert(idx, attr.attribute_value)
-
-					variant["combination"] = ref_combination
-
-				if not (set(combination) - set(variant["combination"])):
-					# check if the combination is a subset of a variant combination
-					# eg. [Blue, 0.5] is a possible combination if exists [Blue, Large, 0.5]
-					return True
+		combinations = context.variant_matrix["combinations"]
 
 		for i, attr in enumerate(self.attributes):
 			if i==0:
 				continue
 
-			combination_source = []
-
-			# loop through previous attributes
-			for prev_attr in self.attributes[:i]:
-				combination_source.append([context.selected_attributes.get(prev_attr.attribute)])
+			# selected values of previous attributes
+			selected = tuple(context.selected_attributes.get(prev_attr.attribute)
+				for prev_attr in self.attributes[:i])
 
-			combination_source.append(context.attribute_values[attr.attribute])
-
-			for combination in itertools.product(*combination_source):
-				if not find_variant(combination):
-					context.disabled_attributes.setdefault(attr.attribute, []).append(combination[-1])
+			for value in context.attribute_values[attr.attribute]:
+				if selected + (value,) not in combinations:
+					context.disabled_attributes.setdefault(attr.attribute, []).append(value)
 
 	def check_warehouse_is_set_for_stock_item(self):
 		if self.is_stock_item==1 and not self.default_warehouse and frappe.get_all("Warehouse"):
@@ -425,8 +381,10 @@ class Item(WebsiteGenerator):
 					.format(i.idx, i.warehouse))
 
 	def check_if_sle_exists(self):
+		# for templates, stock fields are copied to the variants
 		sle = frappe.db.sql("""select name from `tabStock Ledger Entry`
-			where item_code = %s""", self.name)
+			where item_code = %s or item_code in (select name from `tabItem` where variant_of = %s)
+			limit 1""", (self.name, self.name))
 		return sle and 'exists' or 'not exists'
 
 	def validate_name_with_item_group(self):
@@ -445,6 +403,15 @@ class Item(WebsiteGenerator):
 		frappe.db.sql("delete from `tabItem Price` where item_code=%s", self.name)
 		for variant_of in frappe.get_all("Item", filters={"variant_of": self.name}):
 			frappe.delete_doc("Item", variant_of.name)
+		self.clear_variant_matrix()
+		delete_from_index(self.name)
+		clear_product_info(self.name)
+		invalidate_cache_for_item(self)
+
+	def clear_variant_matrix(self):
+		"""Rebuild the website variant matrix of the template on next visit"""
+		if self.variant_of or self.has_variants:
+			clear_variant_matrix(self.variant_of or self.name)
 
 	def before_rename(self, olddn, newdn, merge=False):
 		if merge:
@@ -466,6 +433,14 @@ class Item(WebsiteGenerator):
 			invalidate_cache_for_item(self)
 			clear_cache(self.page_name)
 
+		if self.variant_of:
+			clear_variant_matrix(self.variant_of)
+		elif self.has_variants:
+			clear_variant_matrix(olddn)
+
+		delete_from_index(olddn)
+		update_product_search_index(self)
+
 		frappe.db.set_value("Item", newdn, "item_code", newdn)
 		if merge:
 			self.set_last_purchase_rate(newdn)
@@ -517,15 +492,15 @@ class Item(WebsiteGenerator):
 
 	def update_variants(self):
 		if self.has_variants and not self.flags.dont_update_variants:
-			updated = []
-			variants = frappe.db.get_all("Item", fields=["item_code"], filters={"variant_of": self.name })
-			for d in variants:
-				variant = frappe.get_doc("Item", d)
-				copy_attributes_to_variant(self, variant)
-				variant.save()
-				updated.append(d.item_code)
-			if updated:
-				frappe.msgprint(_("Item Variants {0} updated").format(", ".join(updated)))
+			if getattr(frappe.local, "is_ajax", False):
+				# to avoid request timed out for templates with many variants
+				erpnext.tasks.update_item_variants.delay(frappe.local.site, self.name,
+					self.modified, frappe.session.user, event="bulk_long")
+				frappe.msgprint(_("Item Variants will be updated in the background"))
+			else:
+				updated = update_variants(self)
+				if updated:
+					frappe.msgprint(_("Item Variants {0} updated").format(", ".join(updated)))
 
 	def validate_has_variants(self):
 		if not self.has_variants and frappe.db.get_value("Item", self.name, "has_variants"):
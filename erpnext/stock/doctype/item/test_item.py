@@ -99,6 +99,30 @@ class TestItem(unittest.TestCase):
 		for key, value in to_check.iteritems():
 			self.assertEquals(value, details.get(key))
 
+	def test_get_item_details_for_rows(self):
+		from erpnext.stock.get_item_details import get_item_details, get_item_details_for_rows
+
+		make_test_records("Item Price")
+
+		args_list = []
+		for item_code, qty in (("_Test Item", 1), ("_Test Item Home Desktop 100", 5), ("_Test Item", 10)):
+			args_list.append({
+				"item_code": item_code,
+				"qty": qty,
+				"company": "_Test Company",
+				"price_list": "_Test Price List",
+				"currency": "_Test Currency",
+				"parenttype": "Sales Order",
+				"conversion_rate": 1,
+				"price_list_currency": "_Test Currency",
+				"plc_conversion_rate": 1,
+				"order_type": "Sales",
+				"transaction_type": "selling"
+			})
+
+		self.assertEquals(get_item_details_for_rows(args_list),
+			[get_item_details(args) for args in args_list])
+
 	def test_make_item_variant(self):
 		frappe.delete_doc_if_exists("Item", "_Test Variant Item-L")
 
@@ -109,6 +133,68 @@ class TestItem(unittest.TestCase):
 		variant = create_variant("_Test Variant Item", {"Test Size": "Large"})
 		self.assertRaises(ItemVariantExistsError, variant.save)
 
+	def test_variant_matrix(self):
+		from erpnext.controllers.item_variant import get_variant_matrix
+
+		for size in ("Large", "Small"):
+			frappe.delete_doc_if_exists("Item", "_Test Variant Item-" + size[0])
+			variant = create_variant("_Test Variant Item", {"Test Size": size})
+			variant.show_in_website = 1
+			variant.save()
+
+		matrix = get_variant_matrix("_Test Variant Item")
+
+		self.assertEquals([d["name"] for d in matrix["variants"]],
+			["_Test Variant Item-L", "_Test Variant Item-S"])
+
+		# ordered as in Item Attribute
+		self.assertEquals(matrix["attribute_values"], {"Test Size": ["Small", "Large"]})
+		self.assertEquals(matrix["variant_attributes"]["_Test Variant Item-S"], {"Test Size": "Small"})
+		self.assertTrue(("Large",) in matrix["combinations"])
+		self.assertFalse(("Medium",) in matrix["combinations"])
+
+		# rebuilt when a variant is saved
+		variant.show_in_website = 0
+		variant.save()
+
+		self.assertEquals([d["name"] for d in get_variant_matrix("_Test Variant Item")["variants"]],
+			["_Test Variant Item-L"])
+
+	def test_update_variants(self):
+		frappe.delete_doc_if_exists("Item", "_Test Variant Item-L")
+		create_variant("_Test Variant Item", {"Test Size": "Large"}).save()
+
+		template = frappe.get_doc("Item", "_Test Variant Item")
+		template.description = "_Test Variant Item Updated"
+		template.max_discount = 15
+		template.save()
+
+		variant = frappe.get_doc("Item", "_Test Variant Item-L")
+		self.assertEquals(variant.max_discount, 15)
+		self.assertEquals(variant.description,
+			"_Test Variant Item Updated\n<p>Test Size: Large</p>")
+
+		# nothing to update when saved again
+		from erpnext.controllers.item_variant import update_variants
+		self.assertEquals(update_variants(frappe.get_doc("Item", "_Test Variant Item")), [])
+
+	def test_product_search_index(self):
+		from erpnext.utilities.product_search import search_products
+
+		item = make_item("_Test Website Search Item", {"show_in_website": 1,
+			"description": "Waterproof hiking boots"})
+		item.show_in_website = 1
+		item.save()
+
+		self.assertTrue("_Test Website Search Item" in
+			[d.name for d in search_products("waterpro hiking")])
+		self.assertTrue("_Test Website Search Item" in
+			[d.name for d in search_products("_Test Website Search", ["Products"])])
+
+		item.show_in_website = 0
+		item.save()
+		self.assertFalse(search_products("waterproof hiking"))
+
 	def test_make_item_variant_with_numeric_values(self):
 		# cleanup
 		frappe.delete_doc_if_exists("Item", "_Test Numeric Template Item")
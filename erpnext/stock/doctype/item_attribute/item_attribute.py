@@ -5,6 +5,7 @@ from __future__ import unicode_literals
 import frappe
 from frappe.model.document import Document
 from frappe import _
+from erpnext.controllers.item_variant import clear_variant_matrix
 
 class ItemAttributeIncrementError(frappe.ValidationError): pass
 
@@ -14,6 +15,10 @@ class ItemAttribute(Document):
 		self.validate_duplication()
 		self.validate_attribute_values()
 
+	def on_update(self):
+		# value sequence and numeric flag decide the order of options on product pages
+		clear_variant_matrix()
+
 	def validate_numeric(self):
 		if self.numeric_values:
 			self.set("item_attribute_values", [])
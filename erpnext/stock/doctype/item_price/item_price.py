@@ -4,6 +4,7 @@
 from __future__ import unicode_literals
 import frappe
 from frappe import throw, _
+from erpnext.shopping_cart.product import clear_product_price
 
 class ItemPriceDuplicateItem(frappe.ValidationError): pass
 
@@ -16,6 +17,20 @@ class ItemPrice(Document):
 		self.check_duplicate_item()
 		self.update_price_list_details()
 		self.update_item_details()
+		self.clear_old_product_price()
+
+	def on_update(self):
+		clear_product_price(self.price_list, self.item_code)
+
+	def on_trash(self):
+		clear_product_price(self.price_list, self.item_code)
+
+	def clear_old_product_price(self):
+		"""Clear cached website price if item or price list is changed"""
+		if not self.get("__islocal"):
+			old = frappe.db.get_value("Item Price", self.name, ["price_list", "item_code"])
+			if old and tuple(old) != (self.price_list, self.item_code):
+				clear_product_price(*old)
 
 	def validate_item(self):
 		if not frappe.db.exists("Item", self.item_code):
@@ -3,10 +3,13 @@
 
 from __future__ import unicode_literals
 import frappe
+import frappe.defaults
 from frappe import _
-from frappe.utils import flt
+from frappe.utils import flt, cint, get_datetime
 from frappe.model.document import Document
 from erpnext.stock.doctype.serial_no.serial_no import get_serial_nos
+from erpnext.stock.stock_ledger import update_entries_after
+from erpnext.controllers.stock_controller import update_gl_entries_after
 
 class LandedCostVoucher(Document):
 	def get_items_from_purchase_receipts(self):
@@ -84,6 +87,7 @@ class LandedCostVoucher(Document):
 
 	def update_landed_cost(self):
 		purchase_receipts = list(set([d.purchase_receipt for d in self.get("items")]))
+		repost_from = {}
 		for purchase_receipt in purchase_receipts:
 			pr = frappe.get_doc("Purchase Receipt", purchase_receipt)
 
@@ -100,16 +104,57 @@ class LandedCostVoucher(Document):
 			# update latest valuation rate in serial no
 			self.update_rate_in_serial_no(pr)
 
-			# update stock & gl entries for cancelled state of PR
-			pr.docstatus = 2
-			pr.update_stock_ledger(allow_negative_stock=True, via_landed_cost_voucher=True)
-			pr.make_gl_entries_on_cancel()
-
-
-			# update stock & gl entries for submit state of PR
-			pr.docstatus = 1
-			pr.update_stock_ledger(via_landed_cost_voucher=True)
-			pr.make_gl_entries()
+			# update incoming rate in the stock ledger entries of the PR
+			for item_code, warehouse in self.update_rate_in_stock_ledger(pr):
+				posting_datetime = get_datetime("{0} {1}".format(pr.posting_date, pr.posting_time))
+				if (item_code, warehouse) not in repost_from \
+					or posting_datetime < repost_from[(item_code, warehouse)]:
+						repost_from[(item_code, warehouse)] = posting_datetime
+
+		self.repost_stock_and_gl_entries(repost_from)
+
+	def update_rate_in_stock_ledger(self, purchase_receipt):
+		"""Set revised valuation rate of PR items as incoming rate in its stock ledger entries,
+		returns list of affected (item_code, warehouse)"""
+		stock_items = purchase_receipt.get_stock_items()
+		rate_field = "outgoing_rate" if purchase_receipt.is_return else "incoming_rate"
+
+		affected = []
+		for d in purchase_receipt.get("items"):
+			if d.item_code in stock_items and d.warehouse and flt(d.qty) * flt(d.conversion_factor):
+				val_rate_db_precision = 6 if cint(purchase_receipt.precision("valuation_rate", d)) <= 6 else 9
+
+				frappe.db.sql("""update `tabStock Ledger Entry` set {0}=%s
+					where voucher_type=%s and voucher_no=%s and voucher_detail_no=%s and warehouse=%s"""
+					.format(rate_field), (flt(d.valuation_rate, val_rate_db_precision), purchase_receipt.doctype,
+						purchase_receipt.name, d.name, d.warehouse))
+
+				if (d.item_code, d.warehouse) not in affected:
+					affected.append((d.item_code, d.warehouse))
+
+		return affected
+
+	def repost_stock_and_gl_entries(self, repost_from):
+		"""Repost stock ledger once per item and warehouse from its earliest affected entry,
+		then repost changed GL entries of all future stock vouchers"""
+		if not repost_from:
+			return
+
+		for (item_code, warehouse), posting_datetime in repost_from.items():
+			update_entries_after({
+				"item_code": item_code,
+				"warehouse": warehouse,
+				"posting_date": posting_datetime.strftime("%Y-%m-%d"),
+				"posting_time": posting_datetime.strftime("%H:%M:%S.%f")
+			}, allow_negative_stock=True, via_landed_cost_voucher=True)
+
+		if cint(frappe.defaults.get_global_default("auto_accounting_for_stock")):
+			items = list(set([d[0] for d in repost_from]))
+			warehouses = list(set([d[1] for d in repost_from]))
+			earliest = min(repost_from.values())
+
+			update_gl_entries_after(earliest.strftime("%Y-%m-%d"), earliest.strftime("%H:%M:%S.%f"),
+				warehouses, items)
 
 	def update_rate_in_serial_no(self, purchase_receipt):
 		for item in purchase_receipt.get("items"):
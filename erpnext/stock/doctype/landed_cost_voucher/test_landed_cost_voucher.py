@@ -5,6 +5,7 @@
 from __future__ import unicode_literals
 import unittest
 import frappe
+from frappe.utils import flt
 from erpnext.stock.doctype.purchase_receipt.test_purchase_receipt \
 	import set_perpetual_inventory, get_gl_entries, test_records as pr_test_records
 
@@ -72,6 +73,27 @@ class TestLandedCostVoucher(unittest.TestCase):
 
 		set_perpetual_inventory(0)
 
+	def test_landed_cost_voucher_updates_incoming_rate(self):
+		set_perpetual_inventory(1)
+		pr = frappe.copy_doc(pr_test_records[0])
+		pr.submit()
+
+		sle_names = frappe.db.sql_list("""select name from `tabStock Ledger Entry`
+			where voucher_type='Purchase Receipt' and voucher_no=%s order by name""", pr.name)
+
+		self.submit_landed_cost_voucher(pr)
+
+		# entries are revalued in place, not cancelled and re-created
+		self.assertEquals(sle_names, frappe.db.sql_list("""select name from `tabStock Ledger Entry`
+			where voucher_type='Purchase Receipt' and voucher_no=%s order by name""", pr.name))
+
+		for d in frappe.get_doc("Purchase Receipt", pr.name).get("items"):
+			incoming_rate = frappe.db.get_value("Stock Ledger Entry", {"voucher_type": "Purchase Receipt",
+				"voucher_no": pr.name, "voucher_detail_no": d.name, "warehouse": d.warehouse}, "incoming_rate")
+			self.assertEquals(flt(incoming_rate, 2), flt(d.valuation_rate, 2))
+
+		set_perpetual_inventory(0)
+
 	def submit_landed_cost_voucher(self, pr):
 		lcv = frappe.new_doc("Landed Cost Voucher")
 		lcv.company = "_Test Company"
@@ -7,6 +7,7 @@ from __future__ import unicode_literals
 import frappe, json
 from frappe.utils import cstr, flt
 from erpnext.stock.get_item_details import get_item_details
+from erpnext.controllers.master_data import load_product_bundles, is_product_bundle
 
 from frappe.model.document import Document
 
@@ -63,8 +64,10 @@ def make_packing_list(doc):
 	if doc.get("_action") and doc._action == "update_after_submit": return
 
 	parent_items = []
+	load_product_bundles([d.item_code for d in doc.get("items")])
+
 	for d in doc.get("items"):
-		if frappe.db.get_value("Product Bundle", {"new_item_code": d.item_code}):
+		if is_product_bundle(d.item_code):
 			for i in get_product_bundle_items(d.item_code):
 				update_packing_list_item(doc, i.item_code, flt(i.qty)*flt(d.qty), d)
 
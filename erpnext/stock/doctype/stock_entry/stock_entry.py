@@ -11,6 +11,7 @@ from erpnext.stock.stock_ledger import get_previous_sle, NegativeStockError
 from erpnext.stock.get_item_details import get_available_qty, get_default_cost_center, get_conversion_factor
 from erpnext.manufacturing.doctype.bom.bom import validate_bom_no
 from erpnext.accounts.utils import validate_fiscal_year
+from erpnext.controllers.master_data import preload_master_data
 
 class IncorrectValuationRateError(frappe.ValidationError): pass
 class DuplicateEntryForProductionOrderError(frappe.ValidationError): pass
@@ -32,6 +33,8 @@ class StockEntry(StockController):
 				item.update(get_available_qty(item.item_code, item.s_warehouse))
 
 	def validate(self):
+		preload_master_data(self)
+
 		self.pro_doc = None
 		if self.production_order:
 			self.pro_doc = frappe.get_doc('Production Order', self.production_order)
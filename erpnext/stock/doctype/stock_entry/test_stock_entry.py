@@ -79,6 +79,40 @@ class TestStockEntry(unittest.TestCase):
 	def test_auto_material_request_for_variant(self):
 		self._test_auto_material_request("_Test Variant Item-S")
 
+	def test_auto_material_request_queries_do_not_grow_with_items(self):
+		import erpnext.stock.reorder_item
+		from erpnext.stock.doctype.item.test_item import make_item
+
+		# synthetic catalog of items below their reorder level
+		item_codes = ["_Test Reorder Item {0}".format(i) for i in xrange(20)]
+		for item_code in item_codes:
+			make_item(item_code, {"is_stock_item": 1, "is_purchase_item": 1,
+				"reorder_levels": [{"warehouse": "_Test Warehouse - _TC",
+					"warehouse_reorder_level": 10, "warehouse_reorder_qty": 5,
+					"material_request_type": "Purchase"}]})
+
+		queries, material_requests = [], {}
+		sql = frappe.db.sql
+		def count_queries(query, *args, **kwargs):
+			queries.append(query)
+			return sql(query, *args, **kwargs)
+
+		create_material_request = erpnext.stock.reorder_item.create_material_request
+		erpnext.stock.reorder_item.create_material_request = material_requests.update
+		frappe.db.sql = count_queries
+		try:
+			erpnext.stock.reorder_item._reorder_item()
+		finally:
+			frappe.db.sql = sql
+			erpnext.stock.reorder_item.create_material_request = create_material_request
+
+		items = [d["item_code"] for company in material_requests["Purchase"].values() for d in company]
+		for item_code in item_codes:
+			self.assertTrue(item_code in items)
+
+		# planning does not query per item
+		self.assertTrue(len(queries) < 10)
+
 	def _test_auto_material_request(self, item_code, material_request_type="Purchase"):
 		item = frappe.get_doc("Item", item_code)
 
@@ -8,7 +8,8 @@ from frappe import msgprint, _
 from frappe.utils import cstr, flt, cint
 from erpnext.stock.stock_ledger import update_entries_after
 from erpnext.controllers.stock_controller import StockController
-from erpnext.stock.utils import get_stock_balance
+from erpnext.controllers.master_data import preload_master_data
+from erpnext.stock.utils import get_stock_balance, get_stock_balances
 
 class OpeningEntryAccountError(frappe.ValidationError): pass
 class EmptyStockReconciliationItemsError(frappe.ValidationError): pass
@@ -19,6 +20,8 @@ class StockReconciliation(StockController):
 		self.head_row = ["Item Code", "Warehouse", "Quantity", "Valuation Rate"]
 
 	def validate(self):
+		preload_master_data(self)
+
 		if not self.expense_account:
 			self.expense_account = frappe.db.get_value("Company", self.company, "stock_adjustment_account")
 		if not self.cost_center:
@@ -39,9 +42,12 @@ class StockReconciliation(StockController):
 	def remove_items_with_no_change(self):
 		"""Remove items if qty or rate is not changed"""
 		self.difference_amount = 0.0
+		stock_balances = self.get_stock_balances()
+
 		def _changed(item):
-			qty, rate = get_stock_balance(item.item_code, item.warehouse,
-					self.posting_date, self.posting_time, with_valuation_rate=True)
+			previous_sle = stock_balances.get((item.item_code, item.warehouse))
+			qty, rate = (previous_sle.qty_after_transaction, previous_sle.valuation_rate) \
+				if previous_sle else (0.0, 0.0)
 			if (item.qty==None or item.qty==qty) and (item.valuation_rate==None or item.valuation_rate==rate):
 				return False
 			else:
@@ -77,6 +83,7 @@ class StockReconciliation(StockController):
 		item_warehouse_combinations = []
 
 		default_currency = frappe.db.get_default("currency")
+		stock_balances = self.get_stock_balances()
 
 		# validate no of rows
 		if len(self.items) > 100:
@@ -111,8 +118,7 @@ class StockReconciliation(StockController):
 					_("Negative Valuation Rate is not allowed")))
 
 			if row.qty and not row.valuation_rate:
-				row.valuation_rate = get_stock_balance(row.item_code, row.warehouse,
-							self.posting_date, self.posting_time, with_valuation_rate=True)[1]
+				row.valuation_rate = (stock_balances.get((row.item_code, row.warehouse)) or {}).get("valuation_rate")
 				if not row.valuation_rate:
 					# try if there is a buying price list in default currency
 					buying_rate = frappe.db.get_value("Item Price", {"item_code": row.item_code,
@@ -156,18 +162,34 @@ class StockReconciliation(StockController):
 		except Exception, e:
 			self.validation_messages.append(_("Row # ") + ("%d: " % (row_num)) + cstr(e))
 
+	def get_stock_balances(self):
+		"""Returns last stock ledger entry of every row as on posting date and time,
+		fetched with one query per warehouse.
+
+		Returns dict {(item_code, warehouse): sle}"""
+		items_by_warehouse = {}
+		for row in self.items:
+			items_by_warehouse.setdefault(row.warehouse, []).append(row.item_code)
+
+		stock_balances = {}
+		for warehouse, item_codes in items_by_warehouse.items():
+			for item_code, sle in get_stock_balances(warehouse, item_codes,
+				self.posting_date, self.posting_time).items():
+					stock_balances[(item_code, warehouse)] = sle
+
+		return stock_balances
+
 	def update_stock_ledger(self):
 		"""	find difference between current and expected entries
 			and create stock ledger entries based on the difference"""
-		from erpnext.stock.stock_ledger import get_previous_sle
+		stock_balances = self.get_stock_balances()
+		stock_uom = dict(frappe.db.sql("""select name, stock_uom from `tabItem`
+			where name in ({0})""".format(", ".join(["%s"] * len(self.items))),
+			tuple(row.item_code for row in self.items)))
 
+		sl_entries = []
 		for row in self.items:
-			previous_sle = get_previous_sle({
-				"item_code": row.item_code,
-				"warehouse": row.warehouse,
-				"posting_date": self.posting_date,
-				"posting_time": self.posting_time
-			})
+			previous_sle = stock_balances.get((row.item_code, row.warehouse))
 			if previous_sle:
 				if row.qty in ("", None):
 					row.qty = previous_sle.get("qty_after_transaction", 0)
@@ -183,11 +205,15 @@ class StockReconciliation(StockController):
 				or (not previous_sle and not row.qty)):
 					continue
 
-			self.insert_entries(row)
+			sl_entries.append(self.get_sle_for_row(row, stock_uom.get(row.item_code)))
+
+		# post all entries together
+		if sl_entries:
+			self.make_sl_entries(sl_entries)
 
-	def insert_entries(self, row):
-		"""Insert Stock Ledger Entries"""
-		args = frappe._dict({
+	def get_sle_for_row(self, row, stock_uom):
+		"""Returns Stock Ledger Entry args for a reconciliation row"""
+		return frappe._dict({
 			"doctype": "Stock Ledger Entry",
 			"item_code": row.item_code,
 			"warehouse": row.warehouse,
@@ -196,13 +222,12 @@ class StockReconciliation(StockController):
 			"voucher_type": self.doctype,
 			"voucher_no": self.name,
 			"company": self.company,
-			"stock_uom": frappe.db.get_value("Item", row.item_code, "stock_uom"),
+			"stock_uom": stock_uom,
 			"fiscal_year": self.fiscal_year,
 			"is_cancelled": "No",
 			"qty_after_transaction": row.qty,
 			"valuation_rate": row.valuation_rate
 		})
-		self.make_sl_entries([args])
 
 	def delete_and_repost_sle(self):
 		"""	Delete Stock Ledger Entries related to this voucher
@@ -254,11 +279,14 @@ def get_items(warehouse, posting_date, posting_time):
 	items += frappe.get_list("Item", fields=["name"], filters= {"is_stock_item": 1, "has_serial_no": 0, 
 		"has_batch_no": 0, "has_variants": 0, "default_warehouse": warehouse}, as_list=1)
 		
+	# balances of all items in the warehouse in one query
+	stock_balances = get_stock_balances(warehouse, posting_date=posting_date, posting_time=posting_time)
+
 	res = []
 	for item in set(items):
-		stock_bal = get_stock_balance(item[0], warehouse, posting_date, posting_time, 
-			with_valuation_rate=True)
-		
+		sle = stock_balances.get(item[0])
+		stock_bal = (sle.qty_after_transaction, sle.valuation_rate) if sle else (0.0, 0.0)
+
 		res.append({
 			"item_code": item[0],
 			"warehouse": warehouse,
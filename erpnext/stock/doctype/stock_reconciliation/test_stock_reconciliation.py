@@ -79,6 +79,33 @@ class TestStockReconciliation(unittest.TestCase):
 
 			set_perpetual_inventory(0)
 
+	def test_get_stock_balances(self):
+		from erpnext.stock.utils import get_stock_balance, get_stock_balances
+
+		for posting_date, posting_time in (("2012-12-20", "12:00"), ("2012-12-25", "03:00"),
+			("2013-01-10", "00:00")):
+				balances = get_stock_balances("_Test Warehouse - _TC", ["_Test Item"],
+					posting_date, posting_time)
+
+				qty, rate = get_stock_balance("_Test Item", "_Test Warehouse - _TC",
+					posting_date, posting_time, with_valuation_rate=True)
+
+				self.assertEqual(balances["_Test Item"].qty_after_transaction, qty)
+				self.assertEqual(balances["_Test Item"].valuation_rate, rate)
+
+		self.assertFalse(get_stock_balances("_Test Warehouse - _TC", ["_Test Item"], "2012-01-01", "00:00"))
+
+	def test_get_stock_values_on(self):
+		from erpnext.stock.utils import get_stock_value_on, get_stock_values_on
+
+		warehouses = ["_Test Warehouse - _TC", "_Test Warehouse 1 - _TC"]
+		for posting_date in ("2012-12-20", "2013-01-10", nowdate()):
+			stock_values = get_stock_values_on(warehouses, posting_date)
+
+			for warehouse in warehouses:
+				self.assertEqual(flt(stock_values.get(warehouse), 2),
+					flt(get_stock_value_on(warehouse, posting_date), 2))
+
 	def insert_existing_sle(self):
 		from erpnext.stock.doctype.stock_entry.test_stock_entry import make_stock_entry
 
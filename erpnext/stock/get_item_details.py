@@ -34,7 +34,51 @@ def get_item_details(args):
 		}
 	"""
 	args = process_args(args)
-	item_doc = frappe.get_doc("Item", args.item_code)
+	return get_item_details_for_row(args)
+
+def get_item_details_for_rows(args_list):
+	"""Returns item details for each of `args_list`, sharing Item, Item Price, Bin
+	and Pricing Rule lookups between the rows"""
+	args_list = [process_args(args) for args in args_list]
+	prefetch = prefetch_item_details(args_list)
+
+	return [get_item_details_for_row(args, prefetch) for args in args_list]
+
+def prefetch_item_details(args_list):
+	prefetch = frappe._dict({"items": {}, "item_prices": {}, "bins": {}, "pricing_rules": {}})
+
+	for item_code in set([args.item_code for args in args_list]):
+		prefetch.items[item_code] = frappe.get_doc("Item", item_code)
+
+	if not prefetch.items:
+		return prefetch
+
+	item_codes = list(set(prefetch.items.keys() + [item.variant_of
+		for item in prefetch.items.values() if item.variant_of]))
+	price_lists = list(set([args.price_list for args in args_list if args.price_list]))
+
+	if price_lists:
+		for d in frappe.db.sql("""select price_list, item_code, price_list_rate
+			from `tabItem Price` where price_list in ({0}) and item_code in ({1})""".format(
+				", ".join(["%s"] * len(price_lists)), ", ".join(["%s"] * len(item_codes))),
+			tuple(price_lists + item_codes), as_dict=1):
+				prefetch.item_prices.setdefault((d.price_list, d.item_code), d.price_list_rate)
+
+		# no price for the rest
+		for price_list in price_lists:
+			for item_code in item_codes:
+				prefetch.item_prices.setdefault((price_list, item_code), None)
+
+	for d in frappe.db.sql("""select item_code, warehouse, projected_qty, actual_qty
+		from `tabBin` where item_code in ({0})""".format(", ".join(["%s"] * len(prefetch.items))),
+		tuple(prefetch.items.keys()), as_dict=1):
+			prefetch.bins.setdefault((d.item_code, d.warehouse),
+				frappe._dict({"projected_qty": d.projected_qty, "actual_qty": d.actual_qty}))
+
+	return prefetch
+
+def get_item_details_for_row(args, prefetch=None):
+	item_doc = prefetch.items[args.item_code] if prefetch else frappe.get_doc("Item", args.item_code)
 	item = item_doc
 
 	validate_item_details(args, item)
@@ -44,10 +88,15 @@ def get_item_details(args):
 	get_party_item_code(args, item_doc, out)
 
 	if out.get("warehouse"):
-		out.update(get_available_qty(args.item_code, out.warehouse))
-		out.update(get_projected_qty(item.name, out.warehouse))
+		if prefetch:
+			bin_details = prefetch.bins.get((args.item_code, out.warehouse)) or {}
+			out.update(bin_details)
+			out.projected_qty = bin_details.get("projected_qty")
+		else:
+			out.update(get_available_qty(args.item_code, out.warehouse))
+			out.update(get_projected_qty(item.name, out.warehouse))
 
-	get_price_list_rate(args, item_doc, out)
+	get_price_list_rate(args, item_doc, out, prefetch)
 
 	if args.transaction_type == "selling" and cint(args.is_pos):
 		out.update(get_pos_profile_item_details(args.company, args))
@@ -57,7 +106,7 @@ def get_item_details(args):
 		if args.get(key) is None:
 			args[key] = value
 
-	out.update(get_pricing_rule_for_item(args))
+	out.update(get_pricing_rule_for_item(args, prefetch.pricing_rules if prefetch else None))
 
 	if args.get("parenttype") in ("Sales Invoice", "Delivery Note"):
 		if item_doc.has_serial_no == 1 and not args.serial_no:
@@ -139,8 +188,9 @@ def get_basic_details(args, item):
 	if not item:
 		item = frappe.get_doc("Item", args.get("item_code"))
 
-	if item.variant_of:
+	if item.variant_of and not item.flags.template_tables_updated:
 		item.update_template_tables()
+		item.flags.template_tables_updated = True
 
 	from frappe.defaults import get_user_default_as_list
 	user_default_warehouse_list = get_user_default_as_list('warehouse')
@@ -205,20 +255,23 @@ def get_default_cost_center(args, item):
 		or frappe.db.get_value("Item Group", item.item_group, "default_cost_center")
 		or args.get("cost_center"))
 
-def get_price_list_rate(args, item_doc, out):
+def get_price_list_rate(args, item_doc, out, prefetch=None):
 	meta = frappe.get_meta(args.parenttype)
 
 	if meta.get_field("currency"):
 		validate_price_list(args)
 		validate_conversion_rate(args, meta)
 
-		price_list_rate = get_price_list_rate_for(args, item_doc.name)
+		price_list_rate = get_price_list_rate_for(args, item_doc.name, prefetch)
 		if not price_list_rate and item_doc.variant_of:
-			price_list_rate = get_price_list_rate_for(args, item_doc.variant_of)
+			price_list_rate = get_price_list_rate_for(args, item_doc.variant_of, prefetch)
 
 		if not price_list_rate:
 			if args.price_list and args.rate:
 				insert_item_price(args)
+				if prefetch:
+					# let the following rows see the inserted price
+					prefetch.item_prices.pop((args.price_list, args.item_code), None)
 			return {}
 
 		out.price_list_rate = flt(price_list_rate) * flt(args.plc_conversion_rate) \
@@ -249,7 +302,10 @@ def insert_item_price(args):
 			frappe.msgprint("Item Price added for {0} in Price List {1}".format(args.item_code,
 				args.price_list))
 
-def get_price_list_rate_for(args, item_code):
+def get_price_list_rate_for(args, item_code, prefetch=None):
+	if prefetch and (args.price_list, item_code) in prefetch.item_prices:
+		return prefetch.item_prices[(args.price_list, item_code)]
+
 	return frappe.db.get_value("Item Price",
 			{"price_list": args.price_list, "item_code": item_code}, "price_list_rate")
 
@@ -435,7 +491,8 @@ def get_price_list_currency_and_exchange_rate(args):
 
 	if (not plc_conversion_rate) or (price_list_currency and args.price_list_currency \
 		and price_list_currency != args.price_list_currency):
-			plc_conversion_rate = get_exchange_rate(price_list_currency, args.currency) or plc_conversion_rate
+			plc_conversion_rate = get_exchange_rate(price_list_currency, args.currency,
+				args.transaction_date) or plc_conversion_rate
 
 	return {
 		"price_list_currency": price_list_currency,
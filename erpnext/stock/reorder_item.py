@@ -21,24 +21,15 @@ def _reorder_item():
 	default_company = (frappe.defaults.get_defaults().get("company") or
 		frappe.db.sql("""select name from tabCompany limit 1""")[0][0])
 
-	items_to_consider = frappe.db.sql_list("""select name from `tabItem` item
-		where is_stock_item=1 and has_variants=0
-			and (is_purchase_item=1 or is_sub_contracted_item=1)
-			and disabled=0
-			and (end_of_life is null or end_of_life='0000-00-00' or end_of_life > %(today)s)
-			and ((re_order_level is not null and re_order_level > 0)
-				or exists (select name from `tabItem Reorder` ir where ir.parent=item.name)
-				or (variant_of is not null and variant_of != ''
-					and exists (select name from `tabItem Reorder` ir where ir.parent=item.variant_of))
-			)""",
-		{"today": nowdate()})
+	items_to_consider = get_items_to_consider()
 
 	if not items_to_consider:
 		return
 
-	item_warehouse_projected_qty = get_item_warehouse_projected_qty(items_to_consider)
+	item_reorder_levels = get_item_reorder_levels(items_to_consider)
+	item_warehouse_projected_qty = get_item_warehouse_projected_qty()
 
-	def add_to_material_request(item_code, warehouse, reorder_level, reorder_qty, material_request_type):
+	def add_to_material_request(item, warehouse, reorder_level, reorder_qty, material_request_type):
 		if warehouse not in warehouse_company:
 			# a disabled warehouse
 			return
@@ -47,7 +38,7 @@ def _reorder_item():
 		reorder_qty = flt(reorder_qty)
 
 		# projected_qty will be 0 if Bin does not exist
-		projected_qty = flt(item_warehouse_projected_qty.get(item_code, {}).get(warehouse))
+		projected_qty = flt(item_warehouse_projected_qty.get(item.name, {}).get(warehouse))
 
 		if reorder_level and projected_qty <= reorder_level:
 			deficiency = reorder_level - projected_qty
@@ -57,36 +48,70 @@ def _reorder_item():
 			company = warehouse_company.get(warehouse) or default_company
 
 			material_requests[material_request_type].setdefault(company, []).append({
-				"item_code": item_code,
+				"item_code": item.name,
 				"warehouse": warehouse,
-				"reorder_qty": reorder_qty
+				"reorder_qty": reorder_qty,
+				"item_details": item
 			})
 
-	for item_code in items_to_consider:
-		item = frappe.get_doc("Item", item_code)
+	for item_code, item in items_to_consider.items():
+		# variant uses reorder levels of its template if it has none
+		reorder_levels = item_reorder_levels.get(item_code) \
+			or (item.variant_of and item_reorder_levels.get(item.variant_of))
 
-		if item.variant_of and not item.get("reorder_levels"):
-			item.update_template_tables()
-
-		if item.get("reorder_levels"):
-			for d in item.get("reorder_levels"):
-				add_to_material_request(item_code, d.warehouse, d.warehouse_reorder_level,
+		if reorder_levels:
+			for d in reorder_levels:
+				add_to_material_request(item, d.warehouse, d.warehouse_reorder_level,
 					d.warehouse_reorder_qty, d.material_request_type)
 
 		else:
 			# raise for default warehouse
-			add_to_material_request(item_code, item.default_warehouse, item.re_order_level, item.re_order_qty, "Purchase")
+			add_to_material_request(item, item.default_warehouse, item.re_order_level, item.re_order_qty, "Purchase")
 
 	if material_requests:
 		return create_material_request(material_requests)
 
-def get_item_warehouse_projected_qty(items_to_consider):
+# stock items which have reorder levels, directly or through their template
+items_to_consider_condition = """is_stock_item=1 and has_variants=0
+	and (is_purchase_item=1 or is_sub_contracted_item=1)
+	and disabled=0
+	and (end_of_life is null or end_of_life='0000-00-00' or end_of_life > %(today)s)
+	and ((re_order_level is not null and re_order_level > 0)
+		or exists (select name from `tabItem Reorder` ir where ir.parent=item.name)
+		or (variant_of is not null and variant_of != ''
+			and exists (select name from `tabItem Reorder` ir where ir.parent=item.variant_of))
+	)"""
+
+def get_items_to_consider():
+	"""Returns details of all items to be checked, as {item_code: item}"""
+	return dict((d.name, d) for d in frappe.db.sql("""select name, variant_of, default_warehouse,
+			re_order_level, re_order_qty, item_name, description, item_group, brand,
+			stock_uom, lead_time_days
+		from `tabItem` item where {0}""".format(items_to_consider_condition),
+		{"today": nowdate()}, as_dict=1))
+
+def get_item_reorder_levels(items_to_consider):
+	"""Returns reorder levels of the items and their templates, as {item_code: [reorder levels]}"""
+	parents = set(items_to_consider.keys() + [d.variant_of for d in items_to_consider.values()
+		if d.variant_of])
+
+	item_reorder_levels = {}
+	for d in frappe.db.sql("""select parent, warehouse, warehouse_reorder_level,
+			warehouse_reorder_qty, material_request_type
+		from `tabItem Reorder` where parenttype='Item' order by parent, idx""", as_dict=1):
+		if d.parent in parents:
+			item_reorder_levels.setdefault(d.parent, []).append(d)
+
+	return item_reorder_levels
+
+def get_item_warehouse_projected_qty():
 	item_warehouse_projected_qty = {}
 
-	for item_code, warehouse, projected_qty in frappe.db.sql("""select item_code, warehouse, projected_qty
-		from tabBin where item_code in ({0})
-			and (warehouse != "" and warehouse is not null)"""\
-		.format(", ".join(["%s"] * len(items_to_consider))), items_to_consider):
+	for item_code, warehouse, projected_qty in frappe.db.sql("""select bin.item_code, bin.warehouse,
+			bin.projected_qty
+		from tabBin bin, `tabItem` item
+		where bin.item_code = item.name and (bin.warehouse != "" and bin.warehouse is not null)
+			and {0}""".format(items_to_consider_condition), {"today": nowdate()}):
 
 		item_warehouse_projected_qty.setdefault(item_code, {})[warehouse] = flt(projected_qty)
 
@@ -120,7 +145,7 @@ def create_material_request(material_requests):
 
 				for d in items:
 					d = frappe._dict(d)
-					item = frappe.get_doc("Item", d.item_code)
+					item = d.get("item_details") or frappe.get_doc("Item", d.item_code)
 					mr.append("items", {
 						"doctype": "Material Request Item",
 						"item_code": d.item_code,
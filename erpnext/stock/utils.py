@@ -35,6 +35,39 @@ def get_stock_value_on(warehouse=None, posting_date=None, item_code=None):
 
 	return sum(sle_map.values())
 
+def get_stock_values_on(warehouses, posting_date=None):
+	"""Returns {warehouse: stock value} on the posting date, summed from the latest
+	Stock Ledger Entry of each item in the warehouses, fetched in a single query"""
+	if not posting_date: posting_date = nowdate()
+
+	warehouses = list(set(warehouses))
+	if not warehouses:
+		return {}
+
+	stock_ledger_entries = frappe.db.sql("""
+		select sle.item_code, sle.warehouse, sle.stock_value
+		from `tabStock Ledger Entry` sle, (
+			select item_code, warehouse, max(timestamp(posting_date, posting_time)) as max_timestamp
+			from `tabStock Ledger Entry`
+			where posting_date <= %s and warehouse in ({0})
+			group by item_code, warehouse
+		) latest
+		where sle.item_code = latest.item_code
+			and sle.warehouse = latest.warehouse
+			and timestamp(sle.posting_date, sle.posting_time) = latest.max_timestamp
+		order by sle.name desc
+	""".format(", ".join(["%s"] * len(warehouses))), tuple([posting_date] + warehouses), as_dict=1)
+
+	sle_map = {}
+	for sle in stock_ledger_entries:
+		sle_map.setdefault((sle.item_code, sle.warehouse), flt(sle.stock_value))
+
+	stock_values = {}
+	for (item_code, warehouse), stock_value in sle_map.items():
+		stock_values[warehouse] = stock_values.get(warehouse, 0.0) + stock_value
+
+	return stock_values
+
 def get_stock_balance(item_code, warehouse, posting_date=None, posting_time=None, with_valuation_rate=False):
 	"""Returns stock balance quantity at given warehouse on given posting date or current date.
 
@@ -56,6 +89,50 @@ def get_stock_balance(item_code, warehouse, posting_date=None, posting_time=None
 	else:
 		return last_entry.qty_after_transaction or 0.0
 
+def get_stock_balances(warehouse, item_codes=None, posting_date=None, posting_time=None):
+	"""Returns stock balance of all items (or of `item_codes`) in a warehouse
+	on given posting date and time, fetched in a single query.
+
+	Returns dict {item_code: {"qty_after_transaction": qty, "valuation_rate": rate}}"""
+
+	if not posting_date: posting_date = nowdate()
+	if not posting_time: posting_time = nowtime()
+
+	values, condition = [warehouse, posting_date, posting_time], ""
+
+	if item_codes is not None:
+		item_codes = list(set(item_codes))
+		if not item_codes:
+			return {}
+
+		values += item_codes
+		condition = " and item_code in ({0})".format(", ".join(["%s"] * len(item_codes)))
+
+	# last entry on or before the time-bucket of every item
+	stock_ledger_entries = frappe.db.sql("""
+		select sle.item_code, sle.qty_after_transaction, sle.valuation_rate
+		from `tabStock Ledger Entry` sle, (
+			select item_code, warehouse, max(timestamp(posting_date, posting_time)) as max_timestamp
+			from `tabStock Ledger Entry`
+			where warehouse = %s
+				and ifnull(is_cancelled, 'No')='No'
+				and timestamp(posting_date, posting_time) <= timestamp(%s, %s)
+				{0}
+			group by item_code
+		) latest
+		where sle.item_code = latest.item_code
+			and sle.warehouse = latest.warehouse
+			and ifnull(sle.is_cancelled, 'No')='No'
+			and timestamp(sle.posting_date, sle.posting_time) = latest.max_timestamp
+		order by sle.name desc
+	""".format(condition), values, as_dict=1)
+
+	sle_map = {}
+	for sle in stock_ledger_entries:
+		sle_map.setdefault(sle.item_code, sle)
+
+	return sle_map
+
 def get_latest_stock_balance():
 	bin_map = {}
 	for d in frappe.db.sql("""SELECT item_code, warehouse, stock_value as stock_value
@@ -173,7 +250,8 @@ def get_valid_serial_nos(sr_nos, qty=0, item_code=''):
 	return valid_serial_nos
 
 def validate_warehouse_company(warehouse, company):
-	warehouse_company = frappe.db.get_value("Warehouse", warehouse, "company")
+	from erpnext.controllers.master_data import get_master_value
+	warehouse_company = get_master_value("Warehouse", warehouse, "company")
 	if warehouse_company and warehouse_company != company:
 		frappe.throw(_("Warehouse {0} does not belong to company {1}").format(warehouse, company),
 			InvalidWarehouseCompany)
@@ -3,6 +3,7 @@
 
 from __future__ import unicode_literals
 import frappe
+from frappe import _
 from frappe.celery_app import celery_task, task_logger
 
 @celery_task()
@@ -28,3 +29,58 @@ def send_newsletter(site, newsletter, event):
 
 	finally:
 		frappe.destroy()
+
+@celery_task()
+def update_item_variants(site, item_code, modified, user, event=None, retries=0):
+	"""Copy values of a template Item to its variants, after the template is saved"""
+	from frappe.utils import get_datetime
+	from erpnext.controllers.item_variant import update_variants
+
+	try:
+		frappe.connect(site=site)
+		frappe.set_user(user)
+
+		template = frappe.get_doc("Item", item_code)
+
+		if get_datetime(template.modified) < get_datetime(modified):
+			# the request saving the template has not committed yet, try again later
+			if retries < 10:
+				update_item_variants.apply_async((site, item_code, modified, user),
+					{"event": event, "retries": retries + 1}, countdown=5)
+			return
+
+		elif get_datetime(template.modified) > get_datetime(modified):
+			# saved again since, that save queues its own update
+			return
+
+		updated = update_variants(template, user=user)
+		frappe.db.commit()
+
+		if updated:
+			frappe.publish_realtime("msgprint", _("Item Variants {0} updated").format(", ".join(updated)),
+				user=user)
+
+	except:
+		frappe.db.rollback()
+		task_logger.warn(frappe.get_traceback())
+		raise
+
+	finally:
+		frappe.destroy()
+
+@celery_task()
+def make_recurring_documents(site, doctype, ref_documents, next_date, event=None):
+	"""Create recurring documents for a batch of due reference documents"""
+	from erpnext.controllers import recurring_document
+
+	try:
+		frappe.connect(site=site)
+		recurring_document.make_recurring_documents(doctype, ref_documents, next_date)
+
+	except:
+		frappe.db.rollback()
+		task_logger.warn(frappe.get_traceback())
+		raise
+
+	finally:
+		frappe.destroy()
@@ -3,38 +3,28 @@
 
 from __future__ import unicode_literals
 import frappe
-from frappe.utils import cstr, nowdate
+from frappe.utils import nowdate
 from erpnext.setup.doctype.item_group.item_group import get_item_for_list_in_html
+from erpnext.utilities.product_search import search_products
 
 no_cache = 1
 no_sitemap = 1
 
 @frappe.whitelist(allow_guest=True)
 def get_product_list(search=None, start=0, limit=10):
-	# base query
-	query = """select name, item_name, page_name, website_image, thumbnail, item_group,
-			web_long_description as website_description, parent_website_route
-		from `tabItem`
-		where show_in_website = 1
-			and disabled=0
-			and (end_of_life is null or end_of_life='0000-00-00' or end_of_life > %(today)s)
-			and (variant_of is null or variant_of = '')"""
-
-	# search term condition
 	if search:
-		query += """ and (web_long_description like %(search)s
-				or description like %(search)s
-				or item_name like %(search)s
-				or name like %(search)s)"""
-		search = "%" + cstr(search) + "%"
-
-	# order by
-	query += """ order by weightage desc, modified desc limit %s, %s""" % (start, limit)
-
-	data = frappe.db.sql(query, {
-		"search": search,
-		"today": nowdate()
-	}, as_dict=1)
+		# ranked results from the product search index
+		data = search_products(search, start=start, limit=limit)
+	else:
+		data = frappe.db.sql("""select name, item_name, page_name, website_image, thumbnail, item_group,
+				web_long_description as website_description, parent_website_route
+			from `tabItem`
+			where show_in_website = 1
+				and disabled=0
+				and (end_of_life is null or end_of_life='0000-00-00' or end_of_life > %(today)s)
+				and (variant_of is null or variant_of = '')
+			order by weightage desc, modified desc limit %(start)s, %(limit)s""",
+			{"today": nowdate(), "start": int(start), "limit": int(limit)}, as_dict=1)
 
 	for d in data:
 		d.route = ((d.parent_website_route + "/") if d.parent_website_route else "") \
@@ -0,0 +1,106 @@
+# Copyright (c) 2015, Frappe Technologies Pvt. Ltd. and Contributors
+# License: GNU General Public License v3. See license.txt
+
+"""Full-text index of items shown on the website.
+
+Each listed Item has one row in `__product_search` with its searchable text.
+Rows are updated when the Item is saved and removed when it is deleted or no
+longer shown on the website. Searches use a FULLTEXT index with prefix matching,
+so results are ranked by relevance instead of a `like` scan over `tabItem`."""
+
+from __future__ import unicode_literals
+import re
+import frappe
+from frappe.utils import cstr, strip_html, nowdate
+
+# minimum word length indexed by MyISAM FULLTEXT (ft_min_word_len)
+min_word_length = 4
+
+def setup_product_search_table():
+	"""Create the search table if it does not exist"""
+	if not frappe.db.sql("show tables like '__product_search'"):
+		frappe.db.sql("""create table __product_search (
+			name varchar(140) not null primary key,
+			item_name varchar(140),
+			content text,
+			fulltext(content))
+			ENGINE=MyISAM
+			CHARACTER SET=utf8mb4 COLLATE=utf8mb4_unicode_ci""")
+
+def rebuild_product_search_index():
+	"""Index all items shown on the website"""
+	setup_product_search_table()
+	frappe.db.sql("delete from __product_search")
+
+	for item in frappe.db.sql("""select name, item_name, description, web_long_description
+		from `tabItem` where show_in_website=1 and disabled=0
+			and (variant_of is null or variant_of='')""", as_dict=1):
+		insert_index(item)
+
+def update_product_search_index(item):
+	"""Sync index row of the Item, removing it if the item is not listed on the website"""
+	delete_from_index(item.name)
+	if item.show_in_website and not item.disabled and not item.variant_of:
+		insert_index(item)
+
+def delete_from_index(item_code):
+	frappe.db.sql("delete from __product_search where name=%s", item_code)
+
+def insert_index(item):
+	frappe.db.sql("""insert into __product_search (name, item_name, content)
+		values (%s, %s, %s)""", (item.name, item.item_name, get_content(item)))
+
+def get_content(item):
+	return " ".join([cstr(item.name), cstr(item.item_name),
+		strip_html(cstr(item.description)), strip_html(cstr(item.web_long_description))])
+
+def get_search_words(search):
+	return [w for w in re.split(r"[^\w]+", cstr(search), flags=re.UNICODE) if w]
+
+def search_products(search, item_groups=None, start=0, limit=10):
+	"""Returns listed items matching all words of `search` ranked by relevance.
+
+	:param item_groups: Only return items in these groups (or shown in them via Website Item Group)"""
+	words = get_search_words(search)
+	if not words:
+		return []
+
+	conditions, values = [], {"today": nowdate(), "start": int(start), "limit": int(limit)}
+
+	# short words are not in the fulltext index, match them as prefix of name or item name
+	fulltext_words = [w for w in words if len(w) >= min_word_length]
+	if fulltext_words:
+		values["match"] = " ".join(["+{0}*".format(w) for w in fulltext_words])
+		relevance = "match(search.content) against (%(match)s in boolean mode)"
+		conditions.append(relevance)
+	else:
+		relevance = "0"
+
+	for i, w in enumerate([w for w in words if len(w) < min_word_length]):
+		values["word{0}".format(i)] = w + "%"
+		conditions.append("""(search.name like %(word{0})s or search.item_name like %(word{0})s
+			or search.item_name like %(inner_word{0})s)""".format(i))
+		values["inner_word{0}".format(i)] = "% " + w + "%"
+
+	if item_groups:
+		group_keys = []
+		for i, item_group in enumerate(item_groups):
+			values["item_group{0}".format(i)] = item_group
+			group_keys.append("%(item_group{0})s".format(i))
+
+		conditions.append("""(item.item_group in ({0})
+			or item.name in (select parent from `tabWebsite Item Group`
+				where item_group in ({0})))""".format(", ".join(group_keys)))
+
+	return frappe.db.sql("""select item.name, item.item_name, item.page_name, item.website_image,
+			item.thumbnail, item.item_group, item.web_long_description as website_description,
+			item.parent_website_route, {relevance} as relevance
+		from __product_search search, `tabItem` item
+		where item.name = search.name
+			and item.show_in_website = 1
+			and item.disabled = 0
+			and (item.end_of_life is null or item.end_of_life='0000-00-00' or item.end_of_life > %(today)s)
+			and {conditions}
+		order by relevance desc, item.weightage desc, item.modified desc
+		limit %(start)s, %(limit)s""".format(relevance=relevance, conditions=" and ".join(conditions)),
+		values, as_dict=1)